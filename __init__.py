@@ -1,3 +1,9 @@
 from .nodes import NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS
 
+try:
+    from . import routes  # noqa: F401  (registers HTTP routes on the ComfyUI server)
+except (ImportError, AttributeError):
+    # Not running inside ComfyUI's server
+    pass
+
 __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
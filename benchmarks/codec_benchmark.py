@@ -0,0 +1,99 @@
+"""
+Encode time versus bytes on the wire for each image codec setting
+
+Run from the repository root:
+
+    python benchmarks/codec_benchmark.py --size 1024 --repeat 3
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.image_encoding import encode_image  # noqa: E402
+
+SETTINGS = [
+    ("PNG", None, 1),
+    ("PNG", None, 6),
+    ("PNG", None, 9),
+    ("WEBP_LOSSLESS", 0, None),
+    ("WEBP_LOSSLESS", 80, None),
+    ("WEBP", 80, None),
+    ("WEBP", 90, None),
+    ("JPEG", 85, None),
+    ("JPEG", 95, None),
+]
+
+
+def synthetic_image(size: int, seed: int = 0) -> Image.Image:
+    """
+    Photo-like test image: smooth gradients and shapes with mild sensor noise
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    r = 0.5 + 0.5 * np.sin(6.0 * x + 2.0 * y)
+    g = 0.5 + 0.5 * np.cos(4.0 * y - 3.0 * x * y)
+    b = np.clip(1.0 - np.hypot(x - 0.5, y - 0.5) * 1.6, 0.0, 1.0)
+    image = np.stack([r, g, b], axis=-1)
+    image += rng.normal(0.0, 0.02, image.shape).astype(np.float32)
+    return Image.fromarray((np.clip(image, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8))
+
+
+def run(size: int, repeat: int):
+    image = synthetic_image(size)
+    raw_bytes = size * size * 3
+    rows = []
+    for image_format, quality, compress_level in SETTINGS:
+        timings = []
+        for _ in range(repeat):
+            result = encode_image(
+                image, image_format, quality=quality, compress_level=compress_level
+            )
+            timings.append(result['encode_ms'])
+        setting = (
+            f"quality={quality}"
+            if quality is not None
+            else f"compress_level={compress_level}"
+        )
+        rows.append(
+            (
+                image_format,
+                setting,
+                statistics.median(timings),
+                result['size_bytes'],
+                raw_bytes / result['size_bytes'],
+            )
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--size", type=int, default=1024, help="Square image edge in pixels"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Encodes per setting (median is reported)"
+    )
+    args = parser.parse_args()
+
+    print(f"{args.size}x{args.size} RGB, median of {args.repeat} encodes\n")
+    print("| Format | Setting | Encode (ms) | Size (KiB) | Ratio vs raw |")
+    print("|---|---|---:|---:|---:|")
+    for image_format, setting, encode_ms, size_bytes, ratio in run(
+        args.size, args.repeat
+    ):
+        print(
+            f"| {image_format} | {setting} | {encode_ms:.1f} | "
+            f"{size_bytes / 1024:.0f} | {ratio:.1f}x |"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Minimal stand-ins for the ComfyUI modules the nodes import, so benchmarks run
+without ComfyUI
+
+Only used by the benchmark scripts; the nodes themselves always run against the
+real modules.
+"""
+
+import importlib
+import os
+import sys
+import tempfile
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "webhook_nodes"
+
+
+class ProgressBar:
+    """Drop-in for comfy.utils.ProgressBar that only counts updates"""
+
+    def __init__(self, total):
+        self.total = total
+        self.current = 0
+        self.updates = 0
+
+    def update(self, value):
+        self.current += value
+        self.updates += 1
+
+    def update_absolute(self, value, total=None, preview=None):
+        self.current = value
+        if total is not None:
+            self.total = total
+        self.updates += 1
+
+
+class InterruptProcessingException(Exception):
+    pass
+
+
+def install(data_dir=None):
+    """
+    Register stub ``folder_paths`` and ``comfy`` modules unless the real ones exist
+
+    Args:
+        data_dir: Directory for the output, user and temp folders (default: a new
+            temporary directory)
+
+    Returns:
+        The directory the stubs point at
+    """
+    data_dir = data_dir or tempfile.mkdtemp(prefix="webhook-bench-")
+    try:
+        importlib.import_module("folder_paths")
+    except ImportError:
+        folder_paths = types.ModuleType("folder_paths")
+        for name in ("output", "user", "temp", "input"):
+            path = os.path.join(data_dir, name)
+            os.makedirs(path, exist_ok=True)
+            setattr(folder_paths, f"get_{name}_directory", lambda path=path: path)
+        sys.modules["folder_paths"] = folder_paths
+    try:
+        importlib.import_module("comfy.utils")
+    except ImportError:
+        comfy = types.ModuleType("comfy")
+        comfy.__path__ = []
+        utils = types.ModuleType("comfy.utils")
+        utils.ProgressBar = ProgressBar
+        model_management = types.ModuleType("comfy.model_management")
+        model_management.interrupt_processing = False
+        model_management.InterruptProcessingException = InterruptProcessingException
+        model_management.throw_exception_if_processing_interrupted = lambda: None
+        comfy.utils = utils
+        comfy.model_management = model_management
+        sys.modules.update(
+            {
+                "comfy": comfy,
+                "comfy.utils": utils,
+                "comfy.model_management": model_management,
+            }
+        )
+    return data_dir
+
+
+def load_nodes():
+    """
+    Import nodes.py as part of the repository package (its imports are relative)
+
+    The package's __init__ is skipped so the ComfyUI server routes are not registered.
+    """
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [REPO_ROOT]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.nodes")
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark of tensor-to-image conversion against the previous implementation
+
+Run from the repository root:
+
+    python benchmarks/conversion_benchmark.py --size 2048 --batch 4 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.image_encoding import array_to_pil, tensor_to_uint8  # noqa: E402
+
+
+def legacy_convert(tensor):
+    """
+    The original convert_tensor_to_pil body, for comparison
+    """
+    if len(tensor.shape) == 4:
+        tensor = tensor[0]
+    if tensor.max() <= 1.0:
+        tensor = (tensor * 255).astype(np.uint8)
+    else:
+        tensor = tensor.astype(np.uint8)
+    return Image.fromarray(tensor)
+
+
+def fast_convert(tensor):
+    return array_to_pil(
+        tensor_to_uint8(tensor[0] if len(tensor.shape) == 4 else tensor)
+    )
+
+
+def fast_convert_into(tensor, out):
+    return array_to_pil(
+        tensor_to_uint8(tensor[0] if len(tensor.shape) == 4 else tensor, out=out)
+    )
+
+
+def time_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--size", type=int, default=2048, help="Square image edge in pixels"
+    )
+    parser.add_argument(
+        "--batch", type=int, default=1, help="Batch size of the input tensor"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Runs per variant (median is reported)"
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tensor = rng.random((args.batch, args.size, args.size, 3), dtype=np.float32)
+    out = np.empty((args.size, args.size, 3), dtype=np.uint8)
+
+    # Both truncate, so the pixels should be identical
+    diff = np.abs(
+        np.asarray(legacy_convert(tensor), dtype=np.int16)
+        - np.asarray(fast_convert(tensor), dtype=np.int16)
+    )
+    print(
+        f"{args.size}x{args.size} RGB float32, batch {args.batch}, "
+        f"median of {args.repeat} runs"
+    )
+    print(f"max pixel difference vs legacy: {diff.max()}\n")
+
+    print("| Variant | Time (ms) |")
+    print("|---|---:|")
+    variants = [
+        ("legacy convert_tensor_to_pil", lambda: legacy_convert(tensor)),
+        ("tensor_to_uint8", lambda: fast_convert(tensor)),
+        ("tensor_to_uint8 (preallocated out)", lambda: fast_convert_into(tensor, out)),
+    ]
+    for name, convert in variants:
+        print(f"| {name} | {time_ms(convert, args.repeat):.1f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""
+End-to-end delivery benchmark of the webhook nodes against a local mock receiver
+
+Run from the repository root:
+
+    python benchmarks/delivery_benchmark.py --quick
+    python benchmarks/delivery_benchmark.py --latency-ms 20 --throttle-rate 0.05 \
+        --output before.json
+    python benchmarks/delivery_benchmark.py --compare before.json --fail-on-regression
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+import comfy_stubs
+from codec_benchmark import synthetic_image
+from mock_receiver import MockReceiver
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+TARGETS = ("sender", "generic", "notify")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of the process so far (a high-water mark, it never goes down)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(
+        peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0, 1
+    )
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = q * (len(sorted_values) - 1)
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (
+        rank - low
+    )
+
+
+def image_batch(size: int, batch: int) -> np.ndarray:
+    """
+    ComfyUI IMAGE-shaped float32 batch (B, H, W, 3) in [0, 1]
+    """
+    frame = np.asarray(synthetic_image(size), dtype=np.float32) / 255.0
+    return np.repeat(frame[None], batch, axis=0)
+
+
+def payload(shape: str) -> Dict[str, Any]:
+    if shape == "small":
+        return {"event": "render_complete", "prompt_id": "bench", "seed": 42}
+    if shape == "nested":
+        return {
+            "nodes": {
+                str(i): {
+                    "class_type": "KSampler",
+                    "inputs": {
+                        "seed": i,
+                        "steps": 20,
+                        "cfg": 7.5,
+                        "sampler": "euler",
+                        "tags": ["a", "b"],
+                    },
+                }
+                for i in range(500)
+            }
+        }
+    raise ValueError(f"Unknown payload shape: {shape}")
+
+
+def scenarios(quick: bool, concurrency: List[int]) -> List[Dict[str, Any]]:
+    """
+    The benchmark matrix: image sizes and batch sizes for the image sender, payload
+    shapes for the generic and notify nodes, each at every concurrency level
+    """
+    image_sizes = [256] if quick else [256, 512, 1024]
+    batch_sizes = [1, 4]
+    matrix = []
+    for level in concurrency:
+        for size in image_sizes:
+            for batch in batch_sizes:
+                matrix.append(
+                    {
+                        "target": "sender",
+                        "image_size": size,
+                        "batch": batch,
+                        "concurrency": level,
+                    }
+                )
+        matrix.append({"target": "sender", "payload": "nested", "concurrency": level})
+        for shape in ("small", "nested", "tensor"):
+            matrix.append({"target": "generic", "payload": shape, "concurrency": level})
+        matrix.append({"target": "notify", "payload": "small", "concurrency": level})
+    for entry in matrix:
+        shape = (
+            f"{entry['image_size']}px x{entry['batch']}"
+            if "image_size" in entry
+            else entry["payload"]
+        )
+        entry["name"] = f"{entry['target']}/{shape}/c{entry['concurrency']}"
+    return matrix
+
+
+def make_call(
+    nodes, sender_module, scenario: Dict[str, Any], url: str
+) -> Callable[[], bool]:
+    """
+    Build a function without arguments that sends one webhook and returns its success
+    """
+    target = scenario["target"]
+    if target == "sender":
+        sender = sender_module.WebhookSender()
+        if "image_size" in scenario:
+            image = image_batch(scenario["image_size"], scenario["batch"])
+            batch_mode = "first" if scenario["batch"] == 1 else "all"
+            return lambda: sender.send_webhook(
+                url, image, json_data=payload("small"), batch_mode=batch_mode
+            )["success"]
+        body = payload(scenario["payload"])
+        return lambda: sender.send_webhook(
+            url, None, json_data=body, send_as_json=True
+        )["success"]
+
+    if target == "generic":
+        node = nodes.GenericWebhookNode()
+        if scenario["payload"] == "tensor":
+            # LATENT-sized array sent through the generic node's JSON conversion
+            latent = np.random.default_rng(0).standard_normal(
+                (1, 4, 64, 64), dtype=np.float32
+            )
+            return lambda: node.send_generic_webhook(url, any_input=latent)[
+                0
+            ].startswith("Success")
+        body = json.dumps(payload(scenario["payload"]))
+        return lambda: node.send_generic_webhook(url, json_data=body)[0].startswith(
+            "Success"
+        )
+
+    if target == "notify":
+        node = nodes.NotifyServer()
+        body = json.dumps(payload(scenario["payload"]))
+        return lambda: node.notify(True, webhook_url=url, json_data=body)[0].startswith(
+            "Success"
+        )
+
+    raise ValueError(f"Unknown target: {target}")
+
+
+def run_scenario(
+    call: Callable[[], bool], requests: int, concurrency: int
+) -> Dict[str, Any]:
+    gc.collect()
+
+    def timed(_):
+        start = time.perf_counter()
+        try:
+            ok = call()
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(timed, range(requests)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    latencies = sorted(seconds * 1000.0 for seconds, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "wall_s": round(wall, 4),
+        "throughput_rps": round(requests / wall, 2) if wall > 0 else None,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3),
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "cpu_s": round(cpu, 4),
+        "cpu_ms_per_request": round(cpu * 1000.0 / requests, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=comfy_stubs.REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                cwd=comfy_stubs.REPO_ROOT,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+        )
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def compare(
+    results: List[Dict[str, Any]],
+    receiver: Dict[str, Any],
+    baseline_path: str,
+    threshold: float,
+) -> List[str]:
+    """
+    Print throughput and p95 changes against a saved run
+
+    Returns:
+        Names of the scenarios that regressed
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        saved = json.load(f)
+    baseline = {entry["name"]: entry for entry in saved["results"]}
+    regressions = []
+    print(
+        f"\nCompared with {baseline_path} ({saved['meta'].get('commit')}, "
+        f"regression threshold {threshold:.0%}):\n"
+    )
+    if saved["meta"].get("receiver") != receiver:
+        print(
+            "Note: the baseline used a different receiver setup: "
+            f"{saved['meta'].get('receiver')}\n"
+        )
+    print("| Scenario | Throughput (req/s) | Change | p95 (ms) | Change |")
+    print("|---|---:|---:|---:|---:|")
+    for entry in results:
+        before = baseline.get(entry["name"])
+        if before is None:
+            continue
+        rps_change = entry["throughput_rps"] / before["throughput_rps"] - 1.0
+        p95_change = (
+            entry["latency_ms"]["p95"] / max(before["latency_ms"]["p95"], 1e-9) - 1.0
+        )
+        regressed = rps_change < -threshold or p95_change > threshold
+        if regressed:
+            regressions.append(entry["name"])
+        name = f"{entry['name']}{' (regressed)' if regressed else ''}"
+        print(
+            f"| {name} | {entry['throughput_rps']:.1f} | {rps_change:+.1%} | "
+            f"{entry['latency_ms']['p95']:.1f} | {p95_change:+.1%} |"
+        )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--quick", action="store_true", help="Smallest image size only, fewer requests"
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=None,
+        help="Requests per scenario (default 200, 50 with --quick)",
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=5, help="Unmeasured requests before each scenario"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16],
+        help="Concurrent callers",
+    )
+    parser.add_argument(
+        "--target",
+        choices=TARGETS,
+        nargs="+",
+        default=list(TARGETS),
+        help="Nodes to benchmark",
+    )
+    parser.add_argument(
+        "--filter", default="", help="Only run scenarios whose name contains this text"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Receiver delay per response"
+    )
+    parser.add_argument(
+        "--jitter-ms", type=float, default=0.0, help="Extra random receiver delay"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of 500 responses"
+    )
+    parser.add_argument(
+        "--throttle-rate", type=float, default=0.0, help="Fraction of 429 responses"
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=0.0,
+        help="Retry-After seconds on 429 responses",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the receiver's error injection"
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Results file (default benchmarks/results/delivery-<commit>.json)",
+    )
+    parser.add_argument(
+        "--compare", default=None, help="Earlier results file to compare with"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative change counted as a regression",
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with status 1 on a regression",
+    )
+    parser.add_argument(
+        "--log-level",
+        default="WARNING",
+        help="Level of the nodes' logger during the run",
+    )
+    args = parser.parse_args()
+    requests = args.requests or (50 if args.quick else 200)
+
+    comfy_stubs.install()
+    nodes = comfy_stubs.load_nodes()
+    package = comfy_stubs.PACKAGE_NAME
+    sender_module = sys.modules[f"{package}.modules.webhook_sender"]
+    circuit_breaker = sys.modules[f"{package}.modules.circuit_breaker"]
+    rate_limit = sys.modules[f"{package}.modules.rate_limit"]
+    sys.modules[f"{package}.modules.log"].configure_logging(args.log_level)
+
+    matrix = [
+        s
+        for s in scenarios(args.quick, args.concurrency)
+        if s["target"] in args.target and args.filter in s["name"]
+    ]
+    results = []
+    with MockReceiver(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    ) as receiver:
+        print(
+            f"{len(matrix)} scenarios, {requests} requests each, "
+            f"receiver {receiver.config()}\n"
+        )
+        print(
+            "| Scenario | Throughput (req/s) | p50 (ms) | p95 (ms) | p99 (ms) "
+            "| CPU (ms/req) | Errors | Peak RSS (MB) |"
+        )
+        print("|---|---:|---:|---:|---:|---:|---:|---:|")
+        for scenario in matrix:
+            # Every scenario starts with fresh rate limits and closed circuits
+            rate_limit.configure_rate_limiter()
+            circuit_breaker.get_circuit_breakers().reset()
+            call = make_call(nodes, sender_module, scenario, receiver.url)
+            for _ in range(args.warmup):
+                call()
+            receiver.reset()
+            measured = run_scenario(call, requests, scenario["concurrency"])
+            measured["receiver"] = receiver.stats()
+            results.append(dict(scenario, **measured))
+            latency = measured["latency_ms"]
+            print(
+                f"| {scenario['name']} | {measured['throughput_rps']:.1f} | "
+                f"{latency['p50']:.1f} | {latency['p95']:.1f} | {latency['p99']:.1f} | "
+                f"{measured['cpu_ms_per_request']:.2f} | {measured['errors']} | "
+                f"{measured['peak_rss_mb']} |",
+                flush=True,
+            )
+        receiver_config = receiver.config()
+
+    revision = git_revision()
+    report = {
+        "meta": {
+            "benchmark": "delivery",
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **revision,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "requests_per_scenario": requests,
+            "warmup": args.warmup,
+            "receiver": dict(receiver_config, seed=args.seed),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"delivery-{revision['commit'] or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        regressions = compare(
+            results, report["meta"]["receiver"], args.compare, args.threshold
+        )
+        if regressions:
+            print(
+                f"\n{len(regressions)} scenario(s) regressed: {', '.join(regressions)}"
+            )
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+In-process webhook receiver with configurable latency, errors and 429 responses
+
+    with MockReceiver(latency_ms=20, error_rate=0.01, throttle_rate=0.05) as receiver:
+        requests.post(receiver.url, json={})
+        receiver.stats()
+"""
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle on, the body waits for a
+    # delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> int:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            size = 0
+            while True:
+                length = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                self.rfile.read(length + 2)
+                size += length
+                if length == 0:
+                    return size
+        length = int(self.headers.get("Content-Length") or 0)
+        remaining = length
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+        return length
+
+    def _respond(
+        self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self) -> None:
+        receiver = self.server.receiver
+        size = self._read_body()
+        status, headers = receiver._decide()
+        delay = receiver._delay()
+        if delay > 0:
+            time.sleep(delay)
+        receiver._record(status, size)
+        body = b'{"ok": true}' if status < 400 else b'{"error": "injected"}'
+        self._respond(status, body, headers)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_POST = do_PUT = do_PATCH = _handle
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+    receiver: "MockReceiver"
+
+
+class MockReceiver:
+    """
+    Local HTTP server answering every POST/PUT/PATCH, for benchmarks
+
+    Args:
+        latency_ms: Delay before each response
+        jitter_ms: Extra uniformly random delay on top of ``latency_ms``
+        error_rate: Fraction of requests answered with 500
+        throttle_rate: Fraction of requests answered with 429 and a Retry-After header
+        retry_after: Retry-After value in seconds for 429 responses
+        seed: Seed of the injection RNG, for repeatable runs
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.0,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.receiver = self
+        self._thread: Optional[threading.Thread] = None
+        self.reset()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/webhook"
+
+    def _decide(self):
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return 429, {"Retry-After": f"{self.retry_after:g}"}
+        if roll < self.throttle_rate + self.error_rate:
+            return 500, None
+        return 200, None
+
+    def _delay(self) -> float:
+        if self.jitter_ms <= 0:
+            return self.latency_ms / 1000.0
+        with self._lock:
+            jitter = self._random.uniform(0.0, self.jitter_ms)
+        return (self.latency_ms + jitter) / 1000.0
+
+    def _record(self, status: int, size: int) -> None:
+        with self._lock:
+            self._counts["requests"] += 1
+            self._counts["bytes"] += size
+            self._counts["statuses"][status] = (
+                self._counts["statuses"].get(status, 0) + 1
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = {"requests": 0, "bytes": 0, "statuses": {}}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self._counts["requests"],
+                "bytes": self._counts["bytes"],
+                "statuses": {
+                    str(k): v for k, v in sorted(self._counts["statuses"].items())
+                },
+            }
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+            "throttle_rate": self.throttle_rate,
+            "retry_after": self.retry_after,
+        }
+
+    def start(self) -> "MockReceiver":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="mock-receiver", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockReceiver":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
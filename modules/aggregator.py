@@ -0,0 +1,452 @@
+import atexit
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from .webhook_sender import _env_int, build_request, deliver_request
+
+
+def _array_header(count: int, content_type: str) -> bytes:
+    """
+    Array header of ``count`` items for MessagePack or CBOR
+    """
+    if content_type == 'application/msgpack':
+        if count < 16:
+            return bytes([0x90 | count])
+        if count < 1 << 16:
+            return b'\xdc' + struct.pack('>H', count)
+        return b'\xdd' + struct.pack('>I', count)
+    # CBOR major type 4
+    if count < 24:
+        return bytes([0x80 | count])
+    if count < 1 << 8:
+        return bytes([0x98, count])
+    if count < 1 << 16:
+        return b'\x99' + struct.pack('>H', count)
+    return b'\x9a' + struct.pack('>I', count)
+
+
+def join_events(events: List[bytes], content_type: str) -> bytes:
+    """
+    Combine already encoded events into one array body without decoding them
+
+    Args:
+        events: Encoded events
+        content_type: application/json, application/msgpack or application/cbor
+
+    Returns:
+        Encoded array of the events
+    """
+    if content_type == 'application/json':
+        return b'[' + b','.join(events) + b']'
+    if content_type in ('application/msgpack', 'application/cbor'):
+        return _array_header(len(events), content_type) + b''.join(events)
+    raise ValueError(f"Can't batch {content_type} bodies")
+
+
+def _content_type(headers: Dict[str, str]) -> str:
+    for name, value in headers.items():
+        if name.lower() == 'content-type':
+            return value.split(';')[0].strip().lower()
+    return 'application/json'
+
+
+# Delivery options set on the request dict (see set_compression, set_fallback and
+# set_timeouts) that a batch keeps from its events
+_DELIVERY_OPTIONS = ('compression', 'fallback', 'timeouts')
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+
+def set_batching(
+    request: Dict,
+    max_events: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    max_delay_ms: Optional[int] = None,
+) -> Dict:
+    """
+    Attach flush thresholds to a request that will be queued in the aggregator
+
+    Unset thresholds fall back to the aggregator's defaults.
+    """
+    request['batch'] = {
+        key: value
+        for key, value in (
+            ('max_events', max_events),
+            ('max_bytes', max_bytes),
+            ('max_delay_ms', max_delay_ms),
+        )
+        if value
+    }
+    return request
+
+
+class EventAggregator:
+    """
+    Buffers small webhook events per destination and sends them as one array request
+
+    A destination is the method, URL, headers, read timeout and delivery options
+    (compression, circuit fallback and timeouts) of a request.
+    Its buffer is flushed when it holds ``max_events`` events, reaches
+    ``max_bytes``, or its oldest event is ``max_delay_ms`` old, whichever
+    comes first. Events are kept in their encoded form and joined into a
+    JSON, MessagePack or CBOR array without being decoded again.
+    """
+
+    def __init__(
+        self,
+        max_events: int = 50,
+        max_bytes: int = 1024 * 1024,
+        max_delay_ms: int = 1000,
+        workers: int = 2,
+        max_history: int = 1000,
+        send_fn: Callable[[Dict], Dict] = deliver_request,
+    ):
+        """
+        Args:
+            max_events: Default number of events that triggers a flush
+            max_bytes: Default body size that triggers a flush
+            max_delay_ms: Default age of the oldest event that triggers a flush
+            workers: Number of threads sending flushed batches
+            max_history: Number of finished batches whose status is kept
+            send_fn: Function that sends one request dict and returns a result dict
+        """
+        self.max_events = max(1, int(max_events))
+        self.max_bytes = max(1, int(max_bytes))
+        self.max_delay_ms = max(0, int(max_delay_ms))
+        self.workers = max(1, int(workers))
+        self.max_history = max(1, int(max_history))
+        self.send_fn = send_fn
+
+        self._cond = threading.Condition()
+        self._buffers: Dict[Any, Dict[str, Any]] = {}
+        self._ready: deque = deque()
+        self._sending = 0
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+        self._statuses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._flushes: deque = deque(maxlen=1000)
+        self._counters = {
+            'events': 0,
+            'flushes': 0,
+            'delivered': 0,
+            'failed': 0,
+            'flush_full': 0,
+            'flush_bytes': 0,
+            'flush_timer': 0,
+            'flush_manual': 0,
+        }
+
+    # ------------------------------------------------------------------ buffering
+
+    def _ensure_workers(self) -> None:
+        # Caller must hold self._cond
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"webhook-batch-{len(self._threads)}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _set_status(self, batch_id: str, **fields) -> None:
+        # Caller must hold self._cond
+        entry = self._statuses.setdefault(batch_id, {'id': batch_id})
+        entry.update(fields)
+        while len(self._statuses) > self.max_history:
+            oldest_id, oldest = next(iter(self._statuses.items()))
+            if oldest.get('state') in ('buffering', 'sending'):
+                break
+            self._statuses.pop(oldest_id)
+
+    def add(self, request: Dict) -> str:
+        """
+        Buffer one event for its destination
+
+        Args:
+            request: Request dict built by build_request whose body is already
+                encoded ``data`` bytes (see set_batching for per-destination thresholds)
+
+        Returns:
+            ID of the batch the event joined, usable with status()
+        """
+        body = (request.get('body') or {}).get('data')
+        if not isinstance(body, (bytes, bytearray)):
+            raise ValueError("Only requests with an encoded data body can be batched")
+        headers = dict(request.get('headers') or {})
+        content_type = _content_type(headers)
+        join_events([], content_type)  # reject unsupported content types up front
+        settings = request.get('batch') or {}
+        key = (
+            request['method'],
+            request['url'],
+            tuple(sorted(headers.items())),
+            request.get('timeout', 30),
+            *(
+                tuple(sorted(request[option].items())) if request.get(option) else None
+                for option in _DELIVERY_OPTIONS
+            ),
+        )
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Event aggregator has been closed")
+            self._ensure_workers()
+            buffer = self._buffers.get(key)
+            max_bytes = settings.get('max_bytes', self.max_bytes)
+            if buffer is not None and buffer['bytes'] + len(body) > max_bytes:
+                # This event would overflow the batch: send what is buffered first
+                self._take(key, 'bytes')
+                buffer = None
+            if buffer is None:
+                buffer = {
+                    'id': uuid.uuid4().hex,
+                    'request': request,
+                    'content_type': content_type,
+                    'events': [],
+                    'bytes': 0,
+                    'first_at': time.monotonic(),
+                }
+                self._buffers[key] = buffer
+                self._set_status(
+                    buffer['id'],
+                    state='buffering',
+                    url=request['url'],
+                    events=0,
+                    created_at=time.time(),
+                )
+            buffer.update(
+                max_events=settings.get('max_events', self.max_events),
+                max_bytes=max_bytes,
+                max_delay=settings.get('max_delay_ms', self.max_delay_ms) / 1000.0,
+            )
+            buffer['events'].append(bytes(body))
+            buffer['bytes'] += len(body)
+            self._counters['events'] += 1
+            self._set_status(buffer['id'], events=len(buffer['events']))
+            batch_id = buffer['id']
+            if len(buffer['events']) >= buffer['max_events']:
+                self._take(key, 'full')
+            elif buffer['bytes'] >= buffer['max_bytes']:
+                self._take(key, 'bytes')
+            self._cond.notify_all()
+        return batch_id
+
+    def _take(self, key: Any, reason: str) -> None:
+        # Caller must hold self._cond
+        buffer = self._buffers.pop(key)
+        buffer['reason'] = reason
+        self._ready.append(buffer)
+        self._counters[f'flush_{reason}'] += 1
+        self._set_status(buffer['id'], state='queued', reason=reason)
+        self._cond.notify_all()
+
+    # ------------------------------------------------------------------ sending
+
+    def _next_batch(self) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            while True:
+                if self._ready:
+                    self._sending += 1
+                    buffer = self._ready.popleft()
+                    self._set_status(buffer['id'], state='sending')
+                    return buffer
+                if self._closed and not self._buffers:
+                    return None
+                now = time.monotonic()
+                timeout = None
+                for key, buffer in list(self._buffers.items()):
+                    remaining = buffer['first_at'] + buffer['max_delay'] - now
+                    if remaining <= 0:
+                        self._take(key, 'timer')
+                    elif timeout is None or remaining < timeout:
+                        timeout = remaining
+                if not self._ready:
+                    self._cond.wait(timeout)
+
+    def _worker(self) -> None:
+        while True:
+            buffer = self._next_batch()
+            if buffer is None:
+                return
+            template = buffer['request']
+            request = build_request(
+                template['method'],
+                template['url'],
+                headers=template.get('headers'),
+                timeout=template.get('timeout', 30),
+                source=template.get('source', 'WebhookBatch'),
+                data=join_events(buffer['events'], buffer['content_type']),
+            )
+            for option in _DELIVERY_OPTIONS:
+                if template.get(option):
+                    request[option] = template[option]
+            request['background'] = True
+
+            start = time.monotonic()
+            try:
+                result = self.send_fn(request)
+            except Exception as e:
+                result = {
+                    'success': False,
+                    'error': f'Unexpected error: {str(e)}',
+                    'status_code': None,
+                }
+            finished = time.monotonic()
+
+            flush = {
+                'events': len(buffer['events']),
+                'bytes': buffer['bytes'],
+                'reason': buffer['reason'],
+                'send_ms': (finished - start) * 1000.0,
+                # How long the oldest event waited until its batch was delivered
+                'latency_ms': (finished - buffer['first_at']) * 1000.0,
+            }
+            with self._cond:
+                self._sending -= 1
+                state = 'delivered' if result.get('success') else 'failed'
+                self._counters['flushes'] += 1
+                self._counters[state] += 1
+                self._flushes.append(flush)
+                self._set_status(
+                    buffer['id'],
+                    state=state,
+                    finished_at=time.time(),
+                    send_ms=round(flush['send_ms'], 3),
+                    latency_ms=round(flush['latency_ms'], 3),
+                    result={
+                        k: result.get(k)
+                        for k in (
+                            'success',
+                            'status_code',
+                            'error',
+                            'response_text',
+                            'compression',
+                        )
+                    },
+                )
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------ control
+
+    def flush(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Send every buffered batch now
+
+        Returns:
+            True if everything was sent before the timeout (always True without wait)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            for key in list(self._buffers):
+                self._take(key, 'manual')
+            if self._ready:
+                self._ensure_workers()
+            if not wait:
+                return True
+            while self._ready or self._sending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush everything that is buffered and stop the sender threads
+        """
+        self.flush(wait=True, timeout=timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join(timeout)
+
+    def status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the status of a batch, or None if the ID is unknown
+
+        The ``state`` field is one of: buffering, queued, sending, delivered or failed.
+        """
+        with self._cond:
+            entry = self._statuses.get(batch_id)
+            return dict(entry) if entry is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Buffer sizes, counters and per-flush batch size and latency statistics
+        """
+        with self._cond:
+            flushes = list(self._flushes)
+            sizes = [f['events'] for f in flushes]
+            latencies = [f['latency_ms'] for f in flushes]
+            send_times = [f['send_ms'] for f in flushes]
+            return {
+                'max_events': self.max_events,
+                'max_bytes': self.max_bytes,
+                'max_delay_ms': self.max_delay_ms,
+                'destinations': len(self._buffers),
+                'buffered_events': sum(
+                    len(b['events']) for b in self._buffers.values()
+                ),
+                'queued_batches': len(self._ready),
+                'sending': self._sending,
+                **self._counters,
+                'batch_size': {
+                    'mean': round(sum(sizes) / len(sizes), 3) if sizes else None,
+                    'max': max(sizes) if sizes else None,
+                    'last': sizes[-1] if sizes else None,
+                },
+                'latency_ms': {
+                    'p50': _percentile(latencies, 0.5),
+                    'p95': _percentile(latencies, 0.95),
+                    'max': round(max(latencies), 3) if latencies else None,
+                },
+                'send_ms': {
+                    'p50': _percentile(send_times, 0.5),
+                    'p95': _percentile(send_times, 0.95),
+                },
+            }
+
+
+_aggregator: Optional[EventAggregator] = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator() -> EventAggregator:
+    """
+    Return the process-wide event aggregator
+
+    Defaults can be overridden with ``WEBHOOK_BATCH_MAX_EVENTS``,
+    ``WEBHOOK_BATCH_MAX_BYTES`` and ``WEBHOOK_BATCH_MAX_DELAY_MS``. Buffered
+    events are flushed when the interpreter exits.
+    """
+    global _aggregator
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = EventAggregator(
+                    max_events=_env_int('WEBHOOK_BATCH_MAX_EVENTS', 50),
+                    max_bytes=_env_int('WEBHOOK_BATCH_MAX_BYTES', 1024 * 1024),
+                    max_delay_ms=_env_int('WEBHOOK_BATCH_MAX_DELAY_MS', 1000),
+                )
+                atexit.register(_aggregator.close, 10.0)
+    return _aggregator
+
+
+def get_batch_status(batch_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up the status of a batch without starting the aggregator
+    """
+    return _aggregator.status(batch_id) if _aggregator is not None else None
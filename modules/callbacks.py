@@ -0,0 +1,268 @@
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .delay import get_delay_engine
+from .log import fields, get_logger
+
+logger = get_logger("WebhookCallback")
+
+CALLBACK_ROUTE = "/webhook/callback"
+SIGNATURE_HEADER = "X-Webhook-Signature"
+TIMEOUT_ACTIONS = ("error", "continue")
+
+
+class CallbackTimeout(Exception):
+    """Raised when no callback arrived before the timeout"""
+
+
+class _Callback:
+    __slots__ = (
+        'token',
+        'event',
+        'payload',
+        'resolved_at',
+        'created_at',
+        'expires_at',
+        'label',
+    )
+
+    def __init__(self, token: str, ttl: float, label: str):
+        self.token = token
+        self.event = threading.Event()
+        self.payload: Any = None
+        self.resolved_at: Optional[float] = None
+        self.created_at = time.time()
+        self.expires_at = time.monotonic() + ttl
+        self.label = label
+
+
+class CallbackRegistry:
+    """
+    One-shot callback tokens a node can block on until an external system POSTs back
+
+    ``register`` hands out an unguessable token; the server route calls
+    ``resolve`` with the posted body, which wakes the waiting node through
+    its Event. Nothing polls: a waiting node costs one Event and the inbound
+    POST is handled on the server's event loop without a thread of its own.
+    """
+
+    def __init__(self, ttl: float = 86400.0):
+        """
+        Args:
+            ttl: Seconds an unused token stays valid
+        """
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._callbacks: Dict[str, _Callback] = {}
+        self._counters = {
+            'registered': 0,
+            'resolved': 0,
+            'timeouts': 0,
+            'rejected': 0,
+            'expired': 0,
+        }
+
+    def _prune_locked(self, now: float) -> None:
+        for token in [t for t, c in self._callbacks.items() if c.expires_at <= now]:
+            del self._callbacks[token]
+            self._counters['expired'] += 1
+
+    def register(self, ttl: Optional[float] = None, label: str = "") -> str:
+        """
+        Create a token for one callback
+
+        Args:
+            ttl: Seconds the token stays valid (defaults to the registry's ttl)
+            label: Shown in stats, e.g. the node or prompt waiting on it
+
+        Returns:
+            The token
+        """
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            self._prune_locked(time.monotonic())
+            self._callbacks[token] = _Callback(
+                token, self.ttl if ttl is None else ttl, label
+            )
+            self._counters['registered'] += 1
+        return token
+
+    def state(self, token: str) -> str:
+        """
+        Look a token up without spending it
+
+        Returns:
+            "pending", "used" or "unknown"
+        """
+        with self._lock:
+            callback = self._callbacks.get(token)
+            if callback is None or callback.expires_at <= time.monotonic():
+                return "unknown"
+            return "pending" if callback.resolved_at is None else "used"
+
+    def resolve(self, token: str, payload: Any) -> Tuple[bool, str]:
+        """
+        Deliver the body posted to a token's callback URL
+
+        Returns:
+            (accepted, reason); a token accepts exactly one callback
+        """
+        with self._lock:
+            callback = self._callbacks.get(token)
+            if callback is None or callback.expires_at <= time.monotonic():
+                self._counters['rejected'] += 1
+                return False, "unknown"
+            if callback.resolved_at is not None:
+                self._counters['rejected'] += 1
+                return False, "used"
+            callback.payload = payload
+            callback.resolved_at = time.time()
+            self._counters['resolved'] += 1
+        callback.event.set()
+        logger.info(
+            "Callback received for %s",
+            callback.label or "token",
+            extra=fields(
+                label=callback.label,
+                waited_s=round(callback.resolved_at - callback.created_at, 3),
+            ),
+        )
+        return True, "accepted"
+
+    def wait(
+        self,
+        token: str,
+        timeout: float,
+        progress: Optional[Callable[[int], Any]] = None,
+    ) -> Any:
+        """
+        Block until the callback arrives, the timeout passes or ComfyUI is interrupted
+
+        Returns:
+            The posted payload
+
+        Raises:
+            KeyError: If the token is unknown
+            CallbackTimeout: If nothing was posted in time
+            InterruptProcessingException: ComfyUI's interrupt was triggered
+        """
+        with self._lock:
+            callback = self._callbacks.get(token)
+        if callback is None:
+            raise KeyError(token)
+        engine = get_delay_engine()
+        deadline = time.monotonic() + timeout
+        try:
+            # The engine also sets the event to deliver an interrupt, and returns
+            # without raising when that interrupt was already cleared, so keep
+            # waiting until the callback really arrived or the time is up
+            while callback.resolved_at is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                callback.event.clear()
+                if callback.resolved_at is not None:
+                    break
+                engine.wait(remaining, progress, event=callback.event)
+                # Keep the first progress bar rather than restarting it
+                progress = None
+            with self._lock:
+                if callback.resolved_at is None:
+                    self._counters['timeouts'] += 1
+                    raise CallbackTimeout(f"No callback within {timeout:g}s")
+                return callback.payload
+        finally:
+            # One-shot: whatever happened, the token is spent
+            with self._lock:
+                self._callbacks.pop(token, None)
+
+    def cancel(self, token: str) -> None:
+        with self._lock:
+            self._callbacks.pop(token, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune_locked(time.monotonic())
+            return {
+                'pending': sum(
+                    1 for c in self._callbacks.values() if c.resolved_at is None
+                ),
+                'waiting': [
+                    {'label': c.label, 'since': c.created_at}
+                    for c in self._callbacks.values()
+                    if c.resolved_at is None
+                ],
+                **self._counters,
+            }
+
+
+def callback_url(token: str, base_url: str = "") -> str:
+    """
+    URL an external system POSTs to for ``token``
+
+    Args:
+        token: Token from CallbackRegistry.register
+        base_url: Address of this ComfyUI server as seen by the external system
+            (default ``WEBHOOK_CALLBACK_BASE_URL``, else http://127.0.0.1:8188)
+    """
+    base_url = (
+        base_url
+        or os.environ.get('WEBHOOK_CALLBACK_BASE_URL')
+        or "http://127.0.0.1:8188"
+    ).rstrip('/')
+    return f"{base_url}{CALLBACK_ROUTE}/{token}"
+
+
+def callback_secret() -> Optional[str]:
+    """
+    Shared secret callbacks must be signed with (``WEBHOOK_CALLBACK_SECRET``), if any
+    """
+    return os.environ.get('WEBHOOK_CALLBACK_SECRET') or None
+
+
+def sign_callback(body: bytes, secret: str) -> str:
+    """
+    Signature header value for a callback body: ``sha256=<hex HMAC of the body>``
+    """
+    digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_callback(body: bytes, signature: Optional[str], secret: str) -> bool:
+    """
+    Check a callback's signature header against the shared secret
+    """
+    if not signature:
+        return False
+    return hmac.compare_digest(signature.strip(), sign_callback(body, secret))
+
+
+_registry: Optional[CallbackRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_callback_registry() -> CallbackRegistry:
+    """
+    Return the process-wide callback registry
+
+    Tokens stay valid for ``WEBHOOK_CALLBACK_TTL`` seconds (default one day).
+    """
+    global _registry
+    if _registry is None:
+        from .webhook_sender import _env_float
+
+        with _registry_lock:
+            if _registry is None:
+                _registry = CallbackRegistry(
+                    ttl=_env_float('WEBHOOK_CALLBACK_TTL', 86400.0)
+                )
+    return _registry
+
+
+def get_callback_stats() -> Dict[str, Any]:
+    return get_callback_registry().stats()
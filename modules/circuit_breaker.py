@@ -0,0 +1,406 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .log import fields, get_logger
+
+logger = get_logger("CircuitBreaker")
+
+CIRCUIT_FALLBACKS = ("fail", "outbox", "fallback_url")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def circuit_key(url: str) -> str:
+    """
+    Breakers are kept per endpoint: scheme, host and path (the query string is ignored)
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc.lower()}{parts.path or '/'}"
+
+
+def is_endpoint_failure(result: Dict) -> bool:
+    """
+    True if a result means the endpoint itself is unhealthy
+
+    Connection errors, timeouts and 5xx responses count; 4xx responses
+    (including 429, which the rate limiter handles) mean the endpoint is up.
+    """
+    status_code = result.get('status_code')
+    return status_code is None or status_code >= 500
+
+
+def set_fallback(request: Dict, mode: str = "fail", url: str = "") -> Dict:
+    """
+    Tell deliver_request what to do with a request while its endpoint's circuit is open
+
+    Args:
+        request: Request dict built by build_request
+        mode: "fail" returns an error right away, "outbox" stores the request
+            in the durable outbox, "fallback_url" sends it to ``url`` instead
+        url: Secondary endpoint for "fallback_url"
+
+    Returns:
+        The same request dict
+    """
+    if mode not in CIRCUIT_FALLBACKS:
+        raise ValueError(f"Unsupported circuit fallback: {mode}")
+    if mode == "fallback_url" and not url.strip():
+        raise ValueError(
+            "A fallback URL is required for the fallback_url circuit fallback"
+        )
+    if mode == "fail":
+        request.pop('fallback', None)
+    else:
+        request['fallback'] = {'mode': mode, 'url': url.strip()}
+    return request
+
+
+class _Circuit:
+    def __init__(self, key: str, probe_url: str):
+        self.key = key
+        self.probe_url = probe_url
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = 0.0
+        self.retry_at = 0.0
+        self.trial_in_flight = False
+        self.last_error: Optional[str] = None
+        self.counters = {'opened': 0, 'rejected': 0, 'probes': 0}
+        self.transitions = deque(maxlen=20)
+
+
+class CircuitBreakerRegistry:
+    """
+    Per-endpoint circuit breakers shared by every webhook node
+
+    A circuit opens after ``failure_threshold`` consecutive failures; while
+    it is open requests fail fast (or go to their fallback) instead of
+    waiting for the timeout. Once the reset timeout has passed the circuit
+    is half-open: a background probe (or the next request) tries the
+    endpoint once, closing the circuit on success and reopening it with a
+    doubled reset timeout on failure.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        max_reset_timeout: float = 300.0,
+        probe: bool = True,
+        probe_timeout: float = 5.0,
+        probe_fn: Optional[Callable[[str, float], Optional[int]]] = None,
+    ):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open a circuit (0 disables
+                the breakers)
+            reset_timeout: Seconds a circuit stays open before it is tried again
+            max_reset_timeout: Upper bound of the reset timeout after repeated
+                failed trials
+            probe: Probe open circuits from a background thread
+            probe_timeout: Timeout of a probe request in seconds
+            probe_fn: Function sending a probe to a URL and returning its status
+                code (None if unreachable); defaults to a HEAD request
+        """
+        self.failure_threshold = max(0, int(failure_threshold))
+        self.reset_timeout = max(0.1, float(reset_timeout))
+        self.max_reset_timeout = max(self.reset_timeout, float(max_reset_timeout))
+        self.probe = probe
+        self.probe_timeout = float(probe_timeout)
+        self.probe_fn = probe_fn or self._head_probe
+        self._cond = threading.Condition()
+        self._circuits: Dict[str, _Circuit] = {}
+        self._prober: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def _circuit(self, url: str) -> _Circuit:
+        # Caller must hold self._cond
+        key = circuit_key(url)
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = _Circuit(key, url)
+            self._circuits[key] = circuit
+        return circuit
+
+    def _transition(self, circuit: _Circuit, state: str, reason: str) -> Dict[str, Any]:
+        transition = {
+            'from': circuit.state,
+            'to': state,
+            'reason': reason,
+            'at': time.time(),
+        }
+        # Opening is worth a warning; recovering and probing are routine
+        (logger.warning if state == OPEN else logger.info)(
+            "%s: %s -> %s (%s)",
+            circuit.key,
+            circuit.state,
+            state,
+            reason,
+            extra=fields(
+                endpoint=circuit.key,
+                circuit_from=circuit.state,
+                circuit_to=state,
+                reason=reason,
+            ),
+        )
+        circuit.state = state
+        circuit.transitions.append(transition)
+        return transition
+
+    def _open(self, circuit: _Circuit, reason: str) -> Dict[str, Any]:
+        if circuit.state == HALF_OPEN:
+            circuit.reset_timeout = min(
+                self.max_reset_timeout, circuit.reset_timeout * 2
+            )
+        else:
+            circuit.reset_timeout = self.reset_timeout
+        circuit.retry_at = time.monotonic() + circuit.reset_timeout
+        circuit.trial_in_flight = False
+        circuit.counters['opened'] += 1
+        transition = self._transition(circuit, OPEN, reason)
+        if self.probe:
+            self._start_prober()
+        self._cond.notify_all()
+        return transition
+
+    def before_request(self, url: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Decide whether a request to ``url`` may be sent
+
+        Returns:
+            (allowed, circuit info). The info is None while the circuit is
+            closed; when the request is rejected it describes the open circuit.
+        """
+        if not self.enabled:
+            return True, None
+        with self._cond:
+            circuit = self._circuit(url)
+            if circuit.state == CLOSED:
+                return True, None
+            transitions = []
+            if circuit.state == OPEN and time.monotonic() >= circuit.retry_at:
+                transitions.append(
+                    self._transition(circuit, HALF_OPEN, "reset timeout elapsed")
+                )
+            if circuit.state == HALF_OPEN and not circuit.trial_in_flight:
+                # This request is the trial
+                circuit.trial_in_flight = True
+                return True, self._info(circuit, transitions)
+            circuit.counters['rejected'] += 1
+            return False, self._info(circuit, transitions)
+
+    def after_request(
+        self, url: str, failed: bool, error: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record the outcome of a request allowed by before_request
+
+        Returns:
+            Circuit info if the request changed the circuit's state or the
+            circuit is not closed, otherwise None
+        """
+        if not self.enabled:
+            return None
+        with self._cond:
+            circuit = self._circuit(url)
+            transitions = []
+            if failed:
+                circuit.last_error = error
+                circuit.failures += 1
+                if circuit.state == HALF_OPEN:
+                    transitions.append(
+                        self._open(circuit, f"trial request failed: {error}")
+                    )
+                elif (
+                    circuit.state == CLOSED
+                    and circuit.failures >= self.failure_threshold
+                ):
+                    transitions.append(
+                        self._open(circuit, f"{circuit.failures} consecutive failures")
+                    )
+            else:
+                circuit.failures = 0
+                circuit.last_error = None
+                if circuit.state != CLOSED:
+                    circuit.trial_in_flight = False
+                    transitions.append(
+                        self._transition(circuit, CLOSED, "request succeeded")
+                    )
+            if not transitions and circuit.state == CLOSED:
+                return None
+            return self._info(circuit, transitions)
+
+    def cancel_request(self, url: str) -> None:
+        """
+        Forget a request allowed by before_request that was never sent
+        """
+        if not self.enabled:
+            return
+        with self._cond:
+            circuit = self._circuit(url)
+            if circuit.state == HALF_OPEN:
+                circuit.trial_in_flight = False
+
+    def _info(
+        self, circuit: _Circuit, transitions: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        info = {
+            'endpoint': circuit.key,
+            'state': circuit.state,
+            'failures': circuit.failures,
+        }
+        if circuit.state != CLOSED:
+            info['retry_in'] = round(max(0.0, circuit.retry_at - time.monotonic()), 3)
+        if transitions:
+            info['transitions'] = [
+                {k: t[k] for k in ('from', 'to', 'reason')} for t in transitions
+            ]
+        return info
+
+    # ------------------------------------------------------------------ probing
+
+    def _head_probe(self, url: str, timeout: float) -> Optional[int]:
+        from .webhook_sender import get_http_client
+
+        try:
+            return get_http_client().request('HEAD', url, timeout=timeout).status_code
+        except Exception:
+            return None
+
+    def _start_prober(self) -> None:
+        # Caller must hold self._cond
+        if self._prober is None or not self._prober.is_alive():
+            self._prober = threading.Thread(
+                target=self._probe_loop, name='webhook-circuit-probe', daemon=True
+            )
+            self._prober.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            with self._cond:
+                due = None
+                while due is None:
+                    now = time.monotonic()
+                    waiting = [c for c in self._circuits.values() if c.state == OPEN]
+                    if not waiting:
+                        self._prober = None
+                        return
+                    circuit = min(waiting, key=lambda c: c.retry_at)
+                    if circuit.retry_at <= now:
+                        due = circuit
+                        self._transition(circuit, HALF_OPEN, "probing")
+                        circuit.trial_in_flight = True
+                        circuit.counters['probes'] += 1
+                    else:
+                        self._cond.wait(circuit.retry_at - now)
+            status_code = self.probe_fn(due.probe_url, self.probe_timeout)
+            if status_code is not None and 400 <= status_code < 500:
+                # Many endpoints refuse HEAD (405) or want credentials the probe
+                # lacks, which says nothing about their health: leave the circuit
+                # half-open so the next real request is the trial
+                with self._cond:
+                    if due.state == HALF_OPEN:
+                        due.trial_in_flight = False
+                continue
+            # Only a 2xx/3xx answer means the endpoint has recovered
+            failed = status_code is None or status_code >= 400
+            self.after_request(
+                due.probe_url,
+                failed,
+                (
+                    f"probe returned {status_code}"
+                    if status_code is not None
+                    else "probe failed"
+                ),
+            )
+
+    # ------------------------------------------------------------------ inspection
+
+    def reset(self, url: Optional[str] = None) -> None:
+        """
+        Close the circuit of ``url`` (or every circuit)
+        """
+        with self._cond:
+            if url is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(circuit_key(url), None)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        State, failure count and recent transitions of every endpoint seen so far
+        """
+        now = time.monotonic()
+        with self._cond:
+            circuits = {}
+            for key, circuit in self._circuits.items():
+                circuits[key] = {
+                    'state': circuit.state,
+                    'failures': circuit.failures,
+                    'last_error': circuit.last_error,
+                    'retry_in': (
+                        round(max(0.0, circuit.retry_at - now), 3)
+                        if circuit.state == OPEN
+                        else None
+                    ),
+                    **circuit.counters,
+                    'transitions': list(circuit.transitions),
+                }
+            return {
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'max_reset_timeout': self.max_reset_timeout,
+                'open': sum(1 for c in self._circuits.values() if c.state != CLOSED),
+                'circuits': circuits,
+            }
+
+
+_breakers: Optional[CircuitBreakerRegistry] = None
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    """
+    Return the process-wide circuit breakers
+
+    Settings can be overridden with ``WEBHOOK_CIRCUIT_FAILURES`` (0 turns the
+    breakers off), ``WEBHOOK_CIRCUIT_RESET``, ``WEBHOOK_CIRCUIT_MAX_RESET``
+    (seconds) and ``WEBHOOK_CIRCUIT_PROBE`` (0 waits for a real request
+    instead of probing in the background).
+    """
+    global _breakers
+    if _breakers is None:
+        from .webhook_sender import _env_float, _env_int
+
+        with _breakers_lock:
+            if _breakers is None:
+                _breakers = CircuitBreakerRegistry(
+                    failure_threshold=_env_int('WEBHOOK_CIRCUIT_FAILURES', 3),
+                    reset_timeout=_env_float('WEBHOOK_CIRCUIT_RESET', 30.0),
+                    max_reset_timeout=_env_float('WEBHOOK_CIRCUIT_MAX_RESET', 300.0),
+                    probe=_env_int('WEBHOOK_CIRCUIT_PROBE', 1) != 0,
+                )
+    return _breakers
+
+
+def configure_circuit_breakers(**settings) -> CircuitBreakerRegistry:
+    """
+    Replace the process-wide circuit breakers (see CircuitBreakerRegistry for settings)
+    """
+    global _breakers
+    with _breakers_lock:
+        _breakers = CircuitBreakerRegistry(**settings)
+    return _breakers
+
+
+def get_circuit_stats() -> Dict[str, Any]:
+    return get_circuit_breakers().stats()
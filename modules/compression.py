@@ -0,0 +1,263 @@
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSION_CODECS = ("off", "gzip", "zstd", "br")
+
+# Codec -> (default level, min level, max level)
+_LEVELS = {
+    'gzip': (6, 1, 9),
+    'zstd': (3, 1, 22),
+    'br': (5, 0, 11),
+}
+
+
+def compression_level(codec: str, level: Optional[int]) -> int:
+    """
+    Clamp a level into the codec's range (None or 0 picks the codec default)
+    """
+    default, low, high = _LEVELS[codec]
+    if not level:
+        return default
+    return max(low, min(high, int(level)))
+
+
+def available_codecs():
+    """
+    Codecs whose library is installed
+    """
+    return ['gzip'] + [
+        name
+        for name, module in (('zstd', zstandard), ('br', brotli))
+        if module is not None
+    ]
+
+
+class _Compressor:
+    """
+    Incremental compressor with the same interface for every codec
+    """
+
+    def __init__(self, codec: str, level: int):
+        if codec == 'gzip':
+            # wbits 31 writes a gzip header and trailer
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self._finish = self._obj.flush
+        elif codec == 'zstd':
+            if zstandard is None:
+                raise ValueError("zstd compression requires the zstandard package")
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+            self._finish = self._obj.flush
+        elif codec == 'br':
+            if brotli is None:
+                raise ValueError("Brotli compression requires the brotli package")
+            self._obj = brotli.Compressor(quality=level)
+            self._finish = self._obj.finish
+        else:
+            raise ValueError(f"Unsupported compression codec: {codec}")
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def compress(self, chunk: Any) -> bytes:
+        start = time.perf_counter()
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        self.bytes_in += memoryview(chunk).nbytes
+        out = (
+            self._obj.process(chunk)
+            if hasattr(self._obj, 'process')
+            else self._obj.compress(chunk)
+        )
+        self.seconds += time.perf_counter() - start
+        self.bytes_out += len(out)
+        return out
+
+    def finish(self) -> bytes:
+        start = time.perf_counter()
+        out = self._finish()
+        self.seconds += time.perf_counter() - start
+        self.bytes_out += len(out)
+        return out
+
+    def info(self, codec: str, level: int) -> Dict[str, Any]:
+        return {
+            'codec': codec,
+            'level': level,
+            'original_bytes': self.bytes_in,
+            'compressed_bytes': self.bytes_out,
+            'ratio': (
+                round(self.bytes_in / self.bytes_out, 3) if self.bytes_out else None
+            ),
+            'compress_ms': round(self.seconds * 1000.0, 3),
+        }
+
+
+def _body_chunks(body: Any) -> Iterator[Any]:
+    if body is None:
+        return
+    if isinstance(body, (bytes, bytearray, memoryview, str)):
+        yield body
+    else:
+        yield from body
+
+
+def _is_single_use(body: Any) -> bool:
+    # Iterables without a length (generators, streaming multipart bodies) can't be
+    # read twice
+    return (
+        body is not None
+        and not isinstance(body, (bytes, bytearray, memoryview, str))
+        and not hasattr(body, '__len__')
+    )
+
+
+_unsupported_hosts = set()
+_unsupported_lock = threading.Lock()
+
+
+def mark_unsupported(url: str) -> None:
+    """
+    Remember that a host rejected compressed bodies (HTTP 415)
+    """
+    with _unsupported_lock:
+        _unsupported_hosts.add(urlsplit(url).netloc)
+
+
+def is_unsupported(url: str) -> bool:
+    with _unsupported_lock:
+        return urlsplit(url).netloc in _unsupported_hosts
+
+
+def set_compression(
+    request: Dict,
+    codec: str = "off",
+    level: Optional[int] = None,
+    min_bytes: int = 1024,
+) -> Dict:
+    """
+    Ask deliver_request to compress a request's body
+
+    The body is compressed when it is sent, so for async and outbox
+    deliveries the work happens on the delivery threads rather than the
+    ComfyUI executor thread. Sync deliveries compress on the executor
+    thread, which waits for the response anyway.
+
+    Args:
+        request: Request dict built by build_request
+        codec: "off", "gzip", "zstd" or "br"
+        level: Compression level (None or 0 for the codec default)
+        min_bytes: Bodies smaller than this are sent uncompressed
+
+    Returns:
+        The same request dict
+    """
+    if codec not in COMPRESSION_CODECS:
+        raise ValueError(f"Unsupported compression codec: {codec}")
+    if codec == "off":
+        request.pop('compression', None)
+        return request
+    # Fail early if the codec is missing
+    _Compressor(codec, compression_level(codec, level))
+    request['compression'] = {
+        'codec': codec,
+        'level': compression_level(codec, level),
+        'min_bytes': max(0, int(min_bytes)),
+    }
+    return request
+
+
+def compress_request(request: Dict) -> Tuple[Dict, Dict, Optional[Dict]]:
+    """
+    Build the body and headers to send for a request with compression enabled
+
+    Returns:
+        (body keyword arguments for requests, headers, compression info or
+        None if the body was left uncompressed, e.g. because compressing it
+        did not make it smaller)
+    """
+    settings = request['compression']
+    headers = dict(request.get('headers') or {})
+    body_kwargs = dict(request.get('body') or {})
+    if any(name.lower() == 'content-encoding' for name in headers) or is_unsupported(
+        request['url']
+    ):
+        return body_kwargs, headers, None
+
+    # Let requests encode the body (form fields, files, JSON) exactly as it would
+    # have sent it
+    prepared = requests.Request(
+        request['method'], request['url'], headers=headers, **body_kwargs
+    ).prepare()
+    body = prepared.body
+    headers = dict(prepared.headers)
+    for name in ('Content-Length', 'Transfer-Encoding'):
+        headers.pop(name, None)
+
+    codec, level = settings['codec'], settings['level']
+    compressor = _Compressor(codec, level)
+    headers['Content-Encoding'] = codec
+
+    if _is_single_use(body):
+        # Streaming body: compress each chunk as it is produced
+        def stream():
+            for chunk in body:
+                out = compressor.compress(chunk)
+                if out:
+                    yield out
+            yield compressor.finish()
+
+        return (
+            {'data': stream()},
+            headers,
+            {
+                'codec': codec,
+                'level': level,
+                'streaming': True,
+                'compressor': compressor,
+            },
+        )
+
+    size = sum(
+        memoryview(chunk.encode('utf-8') if isinstance(chunk, str) else chunk).nbytes
+        for chunk in _body_chunks(body)
+    )
+    if size < settings['min_bytes']:
+        del headers['Content-Encoding']
+        return body_kwargs, dict(request.get('headers') or {}), None
+
+    parts = [compressor.compress(chunk) for chunk in _body_chunks(body)]
+    parts.append(compressor.finish())
+    if compressor.bytes_out >= size:
+        # Already compressed content (PNG, WebP, ...) only grows: send the original
+        return body_kwargs, dict(request.get('headers') or {}), None
+    return {'data': b''.join(parts)}, headers, compressor.info(codec, level)
+
+
+def compression_summary(info: Optional[Dict]) -> Optional[Dict]:
+    """
+    Final statistics for a compression info dict
+
+    Streaming bodies are only measured once they have been sent.
+    """
+    if info is None:
+        return None
+    compressor = info.get('compressor')
+    if compressor is not None:
+        return dict(compressor.info(info['codec'], info['level']), streaming=True)
+    return info
@@ -0,0 +1,251 @@
+import threading
+import time
+from typing import Any, Callable, Optional, Set
+
+from .log import get_logger
+
+logger = get_logger("Delay")
+
+
+class DelayInterrupted(Exception):
+    """
+    Raised when a delay is cancelled outside ComfyUI
+
+    Inside ComfyUI, its own interrupt exception is raised instead.
+    """
+
+
+def _model_management():
+    try:
+        import comfy.model_management as model_management
+    except ImportError:
+        return None
+    return model_management
+
+
+class DelayEngine:
+    """
+    Process-wide engine behind the Delay nodes
+
+    A delay blocks on a threading.Event instead of sleeping in slices, so it
+    costs no CPU while waiting and ends the moment ComfyUI's interrupt is
+    pressed (the engine wraps ``comfy.model_management.interrupt_current_processing``
+    to wake every waiter). Progress is reported at most ``max_updates`` times
+    per delay and never more often than every ``min_interval`` seconds.
+    """
+
+    def __init__(self, max_updates: int = 100, min_interval: float = 0.5):
+        """
+        Args:
+            max_updates: Progress updates per delay, however long it is
+            min_interval: Minimum seconds between two progress updates
+        """
+        self.max_updates = max(1, int(max_updates))
+        self.min_interval = max(0.0, float(min_interval))
+        self._lock = threading.Lock()
+        self._waiters: Set[threading.Event] = set()
+        self._generation = 0
+        self._hooked = False
+
+    # ------------------------------------------------------------------ interrupts
+
+    def install_interrupt_hook(self) -> bool:
+        """
+        Wake waiting delays when ComfyUI's interrupt is triggered
+
+        Returns:
+            True if ComfyUI's model management is available and hooked
+        """
+        model_management = _model_management()
+        if model_management is None or not hasattr(
+            model_management, 'interrupt_current_processing'
+        ):
+            return False
+        with self._lock:
+            if self._hooked:
+                return True
+            original = model_management.interrupt_current_processing
+            engine = self
+
+            def interrupt_current_processing(value=True, *args, **kwargs):
+                result = original(value, *args, **kwargs)
+                if value:
+                    engine.interrupt()
+                return result
+
+            interrupt_current_processing._webhook_delay_hook = True
+            if not getattr(original, '_webhook_delay_hook', False):
+                model_management.interrupt_current_processing = (
+                    interrupt_current_processing
+                )
+            self._hooked = True
+        return True
+
+    def interrupt(self) -> None:
+        """
+        Wake every waiting delay so it can check whether it was interrupted
+        """
+        with self._lock:
+            waiters = list(self._waiters)
+        for event in waiters:
+            event.set()
+
+    def cancel_all(self) -> None:
+        """
+        End every waiting delay with DelayInterrupted (e.g. on shutdown)
+        """
+        with self._lock:
+            self._generation += 1
+            waiters = list(self._waiters)
+        if waiters:
+            logger.info("Cancelling %d waiting delay(s)", len(waiters))
+        for event in waiters:
+            event.set()
+
+    @staticmethod
+    def _interrupted() -> bool:
+        model_management = _model_management()
+        if model_management is None:
+            return False
+        check = getattr(model_management, 'processing_interrupted', None)
+        if check is not None:
+            return bool(check())
+        return bool(getattr(model_management, 'interrupt_processing', False))
+
+    def _raise_if_interrupted(self, generation: int) -> None:
+        if self._interrupted():
+            model_management = _model_management()
+            # Raises ComfyUI's InterruptProcessingException and clears the flag,
+            # like any other node
+            model_management.throw_exception_if_processing_interrupted()
+        if self._generation != generation:
+            raise DelayInterrupted("Delay cancelled")
+
+    # ------------------------------------------------------------------ waiting
+
+    def progress_interval(self, seconds: float) -> float:
+        """
+        Seconds between progress updates for a delay of ``seconds``
+        """
+        return max(seconds / self.max_updates, self.min_interval)
+
+    def wait(
+        self,
+        seconds: float,
+        progress: Optional[Callable[[int], Any]] = None,
+        event: Optional[threading.Event] = None,
+    ) -> float:
+        """
+        Block for ``seconds``, until ``event`` is set, or until ComfyUI is interrupted
+
+        Args:
+            seconds: Delay length
+            progress: Factory of a progress bar taking the total step count
+                (e.g. comfy.utils.ProgressBar); None shows no progress
+            event: Optional event that ends the wait early when set. The
+                engine also sets it to deliver an interrupt, so callers should
+                check their own state rather than the event after returning
+
+        Returns:
+            Seconds actually waited
+
+        Raises:
+            InterruptProcessingException: ComfyUI's interrupt was triggered
+            DelayInterrupted: The engine was cancelled (or interrupted outside ComfyUI)
+        """
+        self.install_interrupt_hook()
+        seconds = max(0.0, float(seconds))
+        wake = event or threading.Event()
+        with self._lock:
+            generation = self._generation
+            self._waiters.add(wake)
+
+        start = time.monotonic()
+        deadline = start + seconds
+        interval = self.progress_interval(seconds) if progress is not None else None
+        steps = max(1, int(round(seconds / interval))) if interval else 0
+        bar = progress(steps) if steps else None
+        reported = 0
+        try:
+            self._raise_if_interrupted(generation)
+            while True:
+                now = time.monotonic()
+                remaining = deadline - now
+                if remaining <= 0:
+                    break
+                timeout = remaining
+                if bar is not None:
+                    # Sleep until the next progress step is due
+                    timeout = min(remaining, start + (reported + 1) * interval - now)
+                if wake.wait(max(0.0, timeout)):
+                    self._raise_if_interrupted(generation)
+                    if event is not None:
+                        break
+                    # Woken by an interrupt that was already cleared: keep waiting
+                    wake.clear()
+                if bar is not None:
+                    due = min(steps, int((time.monotonic() - start) / interval))
+                    if due > reported:
+                        reported = due
+                        bar.update_absolute(reported, steps)
+        finally:
+            with self._lock:
+                self._waiters.discard(wake)
+        if bar is not None and reported < steps and time.monotonic() >= deadline:
+            bar.update_absolute(steps, steps)
+        return time.monotonic() - start
+
+    def waiting(self) -> int:
+        with self._lock:
+            return len(self._waiters)
+
+
+_engine: Optional[DelayEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_delay_engine() -> DelayEngine:
+    """
+    Return the process-wide delay engine
+
+    The progress cap can be changed with ``WEBHOOK_DELAY_PROGRESS_UPDATES``
+    (updates per delay, default 100) and ``WEBHOOK_DELAY_PROGRESS_INTERVAL``
+    (minimum seconds between updates, default 0.5).
+    """
+    global _engine
+    if _engine is None:
+        from .webhook_sender import _env_float, _env_int
+
+        with _engine_lock:
+            if _engine is None:
+                _engine = DelayEngine(
+                    max_updates=_env_int('WEBHOOK_DELAY_PROGRESS_UPDATES', 100),
+                    min_interval=_env_float('WEBHOOK_DELAY_PROGRESS_INTERVAL', 0.5),
+                )
+    return _engine
+
+
+def run_delay(
+    seconds: float,
+    progress: Optional[Callable[[int], Any]] = None,
+    source: str = "Delay",
+) -> str:
+    """
+    Wait ``seconds`` on the shared engine and describe the outcome like the Delay nodes
+
+    Returns:
+        Status text
+
+    Raises:
+        ValueError: If ``seconds`` is negative
+        InterruptProcessingException: ComfyUI's interrupt was triggered
+    """
+    if seconds < 0:
+        raise ValueError("Delay time cannot be negative")
+    if seconds == 0:
+        return "No delay (0 seconds)"
+    log = get_logger(source)
+    log.info("Starting delay of %s seconds...", seconds)
+    waited = get_delay_engine().wait(seconds, progress)
+    log.info("Delay completed (%s seconds, waited %.3f)", seconds, waited)
+    return f"Delay completed ({seconds} seconds)"
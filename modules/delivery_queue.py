@@ -0,0 +1,435 @@
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from .log import fields, get_logger
+from .webhook_sender import deliver_request, get_data_directory, _env_float, _env_int
+
+logger = get_logger("DeliveryDispatcher")
+
+BACKPRESSURE_MODES = ("block", "drop_oldest", "spill")
+
+
+class DeliveryDispatcher:
+    """
+    Background worker pool that delivers webhook requests off the executor thread
+
+    Requests are plain dicts built by ``build_request``. ``submit`` returns a
+    delivery ID immediately; the outcome can be looked up later with ``status``.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue: int = 100,
+        backpressure: str = "block",
+        spill_dir: Optional[str] = None,
+        block_timeout: Optional[float] = 30.0,
+        max_history: int = 10000,
+        send_fn: Callable[[Dict], Dict] = deliver_request,
+    ):
+        """
+        Args:
+            workers: Number of delivery threads
+            max_queue: Maximum number of requests held in memory
+            backpressure: What to do when the queue is full: "block",
+                "drop_oldest" or "spill" (write the request to disk)
+            spill_dir: Directory for spilled requests (default: the webhook
+                data directory)
+            block_timeout: Seconds a blocking submit waits for space before it
+                spills the request to disk instead (None waits forever)
+            max_history: Number of finished deliveries whose status is kept
+            send_fn: Function that sends one request dict and returns a result dict
+        """
+        if backpressure not in BACKPRESSURE_MODES:
+            raise ValueError(f"Unsupported backpressure mode: {backpressure}")
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.backpressure = backpressure
+        self.spill_dir = spill_dir
+        self.block_timeout = block_timeout
+        self.max_history = max(1, int(max_history))
+        self.send_fn = send_fn
+
+        self._cond = threading.Condition()
+        self._queue: deque = deque()
+        self._spilled: deque = deque()
+        self._statuses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._threads: List[threading.Thread] = []
+        self._in_flight = 0
+        self._spilling = 0
+        self._shutdown = False
+        self._counters = {
+            'submitted': 0,
+            'delivered': 0,
+            'failed': 0,
+            'dropped': 0,
+            'spilled': 0,
+        }
+
+        if self.spill_dir:
+            with self._cond:
+                self._recover_spilled()
+                if self._spilled:
+                    self._ensure_workers()
+
+    # ------------------------------------------------------------------ status
+
+    def _set_status(self, delivery_id: str, **fields) -> None:
+        # Caller must hold self._cond
+        entry = self._statuses.get(delivery_id)
+        if entry is None:
+            entry = {'id': delivery_id}
+            self._statuses[delivery_id] = entry
+        entry.update(fields)
+        while len(self._statuses) > self.max_history:
+            oldest_id, oldest = next(iter(self._statuses.items()))
+            if oldest.get('state') in ('queued', 'spilled', 'sending'):
+                break
+            self._statuses.pop(oldest_id)
+
+    def status(self, delivery_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the status of a delivery, or None if the ID is unknown
+
+        The ``state`` field is one of: queued, spilled, sending, delivered,
+        failed or dropped.
+        """
+        with self._cond:
+            entry = self._statuses.get(delivery_id)
+            return dict(entry) if entry is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth, in-flight count and lifetime counters
+        """
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'backpressure': self.backpressure,
+                'queued': len(self._queue),
+                'spilled_pending': len(self._spilled) + self._spilling,
+                'in_flight': self._in_flight,
+                **self._counters,
+            }
+
+    # ------------------------------------------------------------------ spill
+
+    def _spill_path(self, delivery_id: str) -> str:
+        return os.path.join(self.spill_dir, f"{time.time_ns():020d}-{delivery_id}.pkl")
+
+    def _spill(self, delivery_id: str, request: Dict) -> None:
+        # Called without self._cond (submit counted the request in self._spilling):
+        # pickling large image bodies must not stall the workers or other submits
+        try:
+            if not self.spill_dir:
+                self.spill_dir = get_data_directory('spill')
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = self._spill_path(delivery_id)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(request, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(
+                "Failed to spill request %s: %s",
+                delivery_id,
+                e,
+                extra=fields(delivery_id=delivery_id),
+            )
+            with self._cond:
+                self._spilling -= 1
+                self._set_status(
+                    delivery_id,
+                    state='failed',
+                    finished_at=time.time(),
+                    result={'success': False, 'error': f'Spill failed: {str(e)}'},
+                )
+                self._counters['failed'] += 1
+                self._cond.notify_all()
+            return
+        with self._cond:
+            self._spilling -= 1
+            self._spilled.append((delivery_id, path))
+            self._counters['spilled'] += 1
+            self._cond.notify_all()
+
+    def _recover_spilled(self) -> None:
+        if not os.path.isdir(self.spill_dir):
+            return
+        for name in sorted(os.listdir(self.spill_dir)):
+            if not name.endswith('.pkl'):
+                continue
+            delivery_id = name[:-4].split('-', 1)[-1]
+            self._spilled.append((delivery_id, os.path.join(self.spill_dir, name)))
+            self._set_status(delivery_id, state='spilled', url=None, submitted_at=None)
+
+    def _load_spilled(self):
+        # Caller must hold self._cond
+        delivery_id, path = self._spilled.popleft()
+        try:
+            with open(path, 'rb') as f:
+                request = pickle.load(f)
+            os.remove(path)
+        except Exception as e:
+            logger.error(
+                "Failed to load spilled request %s: %s",
+                delivery_id,
+                e,
+                extra=fields(delivery_id=delivery_id),
+            )
+            self._set_status(
+                delivery_id,
+                state='failed',
+                finished_at=time.time(),
+                result={'success': False, 'error': f'Spill file unreadable: {str(e)}'},
+            )
+            self._counters['failed'] += 1
+            return None
+        return delivery_id, request
+
+    # ------------------------------------------------------------------ queue
+
+    def _ensure_workers(self) -> None:
+        # Caller must hold self._cond
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"webhook-delivery-{len(self._threads)}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, request: Dict) -> str:
+        """
+        Queue a request for background delivery
+
+        Args:
+            request: Request dict built by build_request
+
+        Returns:
+            Delivery ID that can be passed to status()
+        """
+        delivery_id = uuid.uuid4().hex
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Delivery dispatcher has been shut down")
+            self._ensure_workers()
+            self._counters['submitted'] += 1
+            self._set_status(
+                delivery_id,
+                state='queued',
+                url=request.get('url'),
+                submitted_at=time.time(),
+            )
+
+            full = len(self._queue) >= self.max_queue
+            # Once anything is on disk, keep spilling so delivery stays FIFO
+            spill = bool(self._spilled or self._spilling) or (
+                full and self.backpressure == 'spill'
+            )
+            if spill:
+                pass
+            elif full and self.backpressure == 'drop_oldest':
+                dropped_id, _ = self._queue.popleft()
+                self._set_status(dropped_id, state='dropped', finished_at=time.time())
+                self._counters['dropped'] += 1
+                self._queue.append((delivery_id, request))
+            elif full:
+                spill = not self._wait_for_space()
+                if spill:
+                    logger.warning(
+                        "Delivery queue still full after %ss, spilling %s to disk",
+                        self.block_timeout,
+                        delivery_id,
+                        extra=fields(delivery_id=delivery_id),
+                    )
+                else:
+                    self._queue.append((delivery_id, request))
+            else:
+                self._queue.append((delivery_id, request))
+            if spill:
+                self._spilling += 1
+                self._set_status(delivery_id, state='spilled')
+            self._cond.notify_all()
+        if spill:
+            self._spill(delivery_id, request)
+        return delivery_id
+
+    def _wait_for_space(self) -> bool:
+        # Caller must hold self._cond; False if block_timeout passed first
+        deadline = (
+            None
+            if self.block_timeout is None
+            else time.monotonic() + self.block_timeout
+        )
+        while len(self._queue) >= self.max_queue and not self._shutdown:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return True
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                job = None
+                if self._queue:
+                    job = self._queue.popleft()
+                    self._cond.notify_all()
+                elif self._spilled:
+                    job = self._load_spilled()
+                    if job is None:
+                        continue
+                elif self._shutdown and not self._spilling:
+                    return None
+                else:
+                    self._cond.wait()
+                    continue
+                # Count the job as in flight before releasing the lock so wait()
+                # never sees a gap
+                self._in_flight += 1
+                self._set_status(job[0], state='sending', started_at=time.time())
+                return job
+
+    def _worker(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            delivery_id, request = job
+            try:
+                result = self.send_fn(dict(request, background=True))
+            except Exception as e:
+                result = {'success': False, 'error': f'Unexpected error: {str(e)}'}
+            with self._cond:
+                self._in_flight -= 1
+                state = 'delivered' if result.get('success') else 'failed'
+                self._counters[state] += 1
+                self._set_status(
+                    delivery_id,
+                    state=state,
+                    finished_at=time.time(),
+                    result={
+                        k: result.get(k)
+                        for k in (
+                            'success',
+                            'status_code',
+                            'error',
+                            'response_text',
+                            'compression',
+                        )
+                    },
+                )
+                self._cond.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued request has been delivered
+
+        Returns:
+            True if the queue drained before the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while (
+                self._queue or self._spilled or self._spilling or self._in_flight
+            ):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> None:
+        """
+        Stop the workers once the in-memory queue is empty
+        """
+        if wait:
+            self.wait(timeout)
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join(timeout)
+
+
+_dispatcher: Optional[DeliveryDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> DeliveryDispatcher:
+    """
+    Return the process-wide delivery dispatcher
+
+    Defaults can be overridden with the ``WEBHOOK_ASYNC_WORKERS``,
+    ``WEBHOOK_ASYNC_QUEUE_SIZE``, ``WEBHOOK_ASYNC_BACKPRESSURE`` and
+    ``WEBHOOK_ASYNC_BLOCK_TIMEOUT`` environment variables.
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                backpressure = os.environ.get('WEBHOOK_ASYNC_BACKPRESSURE', 'block')
+                _dispatcher = DeliveryDispatcher(
+                    workers=_env_int('WEBHOOK_ASYNC_WORKERS', 4),
+                    max_queue=_env_int('WEBHOOK_ASYNC_QUEUE_SIZE', 100),
+                    backpressure=(
+                        backpressure if backpressure in BACKPRESSURE_MODES else 'block'
+                    ),
+                    # Every mode can end up spilling (block does after its timeout),
+                    # so always pick up what an earlier run left on disk
+                    spill_dir=get_data_directory('spill'),
+                    block_timeout=_env_float('WEBHOOK_ASYNC_BLOCK_TIMEOUT', 30.0),
+                )
+    return _dispatcher
+
+
+def configure_dispatcher(
+    workers: int = 4,
+    max_queue: int = 100,
+    backpressure: str = "block",
+    spill_dir: Optional[str] = None,
+    block_timeout: Optional[float] = 30.0,
+) -> DeliveryDispatcher:
+    """
+    Replace the process-wide dispatcher with one using the given settings
+
+    The previous dispatcher finishes its queued requests in the background.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        previous = _dispatcher
+        _dispatcher = DeliveryDispatcher(
+            workers=workers,
+            max_queue=max_queue,
+            backpressure=backpressure,
+            spill_dir=spill_dir,
+            block_timeout=block_timeout,
+        )
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return _dispatcher
+
+
+def submit_delivery(request: Dict) -> str:
+    """
+    Queue a request on the shared dispatcher and return its delivery ID
+    """
+    return get_dispatcher().submit(request)
+
+
+def get_delivery_status(delivery_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up the status of an asynchronous delivery
+    """
+    return get_dispatcher().status(delivery_id)
@@ -0,0 +1,239 @@
+import json
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from .webhook_sender import _env_int, combine_results, deliver_request
+
+FANOUT_WAIT_MODES = ("all", "first_success", "none")
+
+
+def parse_endpoints(
+    url: str,
+    headers: Optional[Dict],
+    timeout: int,
+    method: str = "POST",
+    additional: Any = None,
+) -> List[Dict[str, Any]]:
+    """
+    Build the endpoint list from the primary URL and the additional endpoints
+
+    Args:
+        url: Primary webhook URL
+        headers: Headers of the primary endpoint, also the base for the others
+        timeout: Default timeout in seconds
+        method: Default HTTP method
+        additional: JSON text or list of URLs or objects with ``url`` and
+            optional ``headers``, ``method`` and ``timeout``
+
+    Returns:
+        List of endpoint dicts with url, headers, method and timeout
+    """
+    if isinstance(additional, str):
+        additional = json.loads(additional) if additional.strip() else []
+    if isinstance(additional, (str, dict)):
+        additional = [additional]
+
+    endpoints = [
+        {
+            'url': url,
+            'headers': dict(headers or {}),
+            'method': method,
+            'timeout': timeout,
+        }
+    ]
+    for entry in additional or []:
+        if isinstance(entry, str):
+            entry = {'url': entry}
+        if not isinstance(entry, dict) or not entry.get('url'):
+            raise ValueError(f"Invalid endpoint: {entry!r}")
+        endpoints.append(
+            {
+                'url': entry['url'],
+                'headers': {**(headers or {}), **(entry.get('headers') or {})},
+                'method': str(entry.get('method') or method).upper(),
+                'timeout': entry.get('timeout') or timeout,
+            }
+        )
+    return endpoints
+
+
+def fanout_targets(
+    prepared: List[Dict], endpoints: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Pair every endpoint with copies of the prepared requests
+
+    The first endpoint keeps the original requests.
+    """
+    targets = [{'url': endpoints[0]['url'], 'requests': prepared}]
+    for endpoint in endpoints[1:]:
+        targets.append(
+            {
+                'url': endpoint['url'],
+                'requests': [retarget(request, endpoint) for request in prepared],
+            }
+        )
+    return targets
+
+
+def retarget(request: Dict, endpoint: Dict[str, Any]) -> Dict:
+    """
+    Copy a prepared request for another endpoint, sharing its encoded body
+
+    Headers the request picked up while it was prepared (e.g. Content-Type)
+    are kept; the endpoint's own headers override them. The upload digests
+    are only kept if the endpoint's upload cache was checked when the
+    request was prepared (see WebhookSender.prepare_webhooks ``dedupe_urls``).
+    """
+    copy = dict(request)
+    copy['url'] = endpoint['url']
+    copy['method'] = endpoint['method']
+    copy['timeout'] = endpoint['timeout']
+    copy['headers'] = {**request.get('headers', {}), **endpoint['headers']}
+    copy['body'] = dict(request.get('body') or {})
+    if endpoint['url'] not in (request.get('dedupe_urls') or ()):
+        copy.pop('upload_digests', None)
+    if (copy.get('fallback') or {}).get('mode') == 'fallback_url':
+        # The secondary URL stands in for the primary endpoint only
+        copy.pop('fallback')
+    return copy
+
+
+class FanoutSender:
+    """
+    Sends one prepared payload to several endpoints concurrently
+
+    Each endpoint gets its own list of requests (one per chunk), sent in
+    order on a shared thread pool; endpoints are sent in parallel.
+    """
+
+    def __init__(
+        self, workers: int = 8, send_fn: Callable[[Dict], Dict] = deliver_request
+    ):
+        """
+        Args:
+            workers: Maximum number of endpoints sent to at the same time
+            send_fn: Function that sends one request dict and returns a result dict
+        """
+        self.workers = max(1, int(workers))
+        self.send_fn = send_fn
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='webhook-fanout'
+                )
+            return self._executor
+
+    def _send_endpoint(self, requests: List[Dict]) -> Dict:
+        return combine_results([self.send_fn(request) for request in requests])
+
+    def send(self, targets: List[Dict[str, Any]], wait_for: str = "all") -> Dict:
+        """
+        Send every endpoint's requests concurrently
+
+        Args:
+            targets: One dict per endpoint with its ``url`` and ``requests`` list
+            wait_for: "all" waits for every endpoint, "first_success" returns
+                as soon as one endpoint succeeded (the rest finish in the
+                background), "none" returns right after submitting
+
+        Returns:
+            Dict with overall ``success``, ``succeeded``/``failed``/``pending``
+            counts and the per-endpoint results under ``endpoints``
+        """
+        if wait_for not in FANOUT_WAIT_MODES:
+            raise ValueError(f"Unsupported fan-out wait mode: {wait_for}")
+        executor = self._get_executor()
+        futures: List[Future] = [
+            executor.submit(self._send_endpoint, target['requests'])
+            for target in targets
+        ]
+
+        if wait_for == "all":
+            wait(futures)
+        elif wait_for == "first_success":
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                if any(self._future_result(future).get('success') for future in done):
+                    break
+
+        endpoints = []
+        for target, future in zip(targets, futures):
+            entry = {'url': target['url']}
+            if future.done():
+                result = self._future_result(future)
+                entry.update(
+                    {
+                        k: result.get(k)
+                        for k in ('success', 'status_code', 'error', 'response_text')
+                    }
+                )
+                if result.get('skipped'):
+                    entry['skipped'] = True
+                for key in ('compression', 'circuit', 'timing'):
+                    if result.get(key):
+                        entry[key] = result[key]
+            else:
+                entry['pending'] = True
+            endpoints.append(entry)
+
+        succeeded = sum(1 for entry in endpoints if entry.get('success'))
+        pending_count = sum(1 for entry in endpoints if entry.get('pending'))
+        failed = len(endpoints) - succeeded - pending_count
+        if wait_for == "none":
+            success = True
+        elif wait_for == "first_success":
+            success = succeeded > 0
+        else:
+            success = failed == 0
+        return {
+            'success': success,
+            'succeeded': succeeded,
+            'failed': failed,
+            'pending': pending_count,
+            'endpoints': endpoints,
+        }
+
+    @staticmethod
+    def _future_result(future: Future) -> Dict:
+        try:
+            return future.result()
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Unexpected error: {str(e)}',
+                'status_code': None,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_fanout_sender: Optional[FanoutSender] = None
+_fanout_lock = threading.Lock()
+
+
+def get_fanout_sender() -> FanoutSender:
+    """
+    Return the process-wide fan-out sender
+
+    The number of endpoints sent to in parallel can be set with
+    ``WEBHOOK_FANOUT_WORKERS``.
+    """
+    global _fanout_sender
+    if _fanout_sender is None:
+        with _fanout_lock:
+            if _fanout_sender is None:
+                _fanout_sender = FanoutSender(
+                    workers=_env_int('WEBHOOK_FANOUT_WORKERS', 8)
+                )
+    return _fanout_sender
@@ -0,0 +1,275 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+
+def _env_workers() -> int:
+    try:
+        return max(
+            1, int(os.environ.get('WEBHOOK_ENCODE_WORKERS', 0)) or (os.cpu_count() or 1)
+        )
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+# Elements converted per block; keeps the float scratch buffer cache-sized
+_CONVERT_BLOCK = 1 << 18
+
+# Supported channel counts: L, LA, RGB, RGBA
+_CHANNEL_COUNTS = (1, 2, 3, 4)
+
+
+def tensor_to_uint8(tensor: Any, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Clamp and scale a [0, 1] float image tensor into uint8
+
+    Values are truncated, not rounded, so the pixels match the original
+    ``(tensor * 255).astype(np.uint8)`` conversion exactly.
+
+    Torch tensors are converted on their own device before ``.cpu()``, so only
+    one byte per value is copied back to the host. NumPy arrays are processed
+    in cache-sized blocks that write straight into one preallocated uint8
+    buffer, instead of materialising full-size float temporaries.
+
+    Args:
+        tensor: Torch tensor, NumPy array or array-like with values in [0, 1]
+            (uint8 input is returned unchanged)
+        out: Optional preallocated uint8 array with the same shape
+
+    Returns:
+        uint8 NumPy array with the same shape as ``tensor``
+    """
+    if hasattr(tensor, 'cpu') and hasattr(tensor, 'clamp'):
+        import torch
+
+        tensor = tensor.detach()
+        if tensor.dtype != torch.uint8:
+            # Values outside [0, 1] are clamped instead of wrapping around
+            tensor = tensor.mul(255.0).clamp_(0.0, 255.0).to(torch.uint8)
+        result = tensor.cpu().numpy()
+        if out is not None:
+            np.copyto(out, result)
+            return out
+        return result
+
+    array = np.asarray(tensor)
+    if array.dtype == np.uint8:
+        if out is not None:
+            np.copyto(out, array)
+            return out
+        return array
+    if out is None:
+        out = np.empty(array.shape, dtype=np.uint8)
+    if np.issubdtype(array.dtype, np.integer) or array.dtype == np.bool_:
+        # Integer input is taken to be 0-255 already
+        np.clip(array, 0, 255, out=out, casting='unsafe')
+        return out
+
+    flat_in = array.reshape(-1)
+    flat_out = out.reshape(-1)
+    scratch = np.empty(min(_CONVERT_BLOCK, flat_in.size), dtype=np.float32)
+    for start in range(0, flat_in.size, _CONVERT_BLOCK):
+        stop = min(start + _CONVERT_BLOCK, flat_in.size)
+        block = scratch[: stop - start]
+        np.multiply(flat_in[start:stop], 255.0, out=block, casting='unsafe')
+        np.clip(block, 0.0, 255.0, out=block)
+        np.copyto(flat_out[start:stop], block, casting='unsafe')
+    return out
+
+
+def array_to_pil(frame: np.ndarray) -> Image.Image:
+    """
+    Wrap a uint8 frame of shape [H, W] or [H, W, C] (C = 1-4) in a PIL image
+    """
+    if frame.ndim == 3 and frame.shape[-1] == 1:
+        frame = frame[..., 0]
+    if frame.ndim == 2 or (frame.ndim == 3 and frame.shape[-1] in _CHANNEL_COUNTS):
+        # PIL picks L, LA, RGB or RGBA from the channel count
+        return Image.fromarray(frame)
+    raise ValueError(f"Unexpected frame shape: {frame.shape}")
+
+
+# Codec name -> PIL format, file extension and MIME type
+IMAGE_FORMATS = {
+    'PNG': {'pil_format': 'PNG', 'extension': 'png', 'mime_type': 'image/png'},
+    'JPEG': {'pil_format': 'JPEG', 'extension': 'jpg', 'mime_type': 'image/jpeg'},
+    'WEBP': {'pil_format': 'WEBP', 'extension': 'webp', 'mime_type': 'image/webp'},
+    'WEBP_LOSSLESS': {
+        'pil_format': 'WEBP',
+        'extension': 'webp',
+        'mime_type': 'image/webp',
+    },
+}
+
+
+def image_format_info(format: str) -> Dict[str, str]:
+    """
+    Look up the PIL format, file extension and MIME type of a codec name
+    """
+    try:
+        return IMAGE_FORMATS[format.upper()]
+    except KeyError:
+        raise ValueError(f"Unsupported image format: {format}")
+
+
+def _save_options(
+    format: str, quality: Optional[int], compress_level: Optional[int]
+) -> Dict[str, Any]:
+    format = format.upper()
+    if format == 'PNG':
+        return {'compress_level': 6 if compress_level is None else compress_level}
+    if format == 'JPEG':
+        return {'quality': 90 if quality is None else quality, 'optimize': False}
+    if format == 'WEBP':
+        return {'quality': 90 if quality is None else quality, 'method': 4}
+    if format == 'WEBP_LOSSLESS':
+        # For lossless WebP, quality trades encode time for size
+        return {
+            'lossless': True,
+            'quality': 80 if quality is None else quality,
+            'method': 4,
+        }
+    raise ValueError(f"Unsupported image format: {format}")
+
+
+def encode_image(
+    pil_image: Image.Image,
+    format: str = 'PNG',
+    quality: Optional[int] = None,
+    compress_level: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Encode a PIL image and time the encode
+
+    Args:
+        pil_image: Image to encode
+        format: Codec name from IMAGE_FORMATS (PNG, JPEG, WEBP, WEBP_LOSSLESS)
+        quality: Quality for JPEG/WebP (1-100)
+        compress_level: zlib level for PNG (0-9)
+
+    Returns:
+        Dict with the encoded ``data`` bytes, ``size_bytes``, ``encode_ms``,
+        ``mime_type`` and ``extension``
+    """
+    info = image_format_info(format)
+    options = _save_options(format, quality, compress_level)
+    if info['pil_format'] == 'JPEG' and pil_image.mode not in ('RGB', 'L'):
+        # JPEG has no alpha channel
+        pil_image = pil_image.convert('RGB')
+
+    start = time.perf_counter()
+    img_buffer = io.BytesIO()
+    pil_image.save(img_buffer, format=info['pil_format'], **options)
+    data = img_buffer.getvalue()
+    return {
+        'data': data,
+        'size_bytes': len(data),
+        'encode_ms': (time.perf_counter() - start) * 1000.0,
+        'mime_type': info['mime_type'],
+        'extension': info['extension'],
+    }
+
+
+class ImageEncoderPool:
+    """
+    Thread pool that encodes batch frames in parallel
+
+    PIL releases the GIL while compressing, so threads scale with cores
+    without the pickling cost of a process pool. Results keep frame order.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Args:
+            workers: Number of encoder threads (defaults to the CPU count)
+        """
+        self.workers = max(1, int(workers or (os.cpu_count() or 1)))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='webhook-encode'
+                )
+            return self._executor
+
+    def encode_frames(
+        self,
+        frames: List[Image.Image],
+        format: str = 'PNG',
+        quality: Optional[int] = None,
+        compress_level: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Encode frames in parallel
+
+        Args:
+            frames: PIL images in batch order
+            format: Codec name (see encode_image)
+            quality: Quality for JPEG/WebP
+            compress_level: zlib level for PNG
+
+        Returns:
+            Encoded results (see encode_image) in the same order as ``frames``
+        """
+
+        def encode(frame):
+            return encode_image(
+                frame, format, quality=quality, compress_level=compress_level
+            )
+
+        if len(frames) <= 1 or self.workers == 1:
+            return [encode(frame) for frame in frames]
+        return list(self._get_executor().map(encode, frames))
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Run an encoding task on the pool and return its Future
+        """
+        return self._get_executor().submit(fn, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_encoder_pool: Optional[ImageEncoderPool] = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder_pool() -> ImageEncoderPool:
+    """
+    Return the process-wide encoder pool
+
+    The worker count defaults to the CPU count and can be set with
+    ``WEBHOOK_ENCODE_WORKERS``.
+    """
+    global _encoder_pool
+    if _encoder_pool is None:
+        with _encoder_lock:
+            if _encoder_pool is None:
+                _encoder_pool = ImageEncoderPool(_env_workers())
+    return _encoder_pool
+
+
+def configure_encoder(workers: int) -> ImageEncoderPool:
+    """
+    Replace the process-wide encoder pool with one of the given size
+    """
+    global _encoder_pool
+    with _encoder_lock:
+        previous = _encoder_pool
+        _encoder_pool = ImageEncoderPool(workers)
+    if previous is not None:
+        previous.shutdown()
+    return _encoder_pool
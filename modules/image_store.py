@@ -0,0 +1,267 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+from .log import fields, get_logger
+
+logger = get_logger("ImageStore")
+
+IMAGE_DELIVERY_MODES = ("upload", "reference")
+
+# Only files with this prefix are ever removed by the TTL cleanup
+FILE_PREFIX = "webhook_"
+
+# Permissions of stored images, as an ordinary file written by ComfyUI would have
+FILE_MODE = 0o644
+
+
+def _output_directory() -> Optional[str]:
+    try:
+        import folder_paths
+    except ImportError:
+        return None
+    return folder_paths.get_output_directory()
+
+
+class ImageStore:
+    """
+    Write-once store for images sent by reference instead of uploaded
+
+    Files are named after the SHA-256 of their encoded bytes, so the same
+    image is written once however often it is sent, and each write goes to
+    a temporary file that is renamed into place so a receiver never reads a
+    partial image. Files older than ``ttl`` are removed at most every
+    ``cleanup_interval`` seconds, from the next store() call.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        output_directory: Optional[str] = None,
+        ttl: float = 86400.0,
+        cleanup_interval: float = 300.0,
+        base_url: str = "",
+    ):
+        """
+        Args:
+            directory: Where the images are written
+            output_directory: ComfyUI's output directory; when ``directory`` is
+                inside it the references include a ``/view`` URL
+            ttl: Seconds a file is kept after it was last sent (0 keeps files forever)
+            cleanup_interval: Minimum seconds between two cleanup passes
+            base_url: Address of this ComfyUI server as seen by the receivers
+        """
+        self.directory = os.path.abspath(directory)
+        self.output_directory = (
+            os.path.abspath(output_directory) if output_directory else None
+        )
+        self.ttl = float(ttl)
+        self.cleanup_interval = max(0.0, float(cleanup_interval))
+        self.base_url = base_url.rstrip('/')
+        self._lock = threading.Lock()
+        self._cleaned_at = 0.0
+        self._counters = {'written': 0, 'reused': 0, 'bytes_written': 0, 'removed': 0}
+
+    def _subfolder(self) -> Optional[str]:
+        """
+        Path of the store relative to the output directory (None if outside it)
+        """
+        if self.output_directory is None:
+            return None
+        relative = os.path.relpath(self.directory, self.output_directory)
+        if relative == os.curdir:
+            return ""
+        if relative.startswith(os.pardir) or os.path.isabs(relative):
+            return None
+        return relative.replace(os.sep, '/')
+
+    def view_url(self, filename: str, base_url: str = "") -> Optional[str]:
+        """
+        ComfyUI ``/view`` URL of a stored file
+
+        None when the store is outside the output directory.
+        """
+        subfolder = self._subfolder()
+        if subfolder is None:
+            return None
+        base_url = (base_url or self.base_url or "http://127.0.0.1:8188").rstrip('/')
+        query = urlencode(
+            {'filename': filename, 'subfolder': subfolder, 'type': 'output'}
+        )
+        return f"{base_url}/view?{query}"
+
+    def store(self, encoded: Dict, base_url: str = "") -> Dict[str, Any]:
+        """
+        Write an encoded image (see encode_image) unless it is already stored
+
+        Args:
+            encoded: Encoded image with ``data``, ``extension`` and ``mime_type``
+            base_url: Overrides the store's base URL for the ``/view`` link
+
+        Returns:
+            Reference with the absolute ``path``, ``filename``, ``subfolder``,
+            ``url`` (None outside the output directory), ``sha256``,
+            ``size_bytes`` and ``content_type``
+        """
+        data = encoded['data']
+        checksum = hashlib.sha256(data).hexdigest()
+        filename = f"{FILE_PREFIX}{checksum[:32]}.{encoded['extension']}"
+        path = os.path.join(self.directory, filename)
+        os.makedirs(self.directory, exist_ok=True)
+
+        try:
+            # Already stored: refresh the mtime so the TTL counts from the latest send
+            os.utime(path)
+            with self._lock:
+                self._counters['reused'] += 1
+        except FileNotFoundError:
+            fd, temp_path = tempfile.mkstemp(
+                prefix=f".{FILE_PREFIX}", suffix=".tmp", dir=self.directory
+            )
+            try:
+                with os.fdopen(fd, 'wb') as handle:
+                    handle.write(data)
+                # mkstemp creates the file owner-only; the server and receivers
+                # need to read it
+                os.chmod(temp_path, FILE_MODE)
+                os.replace(temp_path, path)
+            except BaseException:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+                raise
+            with self._lock:
+                self._counters['written'] += 1
+                self._counters['bytes_written'] += len(data)
+            logger.debug(
+                "Stored %s (%d bytes)",
+                filename,
+                len(data),
+                extra=fields(path=path, size_bytes=len(data)),
+            )
+
+        self.cleanup()
+        return {
+            'path': path,
+            'filename': filename,
+            'subfolder': self._subfolder(),
+            'url': self.view_url(filename, base_url),
+            'sha256': checksum,
+            'size_bytes': len(data),
+            'content_type': encoded['mime_type'],
+        }
+
+    def cleanup(self, force: bool = False) -> int:
+        """
+        Remove stored files (and abandoned temporary files) older than the TTL
+
+        Args:
+            force: Run even if the last pass was less than ``cleanup_interval`` ago
+
+        Returns:
+            Number of files removed
+        """
+        if self.ttl <= 0:
+            return 0
+        now = time.time()
+        with self._lock:
+            if not force and now - self._cleaned_at < self.cleanup_interval:
+                return 0
+            self._cleaned_at = now
+        removed = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            if (
+                not entry.name.startswith((FILE_PREFIX, f".{FILE_PREFIX}"))
+                or not entry.is_file()
+            ):
+                continue
+            try:
+                if now - entry.stat().st_mtime > self.ttl:
+                    os.unlink(entry.path)
+                    removed += 1
+            except OSError:
+                # Removed concurrently or not ours to remove
+                continue
+        if removed:
+            with self._lock:
+                self._counters['removed'] += removed
+            logger.info(
+                "Removed %d expired image(s) from %s",
+                removed,
+                self.directory,
+                extra=fields(removed=removed, directory=self.directory),
+            )
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'ttl': self.ttl,
+                **self._counters,
+            }
+
+
+_store: Optional[ImageStore] = None
+_store_lock = threading.Lock()
+
+
+def _default_directory(output_directory: Optional[str]) -> str:
+    if os.environ.get('WEBHOOK_REFERENCE_DIR'):
+        return os.environ['WEBHOOK_REFERENCE_DIR']
+    if output_directory:
+        return os.path.join(output_directory, 'webhook')
+    from .webhook_sender import get_data_directory
+
+    return get_data_directory('references')
+
+
+def get_image_store() -> ImageStore:
+    """
+    Return the process-wide image store
+
+    Images go to ``WEBHOOK_REFERENCE_DIR`` if set, else to a ``webhook``
+    folder in ComfyUI's output directory. ``WEBHOOK_REFERENCE_TTL`` (seconds,
+    default one day, 0 keeps files) and ``WEBHOOK_REFERENCE_BASE_URL`` (this
+    server's address for ``/view`` links) override the defaults.
+    """
+    global _store
+    if _store is None:
+        from .webhook_sender import _env_float
+
+        with _store_lock:
+            if _store is None:
+                output_directory = _output_directory()
+                _store = ImageStore(
+                    _default_directory(output_directory),
+                    output_directory=output_directory,
+                    ttl=_env_float('WEBHOOK_REFERENCE_TTL', 86400.0),
+                    base_url=os.environ.get('WEBHOOK_REFERENCE_BASE_URL', ''),
+                )
+    return _store
+
+
+def configure_image_store(**settings) -> ImageStore:
+    """
+    Replace the process-wide image store (see ImageStore for the settings)
+    """
+    global _store
+    with _store_lock:
+        output_directory = _output_directory()
+        settings.setdefault('output_directory', output_directory)
+        settings.setdefault('directory', _default_directory(output_directory))
+        _store = ImageStore(**settings)
+    return _store
+
+
+def get_image_store_stats() -> Dict[str, Any]:
+    return get_image_store().stats()
@@ -0,0 +1,248 @@
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, Optional
+
+LOGGER_NAME = "comfyui_webhook"
+LOG_FORMATS = ("text", "json")
+
+REDACTED = "***"
+# Header names whose values are credentials
+_SENSITIVE_HEADER = re.compile(
+    r"auth|cookie|token|secret|passw|signature|api[-_]?key|session|credential",
+    re.IGNORECASE,
+)
+
+_settings = {'payload_max': 512, 'payload_sample': 1.0}
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def get_logger(source: str = "") -> logging.Logger:
+    """
+    Logger of one webhook component, e.g. get_logger("NotifyServer")
+
+    Every component logs below the ``comfyui_webhook`` logger, so its level
+    and handler (see configure_logging) apply to all of them. The component
+    name is shown in place of the old "[Source]" prefix.
+    """
+    _ensure_configured()
+    return logging.getLogger(f"{LOGGER_NAME}.{source}" if source else LOGGER_NAME)
+
+
+def fields(**values) -> Dict[str, Dict[str, Any]]:
+    """
+    ``extra`` argument attaching structured fields to a log record
+
+    The fields are written as keys of their own in the JSON-lines format
+    and left out of the text format. Values may be Lazy.
+    """
+    return {'fields': values}
+
+
+class Lazy:
+    """
+    Log argument that is only computed when a record is actually written
+
+    Records below the logger's level are dropped before formatting, so
+    wrapping an expensive preview in Lazy costs nothing at that level.
+    """
+
+    __slots__ = ('fn', 'args')
+
+    def __init__(self, fn: Callable[..., Any], *args):
+        self.fn = fn
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args))
+
+    __repr__ = __str__
+
+
+def redact_headers(headers: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    Copy of ``headers`` with credential values masked
+
+    Covers Authorization, cookies, API keys and tokens.
+    """
+    return {
+        name: REDACTED if _SENSITIVE_HEADER.search(str(name)) else value
+        for name, value in (headers or {}).items()
+    }
+
+
+def truncate(text: Any, limit: Optional[int] = None) -> str:
+    """
+    ``text`` cut to ``limit`` characters, noting the full length
+
+    ``limit`` defaults to WEBHOOK_LOG_PAYLOAD_MAX.
+    """
+    if text is None:
+        return ""
+    limit = _settings['payload_max'] if limit is None else limit
+    if isinstance(text, (bytes, bytearray)):
+        if limit > 0 and len(text) > limit:
+            return (
+                bytes(text[:limit]).decode('utf-8', errors='replace')
+                + f"... ({len(text)} bytes)"
+            )
+        return bytes(text).decode('utf-8', errors='replace')
+    text = str(text)
+    if limit > 0 and len(text) > limit:
+        return f"{text[:limit]}... ({len(text)} chars)"
+    return text
+
+
+def _sampled(describe: Callable[[], str], size: int) -> str:
+    if (
+        _settings['payload_sample'] < 1.0
+        and random.random() >= _settings['payload_sample']
+    ):
+        return f"<{size} bytes, not sampled>"
+    return describe()
+
+
+def payload_preview(body: Any, content_type: str = "application/json") -> Lazy:
+    """
+    Lazy, truncated and sampled preview of an encoded request body
+
+    Nothing is decoded unless the record is written; then only a fraction
+    (WEBHOOK_LOG_PAYLOAD_SAMPLE) of bodies is shown, each cut to
+    WEBHOOK_LOG_PAYLOAD_MAX characters.
+    """
+    from .serialization import body_preview
+
+    def describe() -> str:
+        if isinstance(body, (bytes, bytearray)):
+            return body_preview(bytes(body), content_type, _settings['payload_max'])
+        return truncate(body)
+
+    return Lazy(_sampled, describe, len(body) if hasattr(body, '__len__') else 0)
+
+
+def text_preview(text_fn: Callable[[], Any]) -> Lazy:
+    """
+    Lazy, truncated preview of a text (e.g. a response body) produced by ``text_fn``
+    """
+    return Lazy(lambda: truncate(text_fn()))
+
+
+class TextFormatter(logging.Formatter):
+    """
+    "[Source] message" lines, as the nodes used to print
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(source)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.source = (
+            record.name.rpartition('.')[2] if record.name != LOGGER_NAME else "Webhook"
+        )
+        return super().format(record)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    One JSON object per record with the structured fields as top-level keys
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 6),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'source': (
+                record.name.rpartition('.')[2]
+                if record.name != LOGGER_NAME
+                else "Webhook"
+            ),
+            'message': record.getMessage(),
+        }
+        for key, value in (getattr(record, 'fields', None) or {}).items():
+            entry[key] = str(value) if isinstance(value, Lazy) else value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _env_number(name: str, default: float) -> float:
+    # Loggers are created while webhook_sender (and its _env_* helpers) is still
+    # importing
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def configure_logging(
+    level: Optional[Any] = None,
+    log_format: Optional[str] = None,
+    stream: Any = None,
+    payload_max: Optional[int] = None,
+    payload_sample: Optional[float] = None,
+) -> logging.Logger:
+    """
+    Set up the ``comfyui_webhook`` logger
+
+    Args:
+        level: Level name or number (default WEBHOOK_LOG_LEVEL, else INFO).
+            Request headers and payload previews are only logged at DEBUG.
+        log_format: "text" or "json" for JSON lines (default WEBHOOK_LOG_FORMAT,
+            else text)
+        stream: Where records go (default stdout, where the nodes used to print)
+        payload_max: Characters of a payload or response shown at DEBUG (default
+            WEBHOOK_LOG_PAYLOAD_MAX, 512)
+        payload_sample: Fraction of payloads shown at DEBUG (default
+            WEBHOOK_LOG_PAYLOAD_SAMPLE, 1.0)
+
+    Returns:
+        The configured logger
+    """
+    global _configured
+    level = level or os.environ.get('WEBHOOK_LOG_LEVEL') or 'INFO'
+    log_format = (log_format or os.environ.get('WEBHOOK_LOG_FORMAT') or 'text').lower()
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unsupported log format: {log_format}")
+    _settings['payload_max'] = int(
+        payload_max
+        if payload_max is not None
+        else _env_number('WEBHOOK_LOG_PAYLOAD_MAX', 512)
+    )
+    sample = (
+        payload_sample
+        if payload_sample is not None
+        else _env_number('WEBHOOK_LOG_PAYLOAD_SAMPLE', 1.0)
+    )
+    _settings['payload_sample'] = min(1.0, max(0.0, sample))
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    for handler in list(logger.handlers):
+        if getattr(handler, '_webhook_handler', False):
+            logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler._webhook_handler = True
+    handler.setFormatter(
+        JsonLinesFormatter() if log_format == 'json' else TextFormatter()
+    )
+    logger.addHandler(handler)
+    # Records are written once, here, rather than again by ComfyUI's root handler
+    logger.propagate = False
+    _configured = True
+    return logger
+
+
+def _ensure_configured() -> None:
+    if not _configured:
+        with _configure_lock:
+            if not _configured:
+                configure_logging()
@@ -0,0 +1,363 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from urllib.parse import urlsplit
+
+from .log import get_logger
+
+logger = get_logger("WebhookMetrics")
+
+METRIC_PREFIX = "comfyui_webhook_"
+LABEL_NAMES = ("node", "host")
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+ENCODE_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+SIZE_BUCKETS = (
+    256,
+    1024,
+    4096,
+    16384,
+    65536,
+    262144,
+    1048576,
+    4194304,
+    16777216,
+    67108864,
+)
+
+
+def host_label(url: str) -> str:
+    return urlsplit(url).netloc.lower() or "unknown"
+
+
+class _ShardedMetric:
+    """
+    Base for metrics whose values live in one dict per recording thread
+
+    Recording only touches the calling thread's dict, so it takes no lock;
+    a scrape copies every thread's dict and adds them up.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, ...], Any]] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict[Tuple[str, ...], Any]:
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self) -> List[List[Tuple[Tuple[str, ...], Any]]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # Copying a dict's items is atomic under the GIL
+        return [list(shard.items()) for shard in shards]
+
+    def reset(self) -> None:
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, node: str, host: str, value: float = 1.0) -> None:
+        shard = self._shard()
+        key = (node, host)
+        shard[key] = shard.get(key, 0.0) + value
+
+    def collect(self) -> Dict[Tuple[str, ...], float]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for items in self._snapshots():
+            for key, value in items:
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+
+class Gauge(Counter):
+    """
+    Gauge kept as a running sum of increments and decrements (e.g. requests in flight)
+    """
+
+    kind = "gauge"
+
+    def dec(self, node: str, host: str, value: float = 1.0) -> None:
+        self.inc(node, host, -value)
+
+
+class Histogram(_ShardedMetric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, node: str, host: str, value: float) -> None:
+        shard = self._shard()
+        key = (node, host)
+        cell = shard.get(key)
+        if cell is None:
+            # One count per bucket plus +Inf, then the sum and the total count
+            cell = shard[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    @contextmanager
+    def time(self, node: str, host: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(node, host, time.perf_counter() - start)
+
+    def collect(self) -> Dict[Tuple[str, ...], List[float]]:
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for items in self._snapshots():
+            for key, cell in items:
+                cell = list(cell)
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = cell
+                else:
+                    for index, value in enumerate(cell):
+                        total[index] += value
+        return totals
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return (
+        repr(float(value))
+        if isinstance(value, float) and not value.is_integer()
+        else str(int(value))
+    )
+
+
+class MetricsRegistry:
+    """
+    Webhook delivery metrics in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._metrics: List[_ShardedMetric] = []
+        self._callbacks: List[
+            Tuple[
+                str,
+                str,
+                Tuple[str, ...],
+                Callable[[], List[Tuple[Tuple[str, ...], float]]],
+            ]
+        ] = []
+        self._lock = threading.Lock()
+
+        self.requests_sent = self._add(
+            Counter("requests_sent_total", "HTTP requests sent to webhook endpoints")
+        )
+        self.requests_failed = self._add(
+            Counter(
+                "requests_failed_total",
+                "Webhook requests that failed (no response or HTTP error status)",
+            )
+        )
+        self.requests_retried = self._add(
+            Counter(
+                "requests_retried_total", "Webhook requests scheduled to be sent again"
+            )
+        )
+        self.bytes_sent = self._add(
+            Counter("bytes_sent_total", "Request body bytes sent")
+        )
+        self.in_flight = self._add(
+            Gauge("requests_in_flight", "Webhook requests currently being sent")
+        )
+        self.encode_seconds = self._add(
+            Histogram(
+                "image_encode_seconds", "Time to encode one image", ENCODE_BUCKETS
+            )
+        )
+        self.serialize_seconds = self._add(
+            Histogram(
+                "serialize_seconds", "Time to serialize a payload", ENCODE_BUCKETS
+            )
+        )
+        self.request_seconds = self._add(
+            Histogram(
+                "request_duration_seconds",
+                "Time from sending a request to reading its response",
+                LATENCY_BUCKETS,
+            )
+        )
+        self.payload_bytes = self._add(
+            Histogram("payload_bytes", "Request body size", SIZE_BUCKETS)
+        )
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_gauge(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Tuple[str, ...],
+        callback: Callable[[], List[Tuple[Tuple[str, ...], float]]],
+    ) -> None:
+        """
+        Add a gauge whose values are read by ``callback`` at scrape time
+
+        Args:
+            name: Metric name without the package prefix
+            documentation: HELP text
+            label_names: Names of the label values returned by ``callback``
+            callback: Returns a list of (label values, value)
+        """
+        with self._lock:
+            self._callbacks = [entry for entry in self._callbacks if entry[0] != name]
+            self._callbacks.append((name, documentation, tuple(label_names), callback))
+
+    def render(self, openmetrics: bool = False) -> str:
+        """
+        Render every metric in the Prometheus text format
+
+        With ``openmetrics`` set, the OpenMetrics format is used instead.
+        """
+        lines = []
+        for metric in self._metrics:
+            name = METRIC_PREFIX + metric.name
+            family = (
+                name[: -len("_total")]
+                if openmetrics and metric.kind == "counter"
+                else name
+            )
+            lines.append(f"# HELP {family} {metric.documentation}")
+            lines.append(f"# TYPE {family} {metric.kind}")
+            if isinstance(metric, Histogram):
+                for key, cell in sorted(metric.collect().items()):
+                    cumulative = 0
+                    for bound, count in zip(
+                        metric.buckets + (float('inf'),), cell[:-2]
+                    ):
+                        cumulative += count
+                        le = 'le="%s"' % _number(bound)
+                        lines.append(
+                            f"{name}_bucket{_labels(LABEL_NAMES, key, le)} {cumulative}"
+                        )
+                    lines.append(
+                        f"{name}_sum{_labels(LABEL_NAMES, key)} {_number(cell[-2])}"
+                    )
+                    lines.append(
+                        f"{name}_count{_labels(LABEL_NAMES, key)} {int(cell[-1])}"
+                    )
+            else:
+                for key, value in sorted(metric.collect().items()):
+                    lines.append(f"{name}{_labels(LABEL_NAMES, key)} {_number(value)}")
+
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for name, documentation, label_names, callback in callbacks:
+            name = METRIC_PREFIX + name
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                samples = callback()
+            except Exception as e:
+                logger.warning("Could not collect %s: %s", name, e)
+                continue
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(label_names, labels)} {_number(value)}")
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics:
+            metric.reset()
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _registry
+
+
+def render_metrics(openmetrics: bool = False) -> str:
+    """
+    Text exposition of the webhook metrics, e.g. for a /metrics endpoint or a file dump
+    """
+    return _registry.render(openmetrics)
+
+
+def _queue_depths() -> List[Tuple[Tuple[str, ...], float]]:
+    # Read lazily so a scrape never starts a queue that isn't running yet
+    from . import aggregator, delivery_queue, outbox
+
+    samples = []
+    if delivery_queue._dispatcher is not None:
+        stats = delivery_queue._dispatcher.stats()
+        samples.append((("async",), stats['queued'] + stats['spilled_pending']))
+    if aggregator._aggregator is not None:
+        stats = aggregator._aggregator.stats()
+        samples.append((("batch",), stats['buffered_events']))
+    if outbox._outbox is not None:
+        samples.append(
+            (("outbox",), outbox._outbox.stats()['states'].get('pending', 0))
+        )
+    return samples
+
+
+_registry.register_gauge(
+    "queue_depth", "Deliveries waiting in a background queue", ("queue",), _queue_depths
+)
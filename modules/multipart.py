@@ -0,0 +1,280 @@
+import uuid
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional
+
+from .image_encoding import (
+    ImageEncoderPool,
+    array_to_pil,
+    encode_image,
+    get_encoder_pool,
+    tensor_to_uint8,
+)
+from .serialization import dumps_text
+
+
+def _encode_frame(
+    tensor: Any, index: Optional[int], image_options: Dict
+) -> Dict[str, Any]:
+    frame = tensor if index is None else tensor[index]
+    pil_image = array_to_pil(tensor_to_uint8(frame))
+    encoded = encode_image(pil_image, **image_options)
+    encoded['width'] = pil_image.width
+    encoded['height'] = pil_image.height
+    encoded['mode'] = pil_image.mode
+    return encoded
+
+
+class StreamingMultipartBody:
+    """
+    multipart/form-data body that converts and encodes frames while it is being sent
+
+    Iterating yields the body in chunks, so requests uploads it with chunked
+    transfer encoding. At most ``lookahead`` encoded frames are held at once,
+    which bounds memory per request regardless of how many images it carries.
+    A body can only be sent once.
+    """
+
+    def __init__(
+        self,
+        tensor: Any,
+        frame_indices: List[Optional[int]],
+        image_field: str = 'images',
+        filename_template: str = 'image_{index}.{extension}',
+        image_options: Optional[Dict] = None,
+        leading_fields: Optional[Dict[str, str]] = None,
+        payload: Optional[Dict] = None,
+        batch_info: Optional[Dict] = None,
+        encoder: Optional[ImageEncoderPool] = None,
+        lookahead: int = 2,
+        chunk_size: int = 64 * 1024,
+        digests: Optional[Dict[int, str]] = None,
+        references: Optional[List[Dict]] = None,
+    ):
+        """
+        Args:
+            tensor: Image tensor the frames are read from
+            frame_indices: Batch indices to send, or [None] to send ``tensor`` as one
+                frame
+            image_field: Form field name of the image parts
+            filename_template: Filename format, given ``index`` and ``extension``
+            image_options: Keyword arguments for encode_image (format, quality,
+                compress_level)
+            leading_fields: Form fields sent before the images
+            payload: JSON payload sent after the images as the ``payload`` field,
+                with per-image metadata added under ``images`` and ``batch``
+            batch_info: Batch position added to the payload under ``batch``
+            encoder: Encoder pool used to encode upcoming frames during the upload
+            lookahead: Number of frames encoded ahead of the upload
+            chunk_size: Maximum size of each yielded chunk
+            digests: Content digest per batch index, added to the image metadata
+            references: Metadata of images that are referenced instead of uploaded
+        """
+        self.tensor = tensor
+        self.frame_indices = list(frame_indices)
+        self.image_field = image_field
+        self.filename_template = filename_template
+        self.image_options = dict(image_options or {})
+        self.leading_fields = dict(leading_fields or {})
+        self.payload = payload
+        self.batch_info = batch_info
+        self.encoder = encoder or get_encoder_pool()
+        self.lookahead = max(1, int(lookahead))
+        self.chunk_size = max(1024, int(chunk_size))
+        self.boundary = uuid.uuid4().hex
+        self.images_meta: List[Dict[str, Any]] = []
+        self.bytes_sent = 0
+        self.digests = dict(digests or {})
+        self.references = list(references or [])
+        self._consumed = False
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def filenames(self) -> List[str]:
+        """
+        Part filenames, for logging before the body is sent
+        """
+        return [
+            self.filename_template.format(
+                index=0 if index is None else index, extension='*'
+            )
+            for index in self.frame_indices
+        ]
+
+    def _part_header(
+        self,
+        name: str,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ) -> bytes:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        header = f'--{self.boundary}\r\nContent-Disposition: {disposition}\r\n'
+        if content_type is not None:
+            header += f'Content-Type: {content_type}\r\n'
+        return (header + '\r\n').encode('utf-8')
+
+    def _chunks(self, data: bytes) -> Iterator[memoryview]:
+        view = memoryview(data)
+        for start in range(0, len(view), self.chunk_size):
+            yield view[start : start + self.chunk_size]
+
+    def _field(self, name: str, value: str) -> Iterator[bytes]:
+        yield self._part_header(name)
+        yield from self._chunks(value.encode('utf-8'))
+        yield b'\r\n'
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._consumed:
+            raise RuntimeError("A streaming multipart body can only be sent once")
+        self._consumed = True
+        for chunk in self._generate():
+            self.bytes_sent += len(chunk)
+            yield chunk
+
+    def _generate(self) -> Iterator[bytes]:
+        for name, value in self.leading_fields.items():
+            yield from self._field(name, value)
+
+        # Keep a bounded window of frames encoding on the pool ahead of the upload
+        pending = deque()
+        upcoming = iter(self.frame_indices)
+
+        def schedule():
+            for index in upcoming:
+                pending.append(
+                    (
+                        index,
+                        self.encoder.submit(
+                            _encode_frame, self.tensor, index, self.image_options
+                        ),
+                    )
+                )
+                if len(pending) >= self.lookahead:
+                    return
+
+        schedule()
+        try:
+            while pending:
+                index, future = pending.popleft()
+                encoded = future.result()
+                schedule()
+                filename = self.filename_template.format(
+                    index=0 if index is None else index, extension=encoded['extension']
+                )
+                yield self._part_header(
+                    self.image_field, filename, encoded['mime_type']
+                )
+                yield from self._chunks(encoded['data'])
+                yield b'\r\n'
+                self.images_meta.append(
+                    {
+                        'index': 0 if index is None else index,
+                        'filename': filename,
+                        'content_type': encoded['mime_type'],
+                        'width': encoded['width'],
+                        'height': encoded['height'],
+                        'mode': encoded['mode'],
+                        'size_bytes': encoded['size_bytes'],
+                        'encode_ms': round(encoded['encode_ms'], 3),
+                    }
+                )
+                if index in self.digests:
+                    self.images_meta[-1].update(
+                        {'digest': self.digests[index], 'reference': False}
+                    )
+                del encoded
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+        if self.payload is not None:
+            payload = dict(self.payload)
+            if self.batch_info is not None:
+                payload['images'] = sorted(
+                    self.images_meta + self.references, key=lambda meta: meta['index']
+                )
+                payload['batch'] = self.batch_info
+            yield from self._field('payload', dumps_text(payload))
+
+        yield f'--{self.boundary}--\r\n'.encode('utf-8')
+
+
+class BufferedMultipartBody:
+    """
+    multipart/form-data body assembled from in-memory buffers without copying them
+
+    Parts hold bytes or NumPy arrays; iterating yields the part headers and
+    memoryviews of the buffers, so large arrays go to the socket straight from
+    their own memory. The length is known up front, so requests sends it with
+    a Content-Length instead of chunked encoding, and the body can be sent
+    again on retry (it also pickles for the outbox).
+    """
+
+    def __init__(self, chunk_size: int = 1024 * 1024):
+        """
+        Args:
+            chunk_size: Maximum size of each yielded chunk
+        """
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = max(1024, int(chunk_size))
+        self._parts: List[Dict[str, Any]] = []
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def add_part(
+        self,
+        name: str,
+        buffers: List[Any],
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ) -> None:
+        """
+        Append a part whose content is the concatenation of ``buffers``
+
+        Args:
+            name: Form field name
+            buffers: bytes, str or C-contiguous NumPy arrays
+            filename: Optional filename for file parts
+            content_type: Optional Content-Type of the part
+        """
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        header = f'--{self.boundary}\r\nContent-Disposition: {disposition}\r\n'
+        if content_type is not None:
+            header += f'Content-Type: {content_type}\r\n'
+        self._parts.append(
+            {
+                'header': (header + '\r\n').encode('utf-8'),
+                'buffers': [
+                    value.encode('utf-8') if isinstance(value, str) else value
+                    for value in buffers
+                ],
+            }
+        )
+
+    @staticmethod
+    def _view(buffer: Any) -> memoryview:
+        return memoryview(buffer).cast('B')
+
+    def __len__(self) -> int:
+        total = len(f'--{self.boundary}--\r\n')
+        for part in self._parts:
+            total += len(part['header']) + 2
+            total += sum(self._view(buffer).nbytes for buffer in part['buffers'])
+        return total
+
+    def __iter__(self) -> Iterator[Any]:
+        for part in self._parts:
+            yield part['header']
+            for buffer in part['buffers']:
+                view = self._view(buffer)
+                for start in range(0, view.nbytes, self.chunk_size):
+                    yield view[start : start + self.chunk_size]
+            yield b'\r\n'
+        yield f'--{self.boundary}--\r\n'.encode('utf-8')
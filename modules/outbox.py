@@ -0,0 +1,695 @@
+import argparse
+import json
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .log import fields, get_logger
+from .metrics import get_metrics, host_label
+from .webhook_sender import deliver_request, get_data_directory, _env_int
+
+logger = get_logger("WebhookOutbox")
+
+# Status codes worth retrying; every other 4xx is treated as permanent
+RETRYABLE_STATUS_CODES = {408, 425, 429}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    url TEXT,
+    request BLOB,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    last_attempt_at REAL,
+    last_status INTEGER,
+    last_error TEXT,
+    delivered_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt_at);
+"""
+
+
+def _lock_file(handle) -> None:
+    """
+    Take a non-blocking exclusive lock on an open file
+
+    Raises OSError if another process holds it. The operating system releases
+    the lock when the process exits, so a crashed ComfyUI never leaves a stale
+    lock behind.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def default_outbox_path() -> str:
+    """
+    Location of the shared outbox database inside the webhook data directory
+    """
+    return os.path.join(get_data_directory(), 'outbox.sqlite3')
+
+
+class WebhookOutbox:
+    """
+    Durable, crash-safe outbox for webhook requests backed by SQLite in WAL mode
+
+    Every request is committed to disk before its first delivery attempt and
+    stays there until it is delivered or exhausts its retries. All writes go
+    through a single writer thread that commits whatever has accumulated in one
+    transaction (group commit), so many concurrent requests share one fsync.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        workers: int = 2,
+        max_attempts: int = 8,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+        flush_linger: float = 0.0,
+        synchronous: str = 'FULL',
+        retention: float = 86400.0,
+        poll_interval: float = 5.0,
+        send_fn: Callable[[Dict], Dict] = deliver_request,
+        start: bool = True,
+        create: bool = True,
+    ):
+        """
+        Args:
+            path: SQLite database path (defaults to the webhook data directory)
+            workers: Number of concurrent delivery threads
+            max_attempts: Attempts before a request is marked dead
+            backoff_base: First retry delay in seconds, doubled on each attempt
+            backoff_max: Upper bound for the retry delay
+            flush_linger: Extra seconds the writer waits to grow a commit batch
+            synchronous: SQLite synchronous level ('FULL' or 'NORMAL')
+            retention: Seconds delivered rows are kept for status lookups
+            poll_interval: Maximum seconds between scans for due requests
+            send_fn: Function that sends one request dict and returns a result dict
+            start: Start the writer and delivery threads immediately
+            create: Create the database if it does not exist; otherwise a
+                missing database raises FileNotFoundError
+        """
+        self.path = path or default_outbox_path()
+        self.workers = max(1, int(workers))
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self.flush_linger = float(flush_linger)
+        self.synchronous = synchronous.upper()
+        self.retention = float(retention)
+        self.poll_interval = float(poll_interval)
+        self.send_fn = send_fn
+
+        self._cond = threading.Condition()
+        self._writes: List[tuple] = []
+        self._in_flight: set = set()
+        self._closed = False
+        self._stopping = False
+        self._wakeup = threading.Event()
+        self._counters = {
+            'enqueued': 0,
+            'delivered': 0,
+            'retried': 0,
+            'dead': 0,
+            'commits': 0,
+            'committed_writes': 0,
+        }
+        self._local = threading.local()
+        self._owner_lock = None
+
+        if not create and not os.path.exists(self.path):
+            raise FileNotFoundError(f"No outbox database at {self.path}")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+        self._writer_thread = None
+        self._scheduler_thread = None
+        self._executor = None
+        if start:
+            self.start()
+
+    # ------------------------------------------------------------------ storage
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA synchronous={self.synchronous}')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def _write(self, sql: str, params: tuple, wait: bool = False) -> Optional[int]:
+        """
+        Queue a write for the next group commit, optionally waiting until it is durable
+
+        Returns:
+            Number of rows changed when ``wait`` is set, else None
+        """
+        waiter = (
+            {'done': threading.Event(), 'error': None, 'rowcount': 0} if wait else None
+        )
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Outbox has been closed")
+            self._writes.append((sql, params, waiter))
+            self._cond.notify_all()
+        if waiter is not None:
+            waiter['done'].wait()
+            if waiter['error'] is not None:
+                raise waiter['error']
+            return waiter['rowcount']
+        return None
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[tuple]) -> None:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for sql, params, waiter in batch:
+                cursor = conn.execute(sql, params)
+                if waiter is not None:
+                    waiter['rowcount'] = cursor.rowcount
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._counters['commits'] += 1
+        self._counters['committed_writes'] += len(batch)
+
+    def _writer(self) -> None:
+        conn = self._connect()
+        while True:
+            with self._cond:
+                while not self._writes and not self._closed:
+                    self._cond.wait()
+                if not self._writes and self._closed:
+                    return
+            if self.flush_linger > 0:
+                time.sleep(self.flush_linger)
+            with self._cond:
+                batch, self._writes = self._writes, []
+            try:
+                self._commit(conn, batch)
+            except Exception:
+                # Isolate the failing write so the rest of the batch still lands
+                for item in batch:
+                    try:
+                        self._commit(conn, [item])
+                    except Exception as e:
+                        logger.error("Write failed: %s", e)
+                        if item[2] is not None:
+                            item[2]['error'] = e
+            for _, _, waiter in batch:
+                if waiter is not None:
+                    waiter['done'].set()
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------ public API
+
+    def acquire_owner_lock(self) -> bool:
+        """
+        Mark this process as the one delivering from the database
+
+        Returns:
+            True if the lock is held (or was already held) by this outbox,
+            False if another process, e.g. a running ComfyUI, holds it
+        """
+        if self._owner_lock is not None:
+            return True
+        handle = open(self.path + '.lock', 'a+b')
+        try:
+            _lock_file(handle)
+        except OSError:
+            handle.close()
+            return False
+        self._owner_lock = handle
+        return True
+
+    def _start_writer(self) -> None:
+        with self._cond:
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(
+                    target=self._writer, name='webhook-outbox-writer', daemon=True
+                )
+                self._writer_thread.start()
+
+    def start(self) -> None:
+        """
+        Start the writer and delivery threads
+        """
+        if self._scheduler_thread is not None:
+            return
+        if not self.acquire_owner_lock():
+            logger.warning(
+                "Outbox %s is also being delivered by another process",
+                self.path,
+                extra=fields(path=self.path),
+            )
+        self._start_writer()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix='webhook-outbox'
+        )
+        self._scheduler_thread = threading.Thread(
+            target=self._scheduler, name='webhook-outbox-scheduler', daemon=True
+        )
+        self._scheduler_thread.start()
+
+    def enqueue(self, request: Dict, durable: bool = True) -> str:
+        """
+        Persist a request and schedule it for delivery
+
+        Args:
+            request: Request dict built by build_request
+            durable: Wait until the request has been committed to disk
+
+        Returns:
+            Outbox ID of the request
+        """
+        outbox_id = uuid.uuid4().hex
+        now = time.time()
+        blob = pickle.dumps(request, protocol=pickle.HIGHEST_PROTOCOL)
+        self._write(
+            "INSERT INTO outbox "
+            "(id, url, request, state, attempts, created_at, next_attempt_at) "
+            "VALUES (?, ?, ?, 'pending', 0, ?, ?)",
+            (outbox_id, request.get('url'), blob, now, now),
+            wait=durable,
+        )
+        with self._cond:
+            self._counters['enqueued'] += 1
+        return outbox_id
+
+    def status(self, outbox_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the stored state of a request, or None if the ID is unknown
+        """
+        row = (
+            self._connect()
+            .execute(
+                "SELECT id, url, state, attempts, created_at, next_attempt_at, "
+                "last_attempt_at, last_status, last_error, delivered_at "
+                "FROM outbox WHERE id = ?",
+                (outbox_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        keys = (
+            'id',
+            'url',
+            'state',
+            'attempts',
+            'created_at',
+            'next_attempt_at',
+            'last_attempt_at',
+            'last_status',
+            'last_error',
+            'delivered_at',
+        )
+        entry = dict(zip(keys, row))
+        if entry['state'] == 'pending' and outbox_id in self._in_flight:
+            entry['state'] = 'sending'
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Row counts per state plus writer and delivery counters
+        """
+        rows = (
+            self._connect()
+            .execute("SELECT state, COUNT(*) FROM outbox GROUP BY state")
+            .fetchall()
+        )
+        with self._cond:
+            pending_writes = len(self._writes)
+        return {
+            'path': self.path,
+            'states': dict(rows),
+            'in_flight': len(self._in_flight),
+            'pending_writes': pending_writes,
+            **self._counters,
+        }
+
+    def replay(
+        self, outbox_ids: Optional[List[str]] = None, include_delivered: bool = False
+    ) -> int:
+        """
+        Reset dead (and optionally delivered) requests so they are sent again right away
+
+        The update goes through the writer like every other state change, and
+        requests this outbox is sending right now are left alone. Another
+        process delivering from the same database is not coordinated with, so
+        the CLI only replays while it holds the owner lock (see main).
+
+        Args:
+            outbox_ids: Only replay these IDs (default: every dead request)
+            include_delivered: Also resend requests that were already delivered
+
+        Returns:
+            Number of requests scheduled for replay
+        """
+        states = (
+            ('dead', 'pending', 'delivered')
+            if include_delivered
+            else ('dead', 'pending')
+        )
+        sql = (
+            f"UPDATE outbox SET state = 'pending', attempts = 0, next_attempt_at = ? "
+            f"WHERE request IS NOT NULL AND state IN ({','.join('?' * len(states))})"
+        )
+        params: List[Any] = [time.time(), *states]
+        if outbox_ids:
+            sql += f" AND id IN ({','.join('?' * len(outbox_ids))})"
+            params.extend(outbox_ids)
+        with self._cond:
+            in_flight = list(self._in_flight)
+        if in_flight:
+            sql += f" AND id NOT IN ({','.join('?' * len(in_flight))})"
+            params.extend(in_flight)
+        self._start_writer()
+        count = self._write(sql, tuple(params), wait=True)
+        self._wakeup.set()
+        return count
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until no request is due or in flight
+
+        Returns:
+            True if the outbox drained before the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                idle = not self._writes and not self._in_flight
+            if idle:
+                due = (
+                    self._connect()
+                    .execute(
+                        "SELECT COUNT(*) FROM outbox "
+                        "WHERE state = 'pending' AND next_attempt_at <= ?",
+                        (time.time(),),
+                    )
+                    .fetchone()[0]
+                )
+                if not due:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush pending writes and stop the background threads
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._scheduler_thread is not None:
+            self._scheduler_thread.join(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        # Deliveries write their outcome through the writer, so stop it last
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._writer_thread is not None:
+            self._writer_thread.join(timeout)
+        if self._owner_lock is not None:
+            self._owner_lock.close()
+            self._owner_lock = None
+
+    # ------------------------------------------------------------------ delivery
+
+    def _retry_delay(self, attempts: int) -> float:
+        # Exponential backoff with equal jitter
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, attempts - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @staticmethod
+    def _is_retryable(result: Dict) -> bool:
+        status_code = result.get('status_code')
+        return (
+            status_code is None
+            or status_code >= 500
+            or status_code in RETRYABLE_STATUS_CODES
+        )
+
+    def _deliver(self, outbox_id: str, blob: bytes, attempts: int) -> None:
+        request = None
+        try:
+            request = pickle.loads(blob)
+            request['background'] = True
+            result = self.send_fn(request)
+        except Exception as e:
+            result = {
+                'success': False,
+                'status_code': None,
+                'error': f'Unexpected error: {str(e)}',
+            }
+        now = time.time()
+        attempts += 1
+        error = result.get('error') or result.get('response_text')
+        try:
+            # Wait for each outcome to be committed so the row is never picked up twice
+            if result.get('success'):
+                outcome = 'delivered'
+                self._write(
+                    "UPDATE outbox SET state = 'delivered', request = NULL, "
+                    "attempts = ?, last_attempt_at = ?, last_status = ?, "
+                    "last_error = NULL, delivered_at = ? WHERE id = ?",
+                    (attempts, now, result.get('status_code'), now, outbox_id),
+                    wait=True,
+                )
+            elif attempts >= self.max_attempts or not self._is_retryable(result):
+                outcome = 'dead'
+                logger.warning(
+                    "Giving up on %s after %d attempts: %s",
+                    outbox_id,
+                    attempts,
+                    error,
+                    extra=fields(delivery_id=outbox_id, attempts=attempts, error=error),
+                )
+                self._write(
+                    "UPDATE outbox SET state = 'dead', attempts = ?, "
+                    "last_attempt_at = ?, last_status = ?, last_error = ? WHERE id = ?",
+                    (attempts, now, result.get('status_code'), error, outbox_id),
+                    wait=True,
+                )
+            else:
+                outcome = 'retried'
+                # Never retry sooner than the receiver asked for with Retry-After
+                delay = max(
+                    self._retry_delay(attempts), result.get('retry_after') or 0.0
+                )
+                if request is not None:
+                    get_metrics().requests_retried.inc(
+                        request.get('source', 'WebhookSender'),
+                        host_label(request['url']),
+                    )
+                self._write(
+                    "UPDATE outbox SET attempts = ?, next_attempt_at = ?, "
+                    "last_attempt_at = ?, last_status = ?, last_error = ? WHERE id = ?",
+                    (
+                        attempts,
+                        now + delay,
+                        now,
+                        result.get('status_code'),
+                        error,
+                        outbox_id,
+                    ),
+                    wait=True,
+                )
+        finally:
+            with self._cond:
+                self._in_flight.discard(outbox_id)
+            self._wakeup.set()
+        with self._cond:
+            self._counters[outcome] += 1
+
+    def _scheduler(self) -> None:
+        conn = self._connect()
+        last_purge = 0.0
+        while not self._stopping:
+            self._wakeup.clear()
+            now = time.time()
+            with self._cond:
+                in_flight = set(self._in_flight)
+            capacity = self.workers * 2 - len(in_flight)
+            if capacity > 0:
+                rows = conn.execute(
+                    "SELECT id, request, attempts FROM outbox "
+                    "WHERE state = 'pending' AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at LIMIT ?",
+                    (now, capacity + len(in_flight)),
+                ).fetchall()
+                for outbox_id, blob, attempts in rows:
+                    if capacity <= 0:
+                        break
+                    if outbox_id in in_flight or blob is None:
+                        continue
+                    with self._cond:
+                        self._in_flight.add(outbox_id)
+                    self._executor.submit(self._deliver, outbox_id, blob, attempts)
+                    capacity -= 1
+
+            if now - last_purge > 60:
+                last_purge = now
+                self._write(
+                    "DELETE FROM outbox WHERE state = 'delivered' AND delivered_at < ?",
+                    (now - self.retention,),
+                )
+
+            # Sleep until the next retry is due; finished deliveries and new
+            # requests wake us early
+            next_due = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox "
+                "WHERE state = 'pending' AND next_attempt_at > ?",
+                (now,),
+            ).fetchone()[0]
+            timeout = self.poll_interval
+            if next_due is not None:
+                timeout = min(timeout, max(0.0, next_due - time.time()))
+            self._wakeup.wait(timeout)
+
+
+_outbox: Optional[WebhookOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> WebhookOutbox:
+    """
+    Return the process-wide outbox, starting its delivery threads on first use
+
+    ``WEBHOOK_OUTBOX_WORKERS`` and ``WEBHOOK_OUTBOX_MAX_ATTEMPTS`` override the
+    defaults.
+    """
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = WebhookOutbox(
+                    workers=_env_int('WEBHOOK_OUTBOX_WORKERS', 2),
+                    max_attempts=_env_int('WEBHOOK_OUTBOX_MAX_ATTEMPTS', 8),
+                )
+    return _outbox
+
+
+def resume_outbox() -> Optional[WebhookOutbox]:
+    """
+    Resume delivery of requests left over from a previous run, if an outbox exists
+    """
+    if os.path.exists(default_outbox_path()):
+        return get_outbox()
+    return None
+
+
+def _cli_outbox_path() -> Optional[str]:
+    """
+    Outbox path the nodes use, found the same way they find it (None outside ComfyUI)
+    """
+    if os.environ.get('WEBHOOK_DATA_DIR'):
+        return os.path.join(os.environ['WEBHOOK_DATA_DIR'], 'outbox.sqlite3')
+    try:
+        import folder_paths
+    except ImportError:
+        return None
+    if not hasattr(folder_paths, 'get_user_directory'):
+        return None
+    return os.path.join(folder_paths.get_user_directory(), 'webhook', 'outbox.sqlite3')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Inspect and replay the webhook outbox"
+    )
+    parser.add_argument(
+        '--db',
+        default=None,
+        help="Outbox database path (default: the one ComfyUI uses, when run from "
+        "the ComfyUI directory or with WEBHOOK_DATA_DIR set)",
+    )
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help="Show row counts per state")
+    list_parser = sub.add_parser('list', help="List requests")
+    list_parser.add_argument('--state', default='dead')
+    list_parser.add_argument('--limit', type=int, default=50)
+    replay_parser = sub.add_parser(
+        'replay', help="Schedule dead requests for immediate redelivery"
+    )
+    replay_parser.add_argument('ids', nargs='*', help="Only replay these IDs")
+    replay_parser.add_argument('--include-delivered', action='store_true')
+    replay_parser.add_argument(
+        '--deliver',
+        action='store_true',
+        help="Deliver now from this process instead of leaving it to ComfyUI",
+    )
+    args = parser.parse_args(argv)
+
+    path = args.db or _cli_outbox_path()
+    if path is None:
+        parser.error("--db is required outside the ComfyUI directory")
+    # Reuse the outbox this process already delivers from: a second handle could
+    # never take the owner lock it holds
+    shared = _outbox
+    if shared is not None and os.path.abspath(shared.path) == os.path.abspath(path):
+        outbox = shared
+    else:
+        try:
+            outbox = WebhookOutbox(path=path, start=False, create=False)
+        except FileNotFoundError as e:
+            print(e)
+            return 1
+    if args.command == 'stats':
+        print(json.dumps(outbox.stats(), indent=2))
+    elif args.command == 'list':
+        rows = (
+            outbox._connect()
+            .execute(
+                "SELECT id FROM outbox WHERE state = ? ORDER BY created_at LIMIT ?",
+                (args.state, args.limit),
+            )
+            .fetchall()
+        )
+        for (outbox_id,) in rows:
+            print(json.dumps(outbox.status(outbox_id)))
+    elif args.command == 'replay':
+        if not outbox.acquire_owner_lock():
+            print(
+                "The outbox is in use by a running ComfyUI. Replay through "
+                "POST /webhook/outbox/replay or stop ComfyUI first."
+            )
+            return 1
+        count = outbox.replay(
+            args.ids or None, include_delivered=args.include_delivered
+        )
+        print(f"Scheduled {count} request(s) for replay")
+        if args.deliver:
+            outbox.start()
+            outbox.wait()
+        if outbox is not shared:
+            outbox.close()
+        if args.deliver:
+            print(json.dumps(outbox.stats(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,228 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from .delay import get_delay_engine
+from .log import fields, get_logger
+
+logger = get_logger("Pacing")
+
+PACING_ALGORITHMS = ("token_bucket", "sliding_window")
+
+
+class Pacer:
+    """
+    Admits at most ``limit`` operations per ``interval`` seconds
+
+    ``reserve`` books the earliest slot and returns how long the caller has
+    to wait for it, so waiting happens outside the lock and callers are
+    served in arrival order. "token_bucket" allows a burst of ``limit`` and
+    then spaces operations evenly; "sliding_window" allows any ``limit``
+    operations within every window of ``interval`` seconds.
+    """
+
+    def __init__(
+        self, name: str, limit: int, interval: float, algorithm: str = "token_bucket"
+    ):
+        if algorithm not in PACING_ALGORITHMS:
+            raise ValueError(f"Unsupported pacing algorithm: {algorithm}")
+        if limit < 1 or interval <= 0:
+            raise ValueError(
+                "Pacing needs at least 1 operation per a positive interval"
+            )
+        self.name = name
+        self.limit = int(limit)
+        self.interval = float(interval)
+        self.algorithm = algorithm
+        self._lock = threading.Lock()
+        # Token bucket: tokens may go negative, each missing token is one queued caller
+        self._tokens = float(self.limit)
+        self._refilled_at = time.monotonic()
+        # Sliding window: start times of admitted (or booked) operations
+        self._slots = deque()
+        self.counters = {
+            'operations': 0,
+            'waited': 0,
+            'wait_ms_total': 0.0,
+            'wait_ms_max': 0.0,
+        }
+
+    def settings(self) -> tuple:
+        return (self.limit, self.interval, self.algorithm)
+
+    def reserve(self) -> float:
+        """
+        Book the next slot
+
+        Returns:
+            Seconds to wait before the operation may start
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.algorithm == "token_bucket":
+                rate = self.limit / self.interval
+                self._tokens = min(
+                    float(self.limit), self._tokens + (now - self._refilled_at) * rate
+                )
+                self._refilled_at = now
+                self._tokens -= 1.0
+                wait = -self._tokens / rate if self._tokens < 0 else 0.0
+            else:
+                while self._slots and self._slots[0] <= now - self.interval:
+                    self._slots.popleft()
+                start = now
+                if len(self._slots) >= self.limit:
+                    start = max(now, self._slots[-self.limit] + self.interval)
+                self._slots.append(start)
+                wait = start - now
+            self.counters['operations'] += 1
+            if wait > 0:
+                self.counters['waited'] += 1
+                self.counters['wait_ms_total'] += wait * 1000.0
+                self.counters['wait_ms_max'] = max(
+                    self.counters['wait_ms_max'], wait * 1000.0
+                )
+        return wait
+
+    def refund(self, wait: float) -> None:
+        """
+        Give back a slot booked by reserve() whose operation never ran
+
+        E.g. because the wait for it was interrupted.
+        """
+        with self._lock:
+            self.counters['operations'] -= 1
+            if self.algorithm == "token_bucket":
+                self._tokens = min(float(self.limit), self._tokens + 1.0)
+            else:
+                start = time.monotonic() + wait
+                # Drop the booking closest to the refunded one
+                if self._slots:
+                    closest = min(self._slots, key=lambda slot: abs(slot - start))
+                    self._slots.remove(closest)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            if self.algorithm == "token_bucket":
+                rate = self.limit / self.interval
+                available = min(
+                    float(self.limit), self._tokens + (now - self._refilled_at) * rate
+                )
+            else:
+                available = self.limit - sum(
+                    1 for slot in self._slots if slot > now - self.interval
+                )
+            return {
+                'limit': self.limit,
+                'interval': self.interval,
+                'algorithm': self.algorithm,
+                'available': round(available, 3),
+                **{
+                    k: round(v, 3) if isinstance(v, float) else v
+                    for k, v in self.counters.items()
+                },
+            }
+
+
+class PacerRegistry:
+    """
+    Named, process-wide pacers shared by every Pacing Gate node using the same name
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pacers: Dict[str, Pacer] = {}
+
+    def get(
+        self, name: str, limit: int, interval: float, algorithm: str = "token_bucket"
+    ) -> Pacer:
+        """
+        Return the pacer called ``name``, creating or replacing it as needed
+
+        A pacer is replaced when its settings changed.
+        """
+        with self._lock:
+            pacer = self._pacers.get(name)
+            if pacer is None or pacer.settings() != (
+                int(limit),
+                float(interval),
+                algorithm,
+            ):
+                if pacer is not None:
+                    logger.info(
+                        "Pacer %s changed to %d per %ss (%s)",
+                        name,
+                        limit,
+                        interval,
+                        algorithm,
+                    )
+                pacer = Pacer(name, limit, interval, algorithm)
+                self._pacers[name] = pacer
+            return pacer
+
+    def reset(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            if name is None:
+                self._pacers.clear()
+            else:
+                self._pacers.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pacers = list(self._pacers.values())
+        return {pacer.name: pacer.stats() for pacer in pacers}
+
+
+_registry = PacerRegistry()
+
+
+def get_pacers() -> PacerRegistry:
+    return _registry
+
+
+def get_pacing_stats() -> Dict[str, Any]:
+    return _registry.stats()
+
+
+def pace(
+    name: str,
+    limit: int,
+    interval: float,
+    algorithm: str = "token_bucket",
+    progress: Optional[Callable[[int], Any]] = None,
+) -> float:
+    """
+    Wait until the pacer ``name`` admits one more operation
+
+    Args:
+        name: Pacer shared by every caller using the same name
+        limit: Operations allowed per ``interval``
+        interval: Window length in seconds
+        algorithm: "token_bucket" or "sliding_window"
+        progress: Progress bar factory for the wait (see DelayEngine.wait)
+
+    Returns:
+        Seconds actually waited (0 when the pacer had room)
+
+    Raises:
+        InterruptProcessingException: ComfyUI's interrupt was triggered while waiting
+    """
+    pacer = _registry.get(name, limit, interval, algorithm)
+    wait = pacer.reserve()
+    if wait <= 0:
+        return 0.0
+    logger.info(
+        "%s: waiting %.2fs to stay under %d per %ss",
+        name,
+        wait,
+        limit,
+        interval,
+        extra=fields(pacer=name, wait_s=round(wait, 3)),
+    )
+    try:
+        return get_delay_engine().wait(wait, progress)
+    except BaseException:
+        pacer.refund(wait)
+        raise
@@ -0,0 +1,388 @@
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+# Responses that mean "slow down"
+THROTTLE_STATUS_CODES = (429, 503)
+# Upper bound of the adaptive concurrency limit when no cap is configured
+ADAPTIVE_MAX_CONCURRENCY = 16
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a request waited longer than allowed for its host to accept it"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date)
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class _HostState:
+    def __init__(
+        self, rate: float, burst: int, initial_concurrency: int, max_concurrency: int
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        self.limit = float(min(initial_concurrency, max_concurrency))
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.latency_baseline: Optional[float] = None
+        self.last_decrease = 0.0
+        self.counters = {
+            'requests': 0,
+            'waited': 0,
+            'wait_ms_total': 0.0,
+            'wait_ms_max': 0.0,
+            'throttled_responses': 0,
+            'timeouts': 0,
+            'decreases': 0,
+        }
+
+    def refill(self, now: float) -> None:
+        if self.rate > 0:
+            self.tokens = min(
+                float(self.burst), self.tokens + (now - self.refilled_at) * self.rate
+            )
+        self.refilled_at = now
+
+
+class RateLimiter:
+    """
+    Process-wide per-host token bucket with a concurrency limit
+
+    Every request to a host takes a token (when a rate is set) and a
+    concurrency slot (when a limit is set). A Retry-After header blocks the
+    host until the given time. The concurrency limit is ``max_concurrency``
+    unless ``adaptive`` is set: then it grows by about one per round trip
+    while responses stay fast, and is halved on 429/503 responses or when
+    latency climbs well above the host's baseline. Latency is not normalized
+    by payload size, so the adaptive limit suits hosts that receive bodies of
+    similar size.
+    """
+
+    def __init__(
+        self,
+        rate: float = 0.0,
+        burst: int = 10,
+        initial_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = 0,
+        latency_factor: float = 2.0,
+        max_wait: float = 5.0,
+        background_max_wait: float = 60.0,
+        adaptive: bool = False,
+    ):
+        """
+        Args:
+            rate: Requests per second allowed per host (0 for no rate limit)
+            burst: Token bucket size, i.e. requests allowed back to back
+            initial_concurrency: Concurrent requests per host to start with
+            min_concurrency: Lower bound of the adaptive limit
+            max_concurrency: Concurrency limit (0 for no limit), or the upper bound
+                of the adaptive limit (default ADAPTIVE_MAX_CONCURRENCY)
+            latency_factor: Latency above this multiple of the baseline counts as
+                congestion
+            max_wait: Seconds a request sent from a node may wait for its host
+                before giving up (the node's thread is blocked meanwhile)
+            background_max_wait: Seconds a request sent by a background worker
+                (delivery queue, outbox, batching) may wait
+            adaptive: Adjust the concurrency limit to throttling and latency (AIMD)
+        """
+        self.rate = max(0.0, float(rate))
+        self.burst = max(1, int(burst))
+        self.min_concurrency = max(1, int(min_concurrency))
+        self.adaptive = bool(adaptive)
+        self.max_concurrency = self._concurrency_cap(max_concurrency)
+        cap = self.max_concurrency or ADAPTIVE_MAX_CONCURRENCY
+        self.initial_concurrency = max(
+            self.min_concurrency, min(int(initial_concurrency), cap)
+        )
+        self.latency_factor = max(1.0, float(latency_factor))
+        self.max_wait = float(max_wait)
+        self.background_max_wait = float(background_max_wait)
+        self._cond = threading.Condition()
+        self._hosts: Dict[str, _HostState] = {}
+        self._overrides: Dict[str, Dict[str, Any]] = {}
+
+    def _concurrency_cap(self, max_concurrency: Optional[int]) -> int:
+        # 0 means no cap, except that the adaptive limit always needs a ceiling
+        max_concurrency = int(max_concurrency or 0)
+        if max_concurrency <= 0:
+            return ADAPTIVE_MAX_CONCURRENCY if self.adaptive else 0
+        return max(self.min_concurrency, max_concurrency)
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def configure_host(
+        self,
+        host: str,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        """
+        Override the rate, burst or concurrency ceiling of one host
+
+        ``host`` is the URL's ``netloc``, e.g. "hooks.example.com".
+        """
+        with self._cond:
+            override = self._overrides.setdefault(host.lower(), {})
+            for name, value in (
+                ('rate', rate),
+                ('burst', burst),
+                ('max_concurrency', max_concurrency),
+            ):
+                if value is not None:
+                    override[name] = value
+            self._hosts.pop(host.lower(), None)
+            self._cond.notify_all()
+
+    def _state(self, host: str) -> _HostState:
+        # Caller must hold self._cond
+        state = self._hosts.get(host)
+        if state is None:
+            override = self._overrides.get(host, {})
+            max_concurrency = self._concurrency_cap(
+                override.get('max_concurrency', self.max_concurrency)
+            )
+            state = _HostState(
+                float(override.get('rate', self.rate)),
+                max(1, int(override.get('burst', self.burst))),
+                self.initial_concurrency if self.adaptive else max_concurrency,
+                max_concurrency,
+            )
+            self._hosts[host] = state
+        return state
+
+    def acquire(
+        self, url: str, timeout: Optional[float] = None, background: bool = False
+    ) -> float:
+        """
+        Wait until the host of ``url`` accepts another request
+
+        Args:
+            url: Request URL
+            timeout: Maximum seconds to wait (defaults to ``max_wait``, or
+                ``background_max_wait`` for background requests)
+            background: The caller is a background worker rather than a node
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If the host did not free up in time
+        """
+        host = self.host_key(url)
+        start = time.monotonic()
+        if timeout is None:
+            timeout = self.background_max_wait if background else self.max_wait
+        deadline = start + timeout
+        with self._cond:
+            state = self._state(host)
+            while True:
+                now = time.monotonic()
+                state.refill(now)
+                if state.blocked_until > now:
+                    wait_for = state.blocked_until - now
+                elif state.max_concurrency and state.in_flight >= int(state.limit):
+                    wait_for = None
+                elif state.rate > 0 and state.tokens < 1.0:
+                    wait_for = (1.0 - state.tokens) / state.rate
+                else:
+                    if state.rate > 0:
+                        state.tokens -= 1.0
+                    state.in_flight += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    state.counters['timeouts'] += 1
+                    raise RateLimitTimeout(
+                        f"Rate limited: waited {now - start:.1f}s for {host}"
+                    )
+                self._cond.wait(
+                    remaining if wait_for is None else min(wait_for, remaining)
+                )
+            waited = time.monotonic() - start
+            state.counters['requests'] += 1
+            if waited > 0.001:
+                state.counters['waited'] += 1
+                state.counters['wait_ms_total'] += waited * 1000.0
+                state.counters['wait_ms_max'] = max(
+                    state.counters['wait_ms_max'], waited * 1000.0
+                )
+        return waited
+
+    def release(
+        self,
+        url: str,
+        status_code: Optional[int] = None,
+        latency: Optional[float] = None,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """
+        Return a slot taken by acquire()
+
+        When adaptive, the outcome also adjusts the host's concurrency limit.
+
+        Args:
+            url: Request URL
+            status_code: Response status, or None if the request failed without one
+            latency: Seconds the request took
+            retry_after: Seconds from the response's Retry-After header
+        """
+        host = self.host_key(url)
+        now = time.monotonic()
+        with self._cond:
+            state = self._state(host)
+            state.in_flight = max(0, state.in_flight - 1)
+            if retry_after:
+                state.blocked_until = max(state.blocked_until, now + retry_after)
+
+            congested = False
+            if status_code in THROTTLE_STATUS_CODES:
+                state.counters['throttled_responses'] += 1
+                congested = True
+            if not self.adaptive:
+                self._cond.notify_all()
+                return
+            if not congested and status_code is not None and latency is not None:
+                state.latency_ewma = (
+                    latency
+                    if state.latency_ewma is None
+                    else 0.8 * state.latency_ewma + 0.2 * latency
+                )
+                if state.latency_baseline is None or latency < state.latency_baseline:
+                    state.latency_baseline = latency
+                else:
+                    # Let the baseline drift up slowly so it follows lasting changes
+                    state.latency_baseline += (latency - state.latency_baseline) * 0.01
+                congested = state.latency_ewma > self.latency_factor * max(
+                    state.latency_baseline, 0.001
+                )
+
+            if congested:
+                # Multiplicative decrease, at most once per round trip
+                if now - state.last_decrease >= (state.latency_ewma or 0.1):
+                    state.limit = max(float(self.min_concurrency), state.limit / 2.0)
+                    state.last_decrease = now
+                    state.counters['decreases'] += 1
+            elif status_code is not None:
+                # Additive increase: about +1 per limit's worth of responses
+                state.limit = min(
+                    float(state.max_concurrency), state.limit + 1.0 / state.limit
+                )
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current limits, waits and throttling counters per host
+        """
+        now = time.monotonic()
+        with self._cond:
+            hosts = {}
+            for host, state in self._hosts.items():
+                state.refill(now)
+                hosts[host] = {
+                    'rate': state.rate,
+                    'burst': state.burst,
+                    'tokens': round(state.tokens, 3) if state.rate > 0 else None,
+                    'concurrency_limit': (
+                        int(state.limit) if state.max_concurrency else None
+                    ),
+                    'max_concurrency': state.max_concurrency,
+                    'in_flight': state.in_flight,
+                    'blocked_for_s': round(max(0.0, state.blocked_until - now), 3),
+                    'latency_ms': (
+                        round(state.latency_ewma * 1000.0, 3)
+                        if state.latency_ewma is not None
+                        else None
+                    ),
+                    'baseline_ms': (
+                        round(state.latency_baseline * 1000.0, 3)
+                        if state.latency_baseline is not None
+                        else None
+                    ),
+                    **{
+                        k: round(v, 3) if isinstance(v, float) else v
+                        for k, v in state.counters.items()
+                    },
+                }
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'min_concurrency': self.min_concurrency,
+                'max_concurrency': self.max_concurrency,
+                'max_wait': self.max_wait,
+                'background_max_wait': self.background_max_wait,
+                'adaptive': self.adaptive,
+                'hosts': hosts,
+            }
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Return the process-wide rate limiter shared by every webhook node
+
+    Defaults can be overridden with ``WEBHOOK_RATE_LIMIT`` (requests per
+    second per host, 0 = unlimited), ``WEBHOOK_RATE_BURST``,
+    ``WEBHOOK_MAX_CONCURRENCY``, ``WEBHOOK_MAX_THROTTLE_WAIT`` and
+    ``WEBHOOK_BACKGROUND_THROTTLE_WAIT`` (seconds). Setting
+    ``WEBHOOK_ADAPTIVE_CONCURRENCY=1`` turns on the adaptive limit.
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        from .webhook_sender import _env_float, _env_int
+
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(
+                    rate=_env_float('WEBHOOK_RATE_LIMIT', 0.0),
+                    burst=_env_int('WEBHOOK_RATE_BURST', 10),
+                    max_concurrency=_env_int('WEBHOOK_MAX_CONCURRENCY', 0),
+                    max_wait=_env_float('WEBHOOK_MAX_THROTTLE_WAIT', 5.0),
+                    background_max_wait=_env_float(
+                        'WEBHOOK_BACKGROUND_THROTTLE_WAIT', 60.0
+                    ),
+                    adaptive=os.environ.get('WEBHOOK_ADAPTIVE_CONCURRENCY', '0').lower()
+                    not in ('0', 'false', 'no', ''),
+                )
+    return _rate_limiter
+
+
+def configure_rate_limiter(**settings) -> RateLimiter:
+    """
+    Replace the process-wide rate limiter (see RateLimiter for the settings)
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = RateLimiter(**settings)
+    return _rate_limiter
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    return get_rate_limiter().stats()
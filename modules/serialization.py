@@ -0,0 +1,160 @@
+import base64
+import json
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+# Wire format -> Content-Type
+WIRE_FORMATS = {
+    'json': 'application/json',
+    'msgpack': 'application/msgpack',
+    'cbor': 'application/cbor',
+}
+
+
+def _to_native(obj: Any) -> Any:
+    """
+    Fallback conversion for values the encoders don't handle themselves
+    """
+    if hasattr(obj, 'detach') and hasattr(obj, 'cpu'):
+        # Torch tensor: hand the encoder a NumPy array (or its list form)
+        obj = obj.detach().cpu().numpy()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(obj)).decode('ascii')
+    return str(obj)
+
+
+def _orjson_default(obj: Any) -> Any:
+    if hasattr(obj, 'detach') and hasattr(obj, 'cpu'):
+        array = obj.detach().cpu().numpy()
+        # orjson serializes contiguous arrays natively; anything else falls back to
+        # lists
+        return array if array.flags['C_CONTIGUOUS'] else array.tolist()
+    return _to_native(obj)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=_orjson_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(obj, default=_to_native, separators=(',', ':')).encode('utf-8')
+
+
+def _msgpack_dumps(obj: Any) -> bytes:
+    if msgpack is None:
+        raise ValueError("The msgpack wire format requires the msgpack package")
+    return msgpack.packb(obj, default=_to_native, use_bin_type=True)
+
+
+def _cbor_dumps(obj: Any) -> bytes:
+    if cbor2 is None:
+        raise ValueError("The cbor wire format requires the cbor2 package")
+    return cbor2.dumps(
+        obj, default=lambda encoder, value: encoder.encode(_to_native(value))
+    )
+
+
+_ENCODERS = {
+    'json': _json_dumps,
+    'msgpack': _msgpack_dumps,
+    'cbor': _cbor_dumps,
+}
+
+
+def available_formats() -> List[str]:
+    """
+    Wire formats whose encoder is installed
+    """
+    return ['json'] + [
+        name
+        for name, module in (('msgpack', msgpack), ('cbor', cbor2))
+        if module is not None
+    ]
+
+
+def json_backend() -> str:
+    return 'orjson' if orjson is not None else 'json'
+
+
+def serialize(obj: Any, wire_format: str = 'json') -> Tuple[bytes, str]:
+    """
+    Encode a payload for the wire
+
+    NumPy arrays and scalars (and torch tensors) are accepted directly, so
+    callers don't need to turn them into Python lists first. JSON goes
+    through orjson when it is installed, otherwise the stdlib encoder with
+    compact separators.
+
+    Args:
+        obj: Payload to encode
+        wire_format: "json", "msgpack" or "cbor"
+
+    Returns:
+        (encoded body, Content-Type)
+    """
+    try:
+        encoder = _ENCODERS[wire_format]
+    except KeyError:
+        raise ValueError(f"Unsupported wire format: {wire_format}")
+    return encoder(obj), WIRE_FORMATS[wire_format]
+
+
+def dumps_text(obj: Any) -> str:
+    """
+    Encode a payload as JSON text, e.g. for a multipart form field
+    """
+    return _json_dumps(obj).decode('utf-8')
+
+
+def body_preview(body: bytes, content_type: str, limit: int = 2000) -> str:
+    """
+    Short printable form of an encoded body for logging
+    """
+    if content_type != WIRE_FORMATS['json']:
+        return f"<{len(body)} bytes {content_type}>"
+    text = body[:limit].decode('utf-8', errors='replace')
+    if len(body) > limit:
+        text += f"... ({len(body)} bytes)"
+    return text
+
+
+def apply_content_type(headers: Dict[str, str], content_type: str) -> Dict[str, str]:
+    """
+    Set the Content-Type of the wire format
+
+    A Content-Type the caller chose is kept for JSON (e.g. a vendor JSON
+    type) but replaced for binary formats, which the receiver can't parse
+    as anything else.
+    """
+    existing = [name for name in headers if name.lower() == 'content-type']
+    if existing and content_type == WIRE_FORMATS['json']:
+        return headers
+    for name in existing:
+        del headers[name]
+    headers['Content-Type'] = content_type
+    return headers
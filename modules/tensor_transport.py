@@ -0,0 +1,228 @@
+import base64
+import io
+import json
+import struct
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .multipart import BufferedMultipartBody
+from .serialization import serialize
+
+TENSOR_ENCODINGS = ("json", "raw", "npy", "safetensors")
+
+# NumPy dtype name -> safetensors dtype code
+_SAFETENSORS_DTYPES = {
+    'float64': 'F64',
+    'float32': 'F32',
+    'float16': 'F16',
+    'bfloat16': 'BF16',
+    'int64': 'I64',
+    'int32': 'I32',
+    'int16': 'I16',
+    'int8': 'I8',
+    'uint64': 'U64',
+    'uint32': 'U32',
+    'uint16': 'U16',
+    'uint8': 'U8',
+    'bool': 'BOOL',
+}
+
+
+def is_array(obj: Any) -> bool:
+    """
+    True for NumPy arrays and torch tensors
+    """
+    return isinstance(obj, np.ndarray) or (
+        hasattr(obj, 'detach') and hasattr(obj, 'shape')
+    )
+
+
+def to_wire_array(obj: Any) -> Tuple[np.ndarray, str]:
+    """
+    View an array or tensor as a C-contiguous little-endian NumPy array
+
+    CPU tensors and arrays that are already contiguous are wrapped without a
+    copy. bfloat16 has no NumPy dtype, so its bits are returned as uint16.
+
+    Returns:
+        (array, dtype name reported to the receiver)
+    """
+    if hasattr(obj, 'detach'):
+        import torch
+
+        tensor = obj.detach().cpu()
+        if tensor.dtype == torch.bfloat16:
+            return (
+                np.ascontiguousarray(tensor.view(torch.int16).numpy().view(np.uint16)),
+                'bfloat16',
+            )
+        obj = tensor.numpy()
+    array = np.ascontiguousarray(obj)
+    if array.dtype.byteorder == '>':
+        array = array.astype(array.dtype.newbyteorder('<'))
+    return array, array.dtype.name
+
+
+def _npy_header(array: np.ndarray) -> bytes:
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        header, np.lib.format.header_data_from_array_1_0(array)
+    )
+    return header.getvalue()
+
+
+class TensorPayload:
+    """
+    Moves the arrays of a payload out of the JSON and into binary multipart parts
+
+    Each array is replaced by a descriptor with its dtype, shape and the
+    part (or safetensors key) holding its bytes; arrays up to
+    ``inline_max_bytes`` are embedded in the descriptor as base64 instead.
+    """
+
+    def __init__(self, encoding: str = "raw", inline_max_bytes: int = 0):
+        """
+        Args:
+            encoding: "raw" (little-endian buffer per part), "npy" (.npy file
+                per part) or "safetensors" (one part holding every array)
+            inline_max_bytes: Arrays up to this size are sent inline as base64
+        """
+        if encoding not in TENSOR_ENCODINGS or encoding == "json":
+            raise ValueError(f"Unsupported tensor encoding: {encoding}")
+        self.encoding = encoding
+        self.inline_max_bytes = max(0, int(inline_max_bytes))
+        self.arrays: List[Tuple[str, np.ndarray, str]] = []
+
+    def extract(self, obj: Any, path: str = "") -> Any:
+        """
+        Return a copy of ``obj`` with every array replaced by its descriptor
+        """
+        if isinstance(obj, dict):
+            return {
+                key: self.extract(value, f"{path}.{key}" if path else str(key))
+                for key, value in obj.items()
+            }
+        if isinstance(obj, (list, tuple)):
+            return [
+                self.extract(value, f"{path}.{index}" if path else str(index))
+                for index, value in enumerate(obj)
+            ]
+        if not is_array(obj):
+            return obj
+
+        array, dtype = to_wire_array(obj)
+        if array.dtype.hasobject:
+            # Object arrays have no binary layout; leave them to the JSON encoder
+            return array.tolist()
+        if self.encoding == "safetensors" and dtype not in _SAFETENSORS_DTYPES:
+            raise ValueError(f"safetensors can't hold {dtype} arrays")
+        descriptor = {
+            '__tensor__': True,
+            'dtype': dtype,
+            'shape': list(array.shape),
+            'byte_order': 'little',
+            'size_bytes': array.nbytes,
+        }
+        if array.nbytes <= self.inline_max_bytes:
+            descriptor['encoding'] = 'base64'
+            descriptor['data'] = base64.b64encode(memoryview(array).cast('B')).decode(
+                'ascii'
+            )
+            return descriptor
+
+        name = path or f"tensor_{len(self.arrays)}"
+        if self.encoding == "npy" and dtype == 'bfloat16':
+            # .npy can't describe bfloat16; widen the bits to float32
+            array = (array.astype(np.uint32) << 16).view(np.float32)
+            dtype = 'float32'
+            descriptor.update({'dtype': dtype, 'size_bytes': array.nbytes})
+        self.arrays.append((name, array, dtype))
+        descriptor['encoding'] = self.encoding
+        if self.encoding == "safetensors":
+            descriptor.update({'part': 'tensors', 'key': name})
+        else:
+            descriptor['part'] = f"tensor_{len(self.arrays) - 1}"
+        return descriptor
+
+    def _safetensors_buffers(self) -> List[Any]:
+        header = {}
+        offset = 0
+        for name, array, dtype in self.arrays:
+            header[name] = {
+                'dtype': _SAFETENSORS_DTYPES[dtype],
+                'shape': list(array.shape),
+                'data_offsets': [offset, offset + array.nbytes],
+            }
+            offset += array.nbytes
+        header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        # The data section is 8-byte aligned after the header
+        header_bytes += b' ' * (-len(header_bytes) % 8)
+        return [struct.pack('<Q', len(header_bytes)), header_bytes] + [
+            array for _, array, _ in self.arrays
+        ]
+
+    def build_body(
+        self, payload_body: bytes, payload_content_type: str
+    ) -> BufferedMultipartBody:
+        """
+        Build the multipart body: the encoded payload first, then the array parts
+        """
+        body = BufferedMultipartBody()
+        body.add_part('payload', [payload_body], content_type=payload_content_type)
+        if self.encoding == "safetensors":
+            if self.arrays:
+                body.add_part(
+                    'tensors',
+                    self._safetensors_buffers(),
+                    filename='tensors.safetensors',
+                    content_type='application/octet-stream',
+                )
+            return body
+        for index, (name, array, dtype) in enumerate(self.arrays):
+            if self.encoding == "npy":
+                body.add_part(
+                    f"tensor_{index}",
+                    [_npy_header(array), array],
+                    filename=f"tensor_{index}.npy",
+                    content_type='application/octet-stream',
+                )
+            else:
+                body.add_part(
+                    f"tensor_{index}",
+                    [array],
+                    filename=f"tensor_{index}.bin",
+                    content_type='application/octet-stream',
+                )
+        return body
+
+
+def encode_tensor_payload(
+    payload: Dict, encoding: str, inline_max_bytes: int = 0, wire_format: str = "json"
+) -> Tuple[Any, str, Dict[str, Any]]:
+    """
+    Encode a payload with its arrays as binary parts
+
+    Args:
+        payload: Payload that may contain NumPy arrays or torch tensors
+        encoding: "raw", "npy" or "safetensors"
+        inline_max_bytes: Arrays up to this size are embedded as base64
+        wire_format: Encoding of the payload part ("json", "msgpack" or "cbor")
+
+    Returns:
+        (request body, Content-Type, summary with array count and binary size).
+        If every array was inlined the body is just the encoded payload.
+    """
+    tensors = TensorPayload(encoding, inline_max_bytes)
+    payload_body, payload_content_type = serialize(
+        tensors.extract(payload), wire_format
+    )
+    summary = {
+        'encoding': encoding,
+        'arrays': len(tensors.arrays),
+        'binary_bytes': sum(array.nbytes for _, array, _ in tensors.arrays),
+    }
+    if not tensors.arrays:
+        return payload_body, payload_content_type, summary
+    body = tensors.build_body(payload_body, payload_content_type)
+    return body, body.content_type, summary
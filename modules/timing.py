@@ -0,0 +1,397 @@
+import bisect
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+TIMING_PHASES = ("dns", "connect", "tls", "upload", "ttfb", "download", "total")
+
+_current = threading.local()
+
+
+def set_timeouts(
+    request: Dict,
+    connect: Optional[float] = None,
+    read: Optional[float] = None,
+    total: Optional[float] = None,
+) -> Dict:
+    """
+    Give a request separate connect, read and total timeouts
+
+    Args:
+        request: Request dict built by build_request (its ``timeout`` is the read
+            timeout)
+        connect: Seconds to wait for the TCP connection (None or 0 keeps the read
+            timeout)
+        read: Seconds to wait between bytes from the server (None keeps ``timeout``)
+        total: Seconds the whole request may take, including the upload (None or 0
+            for no limit)
+
+    Returns:
+        The same request dict
+    """
+    if read:
+        request['timeout'] = read
+    timeouts = {}
+    if connect:
+        timeouts['connect'] = float(connect)
+    if total:
+        timeouts['total'] = float(total)
+    if timeouts:
+        request['timeouts'] = timeouts
+    else:
+        request.pop('timeouts', None)
+    return request
+
+
+def request_timeout(request: Dict) -> Any:
+    """
+    Timeout argument for requests: (connect, read)
+
+    The connect timeout is capped by the total timeout.
+    """
+    read = request.get('timeout', 30)
+    timeouts = request.get('timeouts') or {}
+    connect = timeouts.get('connect') or read
+    if timeouts.get('total'):
+        connect = min(connect, timeouts['total'])
+    return (connect, read)
+
+
+class RequestTiming:
+    """
+    Collects the phases of the HTTP exchanges made on this thread while active
+
+    The timed connection classes below add to the collector of their thread,
+    so a ``with RequestTiming():`` block around ``session.request`` is enough.
+    Redirects and resends inside the block add up. With ``total`` set, the
+    socket is shut down once the deadline passes.
+    """
+
+    def __init__(self, total: Optional[float] = None):
+        self.total_timeout = total or None
+        self.phases = {phase: 0.0 for phase in TIMING_PHASES}
+        self.new_connections = 0
+        self.expired = False
+        self.connection: Optional[HTTPConnection] = None
+        self._response_at: Optional[float] = None
+        self._started = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'RequestTiming':
+        self._started = time.perf_counter()
+        _current.timing = self
+        if self.total_timeout:
+            self._timer = threading.Timer(self.total_timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        now = time.perf_counter()
+        if self._timer is not None:
+            self._timer.cancel()
+        with self._lock:
+            self.connection = None
+        _current.timing = None
+        if self._response_at is not None:
+            # Whatever happens after the headers arrived is reading the body
+            self.phases['download'] += now - self._response_at
+        self.phases['total'] = now - self._started
+
+    @staticmethod
+    def _shutdown(connection: Optional[HTTPConnection]) -> None:
+        sock = getattr(connection, 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _expire(self) -> None:
+        with self._lock:
+            self.expired = True
+            self._shutdown(self.connection)
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] += max(0.0, seconds)
+
+    def attach(self, connection: HTTPConnection) -> None:
+        with self._lock:
+            self.connection = connection
+            if self.expired:
+                self._shutdown(connection)
+
+    def response_started(self) -> None:
+        self._response_at = time.perf_counter()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Phase durations in milliseconds; connection phases are 0 on a reused connection
+        """
+        timing = {
+            f"{phase}_ms": round(seconds * 1000.0, 3)
+            for phase, seconds in self.phases.items()
+        }
+        timing['connection_reused'] = self.new_connections == 0
+        if self.expired:
+            timing['total_timeout_exceeded'] = True
+        return timing
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return getattr(_current, 'timing', None)
+
+
+class _TimedConnectionMixin:
+    """
+    Records DNS, connect, TLS, upload and time to first byte into the RequestTiming
+    of the current thread
+    """
+
+    _measures_tls = False
+
+    def _new_conn(self):
+        timing = current_timing()
+        if timing is None:
+            return super()._new_conn()
+        start = time.perf_counter()
+        try:
+            # Resolve up front so the lookup and the TCP handshake are timed separately
+            addresses = [
+                info[4][0]
+                for info in socket.getaddrinfo(
+                    self._dns_host, self.port, 0, socket.SOCK_STREAM
+                )
+            ]
+        except socket.gaierror:
+            timing.add('dns', time.perf_counter() - start)
+            return super()._new_conn()  # raises urllib3's NameResolutionError
+        resolved = time.perf_counter()
+        timing.add('dns', resolved - start)
+
+        host = self._dns_host
+        error = None
+        try:
+            for address in dict.fromkeys(addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except Exception as e:
+                    error = e
+            else:
+                raise error
+        finally:
+            self._dns_host = host
+            timing.add('connect', time.perf_counter() - resolved)
+        timing.new_connections += 1
+        return sock
+
+    def connect(self):
+        timing = current_timing()
+        if timing is None:
+            return super().connect()
+        timing.attach(self)
+        start = time.perf_counter()
+        before = timing.phases['dns'] + timing.phases['connect']
+        try:
+            super().connect()
+        finally:
+            if self._measures_tls:
+                # Everything connect() did besides resolving and opening the socket
+                # is the handshake
+                spent = timing.phases['dns'] + timing.phases['connect'] - before
+                timing.add('tls', time.perf_counter() - start - spent)
+
+    def request(self, *args, **kwargs):
+        timing = current_timing()
+        if timing is None:
+            return super().request(*args, **kwargs)
+        timing.attach(self)
+        start = time.perf_counter()
+        before = timing.phases['dns'] + timing.phases['connect'] + timing.phases['tls']
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            # Connecting lazily happens inside request(); don't count it as upload
+            spent = (
+                timing.phases['dns']
+                + timing.phases['connect']
+                + timing.phases['tls']
+                - before
+            )
+            timing.add('upload', time.perf_counter() - start - spent)
+
+    def getresponse(self, *args, **kwargs):
+        timing = current_timing()
+        if timing is None:
+            return super().getresponse(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().getresponse(*args, **kwargs)
+        finally:
+            timing.add('ttfb', time.perf_counter() - start)
+            timing.response_started()
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    _measures_tls = True
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pools use the timed connection classes
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+# Bucket upper bounds in milliseconds
+HISTOGRAM_BUCKETS_MS = (
+    1,
+    2.5,
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+    30000,
+    60000,
+)
+
+
+class TimingHistogram:
+    """
+    Process-wide latency histograms, one per phase, overall and per host
+    """
+
+    def __init__(self, buckets_ms=HISTOGRAM_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self._series: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def _empty(self) -> Dict[str, Any]:
+        return {
+            'count': 0,
+            'sum_ms': 0.0,
+            'max_ms': 0.0,
+            'buckets': [0] * (len(self.buckets_ms) + 1),
+        }
+
+    def record(self, host: str, timing: Dict[str, Any]) -> None:
+        """
+        Add a timing summary (see RequestTiming.summary) for ``host``
+        """
+        with self._lock:
+            for key in ('*', host):
+                series = self._series.setdefault(key, {})
+                for phase in TIMING_PHASES:
+                    if phase in ('dns', 'connect', 'tls') and timing.get(
+                        'connection_reused'
+                    ):
+                        # A reused connection has no connection phases to measure
+                        continue
+                    value = timing.get(f"{phase}_ms")
+                    if value is None:
+                        continue
+                    hist = series.setdefault(phase, self._empty())
+                    hist['count'] += 1
+                    hist['sum_ms'] += value
+                    hist['max_ms'] = max(hist['max_ms'], value)
+                    hist['buckets'][bisect.bisect_left(self.buckets_ms, value)] += 1
+
+    def _quantile(self, hist: Dict[str, Any], q: float) -> Optional[float]:
+        if not hist['count']:
+            return None
+        rank = q * hist['count']
+        seen = 0
+        for index, count in enumerate(hist['buckets']):
+            if count and seen + count >= rank:
+                low = self.buckets_ms[index - 1] if index > 0 else 0.0
+                high = (
+                    self.buckets_ms[index]
+                    if index < len(self.buckets_ms)
+                    else hist['max_ms']
+                )
+                # Interpolate inside the bucket
+                return round(
+                    min(low + (high - low) * (rank - seen) / count, hist['max_ms']), 3
+                )
+            seen += count
+        return round(hist['max_ms'], 3)
+
+    def _describe(self, hist: Dict[str, Any]) -> Dict[str, Any]:
+        labels = [f"le_{bound:g}" for bound in self.buckets_ms] + ['le_inf']
+        return {
+            'count': hist['count'],
+            'mean_ms': (
+                round(hist['sum_ms'] / hist['count'], 3) if hist['count'] else None
+            ),
+            'max_ms': round(hist['max_ms'], 3),
+            'p50_ms': self._quantile(hist, 0.5),
+            'p95_ms': self._quantile(hist, 0.95),
+            'p99_ms': self._quantile(hist, 0.99),
+            'buckets': dict(zip(labels, hist['buckets'])),
+        }
+
+    def stats(self, host: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Histograms of every phase, overall (``host`` None) or for one host
+        """
+        with self._lock:
+            series = self._series.get(host or '*', {})
+            return {phase: self._describe(hist) for phase, hist in series.items()}
+
+    def hosts(self) -> List[str]:
+        with self._lock:
+            return [key for key in self._series if key != '*']
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+_histogram = TimingHistogram()
+
+
+def get_timing_histogram() -> TimingHistogram:
+    return _histogram
+
+
+def get_timing_stats() -> Dict[str, Any]:
+    """
+    Aggregated phase histograms, overall and per host
+    """
+    return {
+        'overall': _histogram.stats(),
+        'hosts': {host: _histogram.stats(host) for host in _histogram.hosts()},
+    }
@@ -0,0 +1,143 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+DEDUPE_POLICIES = ("off", "skip", "reference")
+
+
+def frame_digest(frame: Any, salt: str = "") -> str:
+    """
+    Content digest of a raw image frame, computed without encoding it
+
+    Args:
+        frame: Torch tensor or NumPy array for one frame
+        salt: Extra text mixed into the digest, e.g. the encode settings, so
+            the same pixels sent in another format get a different digest
+
+    Returns:
+        Hex BLAKE2b digest
+    """
+    if hasattr(frame, 'cpu'):
+        frame = frame.detach().cpu().numpy()
+    array = np.ascontiguousarray(frame)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{array.shape}|{array.dtype.str}|{salt}".encode('utf-8'))
+    digest.update(memoryview(array).cast('B'))
+    return digest.hexdigest()
+
+
+class UploadCache:
+    """
+    Thread-safe LRU cache with TTL of image digests already delivered to each URL
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        """
+        Args:
+            max_entries: Maximum number of (url, digest) pairs remembered
+            ttl: Seconds a delivered digest counts as cached (0 disables expiry)
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'recorded': 0,
+            'evicted': 0,
+            'expired': 0,
+        }
+
+    def contains(self, url: str, digest: str) -> bool:
+        """
+        Check whether ``digest`` was delivered to ``url`` recently
+
+        Every call counts as a hit or a miss.
+        """
+        key = (url, digest)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and self.ttl > 0
+                and now - entry['recorded_at'] > self.ttl
+            ):
+                del self._entries[key]
+                self._counters['expired'] += 1
+                entry = None
+            if entry is None:
+                self._counters['misses'] += 1
+                return False
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return True
+
+    def record(self, url: str, digests: Iterable[str]) -> None:
+        """
+        Remember digests that were delivered to ``url``
+        """
+        now = time.monotonic()
+        with self._lock:
+            for digest in digests:
+                key = (url, digest)
+                self._entries[key] = {'recorded_at': now}
+                self._entries.move_to_end(key)
+                self._counters['recorded'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evicted'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters and current size
+        """
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hit_ratio': self._counters['hits'] / lookups if lookups else 0.0,
+                **self._counters,
+            }
+
+
+_upload_cache: Optional[UploadCache] = None
+_upload_cache_lock = threading.Lock()
+
+
+def get_upload_cache() -> UploadCache:
+    """
+    Return the process-wide upload cache
+
+    ``WEBHOOK_UPLOAD_CACHE_SIZE`` and ``WEBHOOK_UPLOAD_CACHE_TTL`` override the
+    defaults.
+    """
+    global _upload_cache
+    if _upload_cache is None:
+        from .webhook_sender import _env_float, _env_int
+
+        with _upload_cache_lock:
+            if _upload_cache is None:
+                _upload_cache = UploadCache(
+                    max_entries=_env_int('WEBHOOK_UPLOAD_CACHE_SIZE', 1024),
+                    ttl=_env_float('WEBHOOK_UPLOAD_CACHE_TTL', 3600.0),
+                )
+    return _upload_cache
+
+
+def get_upload_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters of the shared upload cache
+    """
+    return get_upload_cache().stats()
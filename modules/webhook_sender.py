@@ -1,52 +1,1489 @@
 import requests
 import json
 import base64
+import logging
+import os
+import threading
+import time
 from typing import Dict, List, Optional, Union, Any
+from urllib.parse import urlsplit
 from PIL import Image
-import io
 import numpy as np
 
+from .circuit_breaker import get_circuit_breakers, is_endpoint_failure, set_fallback
+from .compression import (
+    compress_request,
+    compression_summary,
+    mark_unsupported,
+    set_compression,
+)
+from .image_encoding import (
+    ImageEncoderPool,
+    array_to_pil,
+    encode_image,
+    get_encoder_pool,
+    tensor_to_uint8,
+)
+from .image_store import IMAGE_DELIVERY_MODES, get_image_store
+from .log import fields, get_logger, payload_preview, redact_headers, text_preview
+from .metrics import get_metrics, host_label
+from .multipart import StreamingMultipartBody
+from .rate_limit import (
+    THROTTLE_STATUS_CODES,
+    RateLimitTimeout,
+    get_rate_limiter,
+    parse_retry_after,
+)
+from .serialization import apply_content_type, dumps_text, serialize
+from .timing import (
+    RequestTiming,
+    TimedHTTPAdapter,
+    get_timing_histogram,
+    request_timeout,
+    set_timeouts,
+)
+from .upload_cache import DEDUPE_POLICIES, frame_digest, get_upload_cache
+
+logger = get_logger("WebhookSender")
+
+
+def _is_frame(shape) -> bool:
+    # [H, W] or [H, W, C] with 1-4 channels
+    return len(shape) == 2 or (len(shape) == 3 and shape[-1] <= 4)
+
 
 def convert_tensor_to_pil(tensor):
     """
     Convert ComfyUI image tensor to PIL Image
     
     Args:
-        tensor: ComfyUI image tensor (numpy array or torch tensor)
+        tensor: ComfyUI image tensor (numpy array or torch tensor) with values in [0, 1]
         
     Returns:
-        PIL Image object
+        PIL Image object (L, LA, RGB or RGBA depending on the channel count)
     """
     if tensor is None:
         return None
     
-    # Ensure tensor is numpy array
-    if hasattr(tensor, 'cpu'):
-        tensor = tensor.cpu().numpy()
-    elif not isinstance(tensor, np.ndarray):
-        tensor = np.array(tensor)
+    if not hasattr(tensor, 'shape'):
+        tensor = np.asarray(tensor)
     
     # Handle different tensor formats
     if len(tensor.shape) == 4:  # Batch dimension
-        tensor = tensor[0]  # Take first image from batch
-    elif len(tensor.shape) == 3:
-        pass  # Already in correct format
-    else:
-        raise ValueError(f"Unexpected tensor shape: {tensor.shape}")
+        tensor = tensor[0]  # Take first image from batch (before converting the rest)
+    elif len(tensor.shape) == 3 and not _is_frame(tensor.shape):
+        tensor = tensor[0]  # Batch of grayscale masks
+    elif not _is_frame(tensor.shape):
+        raise ValueError(f"Unexpected tensor shape: {tuple(tensor.shape)}")
+    
+    return array_to_pil(tensor_to_uint8(tensor))
+
+
+def convert_tensor_to_pil_list(tensor) -> List[Image.Image]:
+    """
+    Convert every frame of a ComfyUI image batch to PIL Images
+
+    Args:
+        tensor: ComfyUI image tensor of shape [B, H, W, C], [H, W, C] or [B, H, W]
+
+    Returns:
+        List of PIL Image objects in batch order
+    """
+    if tensor is None:
+        return []
+    
+    if not hasattr(tensor, 'shape'):
+        tensor = np.asarray(tensor)
     
-    # Convert from [0, 1] to [0, 255] range
-    if tensor.max() <= 1.0:
-        tensor = (tensor * 255).astype(np.uint8)
+    # Convert the whole batch into one uint8 buffer, then wrap each frame
+    if len(tensor.shape) == 4 or (
+        len(tensor.shape) == 3 and not _is_frame(tensor.shape)
+    ):
+        return [array_to_pil(frame) for frame in tensor_to_uint8(tensor)]
+    elif _is_frame(tensor.shape):
+        return [array_to_pil(tensor_to_uint8(tensor))]
     else:
-        tensor = tensor.astype(np.uint8)
+        raise ValueError(f"Unexpected tensor shape: {tuple(tensor.shape)}")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class PooledHTTPClient:
+    """
+    Thread-safe registry of per-host HTTP sessions backed by keep-alive connection pools
+
+    One ``requests.Session`` is kept per scheme/host/port so that every webhook
+    node in the process reuses established TCP/TLS connections instead of
+    paying a new handshake for each request.
+    """
+
+    def __init__(
+        self, pool_size: int = 10, keep_alive: bool = True, idle_timeout: float = 300.0
+    ):
+        """
+        Args:
+            pool_size: Maximum number of pooled connections kept per host
+            keep_alive: If False, connections are closed after every request
+            idle_timeout: Seconds a host may stay unused before its pool is closed
+        """
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+        self._evicted_totals = {'requests': 0, 'connections_opened': 0, 'hosts': 0}
+        self.pool_size = max(1, int(pool_size))
+        self.keep_alive = bool(keep_alive)
+        self.idle_timeout = float(idle_timeout)
+
+    def configure(
+        self,
+        pool_size: Optional[int] = None,
+        keep_alive: Optional[bool] = None,
+        idle_timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Update pool settings. Existing pools are closed so the new settings apply
+        to every connection opened afterwards.
+        """
+        with self._lock:
+            if pool_size is not None:
+                self.pool_size = max(1, int(pool_size))
+            if keep_alive is not None:
+                self.keep_alive = bool(keep_alive)
+            if idle_timeout is not None:
+                self.idle_timeout = float(idle_timeout)
+            for key in list(self._hosts):
+                self._close_host(key)
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+    @staticmethod
+    def _connections_opened(entry: Dict[str, Any]) -> int:
+        # urllib3 counts every new socket on the pool it belongs to
+        pools = entry['adapter'].poolmanager.pools
+        opened = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += getattr(pool, 'num_connections', 0)
+        return opened
+
+    def _close_host(self, key: str) -> None:
+        # Caller must hold self._lock
+        entry = self._hosts.pop(key, None)
+        if entry is None:
+            return
+        self._evicted_totals['requests'] += entry['requests']
+        self._evicted_totals['connections_opened'] += self._connections_opened(entry)
+        self._evicted_totals['hosts'] += 1
+        entry['session'].close()
+
+    def _evict_idle_locked(self, now: float) -> int:
+        if self.idle_timeout <= 0:
+            return 0
+        idle = [
+            key
+            for key, entry in self._hosts.items()
+            if now - entry['last_used'] > self.idle_timeout
+        ]
+        for key in idle:
+            self._close_host(key)
+        return len(idle)
+
+    def evict_idle(self) -> int:
+        """
+        Close the pools of hosts that have not been used within ``idle_timeout``
+
+        Returns:
+            Number of host pools that were closed
+        """
+        with self._lock:
+            return self._evict_idle_locked(time.monotonic())
+
+    def session_for(self, url: str) -> requests.Session:
+        """
+        Return the shared session for the host of ``url``, creating it if needed
+        """
+        key = self._host_key(url)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle_locked(now)
+            entry = self._hosts.get(key)
+            if entry is None:
+                session = requests.Session()
+                adapter = TimedHTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_size, pool_block=False
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                entry = {
+                    'session': session,
+                    'adapter': adapter,
+                    'created': now,
+                    'last_used': now,
+                    'requests': 0,
+                }
+                self._hosts[key] = entry
+            entry['last_used'] = now
+            entry['requests'] += 1
+            return entry['session']
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send an HTTP request through the pooled session for the target host
+        """
+        session = self.session_for(url)
+        if not self.keep_alive:
+            headers = dict(kwargs.get('headers') or {})
+            headers.setdefault('Connection', 'close')
+            kwargs['headers'] = headers
+        return session.request(method, url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Connection reuse statistics, overall and per host
+
+        Returns:
+            Dict with request, opened-connection and reused-connection counts
+        """
+        now = time.monotonic()
+        with self._lock:
+            hosts = {}
+            total_requests = self._evicted_totals['requests']
+            total_opened = self._evicted_totals['connections_opened']
+            for key, entry in self._hosts.items():
+                opened = self._connections_opened(entry)
+                hosts[key] = {
+                    'requests': entry['requests'],
+                    'connections_opened': opened,
+                    'connections_reused': max(0, entry['requests'] - opened),
+                    'idle_seconds': round(now - entry['last_used'], 3),
+                }
+                total_requests += entry['requests']
+                total_opened += opened
+            return {
+                'pool_size': self.pool_size,
+                'keep_alive': self.keep_alive,
+                'idle_timeout': self.idle_timeout,
+                'active_hosts': len(self._hosts),
+                'evicted_hosts': self._evicted_totals['hosts'],
+                'requests': total_requests,
+                'connections_opened': total_opened,
+                'connections_reused': max(0, total_requests - total_opened),
+                'reuse_ratio': (
+                    max(0, total_requests - total_opened) / total_requests
+                    if total_requests
+                    else 0.0
+                ),
+                'hosts': hosts,
+            }
+
+    def close(self) -> None:
+        """
+        Close every pooled connection
+        """
+        with self._lock:
+            for key in list(self._hosts):
+                self._close_host(key)
+
+
+_http_client: Optional[PooledHTTPClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> PooledHTTPClient:
+    """
+    Return the process-wide pooled HTTP client shared by all webhook nodes
+
+    Defaults can be overridden with the ``WEBHOOK_POOL_SIZE``,
+    ``WEBHOOK_KEEP_ALIVE`` and ``WEBHOOK_POOL_IDLE_TIMEOUT`` environment variables.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = PooledHTTPClient(
+                    pool_size=_env_int('WEBHOOK_POOL_SIZE', 10),
+                    keep_alive=os.environ.get('WEBHOOK_KEEP_ALIVE', '1').lower()
+                    not in ('0', 'false', 'no'),
+                    idle_timeout=_env_float('WEBHOOK_POOL_IDLE_TIMEOUT', 300.0),
+                )
+    return _http_client
+
+
+def configure_http_client(
+    pool_size: Optional[int] = None,
+    keep_alive: Optional[bool] = None,
+    idle_timeout: Optional[float] = None,
+) -> PooledHTTPClient:
+    """
+    Reconfigure the shared HTTP client
+
+    Args:
+        pool_size: Maximum pooled connections per host
+        keep_alive: Whether to keep connections open between requests
+        idle_timeout: Seconds before an unused host pool is closed
+
+    Returns:
+        The shared PooledHTTPClient
+    """
+    client = get_http_client()
+    client.configure(
+        pool_size=pool_size, keep_alive=keep_alive, idle_timeout=idle_timeout
+    )
+    return client
+
+
+def get_http_client_stats() -> Dict[str, Any]:
+    """
+    Connection reuse statistics of the shared HTTP client
+    """
+    return get_http_client().stats()
+
+
+_data_directory = os.environ.get('WEBHOOK_DATA_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'webhook_data'
+)
+
+
+def get_data_directory(*parts: str) -> str:
+    """
+    Return (and create) a directory for webhook state such as spill files
+
+    Args:
+        *parts: Optional sub-directory names joined onto the data directory
+
+    Returns:
+        Absolute directory path
+    """
+    path = os.path.join(_data_directory, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def set_data_directory(path: str) -> None:
+    """
+    Change the base directory used for webhook state
+    """
+    global _data_directory
+    _data_directory = path
+
+
+def build_request(
+    method: str,
+    url: str,
+    headers: Optional[Dict] = None,
+    timeout: int = 30,
+    source: str = 'WebhookSender',
+    **body,
+) -> Dict:
+    """
+    Describe an HTTP request as a plain, picklable dict
+
+    Args:
+        method: HTTP method
+        url: Target URL
+        headers: Request headers
+        timeout: Request timeout in seconds
+        source: Label used in log output
+        **body: Body keyword arguments for requests (json, data, files)
+
+    Returns:
+        Request dict accepted by deliver_request
+    """
+    return {
+        'method': method,
+        'url': url,
+        'headers': dict(headers or {}),
+        'timeout': timeout,
+        'source': source,
+        'body': body,
+    }
+
+
+def _error_result(error: str) -> Dict:
+    return {
+        'success': False,
+        'error': error,
+        'status_code': None,
+        'response_text': None,
+        'headers': None,
+    }
+
+
+def deliver_request(request: Dict, client: Optional[PooledHTTPClient] = None) -> Dict:
+    """
+    Send a request built by build_request through the shared connection pool
+
+    Args:
+        request: Request dict; background workers set ``background`` so the
+            request may wait longer for a throttled host
+        client: Optional client, defaults to the process-wide pool
+
+    Returns:
+        Dict containing response status and data
+    """
+    source = request.get('source', 'WebhookSender')
+    log = get_logger(source)
+    client = client or get_http_client()
+    breakers = get_circuit_breakers()
+    allowed, circuit = breakers.before_request(request['url'])
+    if not allowed:
+        return _circuit_open(request, circuit, client)
+
+    limiter = get_rate_limiter()
+    compression = None
+    try:
+        throttle_wait = limiter.acquire(
+            request['url'], background=request.get('background', False)
+        )
+    except RateLimitTimeout as e:
+        breakers.cancel_request(request['url'])
+        log.warning("%s", e, extra=fields(url=request['url'], throttled=True))
+        get_metrics().requests_failed.inc(source, host_label(request['url']))
+        result = _error_result(str(e))
+        result['throttled'] = True
+        return result
+
+    status_code = None
+    retry_after = None
+    total_timeout = (request.get('timeouts') or {}).get('total')
+    timing = RequestTiming(total_timeout)
+    metrics = get_metrics()
+    host = host_label(request['url'])
+    metrics.in_flight.inc(source, host)
+    started = time.monotonic()
+    try:
+        body = request.get('body', {})
+        headers = request.get('headers')
+        if request.get('compression'):
+            body, headers, compression = compress_request(request)
+        with timing:
+            metrics.requests_sent.inc(source, host)
+            response = client.request(
+                request['method'],
+                request['url'],
+                headers=headers,
+                timeout=request_timeout(request),
+                **body,
+            )
+            if (
+                response.status_code == 415
+                and compression is not None
+                and not compression.get('streaming')
+            ):
+                # The receiver doesn't take compressed bodies: remember the host and
+                # resend as is
+                log.info(
+                    "Server rejected %s body, resending uncompressed",
+                    compression['codec'],
+                    extra=fields(url=request['url'], codec=compression['codec']),
+                )
+                mark_unsupported(request['url'])
+                compression = None
+                body = request.get('body', {})
+                metrics.requests_retried.inc(source, host)
+                metrics.requests_sent.inc(source, host)
+                response = client.request(
+                    request['method'],
+                    request['url'],
+                    headers=request.get('headers'),
+                    timeout=request_timeout(request),
+                    **body,
+                )
+        status_code = response.status_code
+        sent_bytes = _body_size(response, body)
+        if sent_bytes is not None:
+            metrics.bytes_sent.inc(source, host, sent_bytes)
+            metrics.payload_bytes.observe(source, host, sent_bytes)
+        for meta in getattr(body.get('data'), 'images_meta', ()):
+            # Streaming bodies encode their images while uploading
+            metrics.encode_seconds.observe(source, host, meta['encode_ms'] / 1000.0)
+        log.info(
+            "Response: %s from %s in %.0f ms",
+            response.status_code,
+            request['url'],
+            timing.phases['total'] * 1000.0,
+            extra=fields(
+                url=request['url'],
+                status_code=response.status_code,
+                duration_ms=round(timing.phases['total'] * 1000.0, 3),
+            ),
+        )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Response body: %s", text_preview(lambda: response.text))
+        if response.status_code < 400 and request.get('upload_digests'):
+            # Remember delivered images so identical ones can be skipped next time
+            get_upload_cache().record(request['url'], request['upload_digests'])
+        result = {
+            'success': response.status_code < 400,
+            'status_code': response.status_code,
+            'response_text': response.text,
+            'headers': dict(response.headers),
+        }
+        if response.status_code in THROTTLE_STATUS_CODES:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            result['throttled'] = True
+            if retry_after is not None:
+                result['retry_after'] = retry_after
+        if compression is not None:
+            result['compression'] = compression_summary(compression)
+    except requests.exceptions.RequestException as e:
+        if timing.expired:
+            # The total deadline closed the socket; report that rather than the
+            # resulting socket error
+            e = f"Total timeout of {total_timeout}s exceeded"
+        log.warning(
+            "RequestException: %s", e, extra=fields(url=request['url'], error=str(e))
+        )
+        result = _error_result(str(e))
+    except Exception as e:
+        log.exception(
+            "Unexpected error: %s", e, extra=fields(url=request['url'], error=str(e))
+        )
+        result = _error_result(f'Unexpected error: {str(e)}')
+    finally:
+        limiter.release(
+            request['url'], status_code, time.monotonic() - started, retry_after
+        )
+        metrics.in_flight.dec(source, host)
+    result['throttle_wait_ms'] = round(throttle_wait * 1000.0, 3)
+    result['timing'] = timing.summary()
+    get_timing_histogram().record(host, result['timing'])
+    metrics.request_seconds.observe(source, host, timing.phases['total'])
+    if not result['success']:
+        metrics.requests_failed.inc(source, host)
+
+    failed = is_endpoint_failure(result)
+    error = (result.get('error') or f"HTTP {status_code}") if failed else None
+    outcome = breakers.after_request(request['url'], failed, error)
+    if outcome is not None or circuit is not None:
+        # Report state changes caused by this request (e.g. the trial that closed
+        # the circuit)
+        transitions = (circuit or {}).get('transitions', []) + (outcome or {}).get(
+            'transitions', []
+        )
+        result['circuit'] = dict(outcome or circuit, transitions=transitions)
+    return result
+
+
+def _body_size(response: requests.Response, body: Dict) -> Optional[int]:
+    """
+    Bytes of request body that went out, if known
+    """
+    length = response.request.headers.get('Content-Length')
+    if length is not None:
+        return int(length)
+    # Chunked uploads: streaming bodies count what they produced
+    return getattr(body.get('data'), 'bytes_sent', None)
+
+
+def _circuit_open(
+    request: Dict, circuit: Dict, client: Optional[PooledHTTPClient]
+) -> Dict:
+    """
+    Handle a request whose endpoint's circuit is open: fail fast or use its fallback
+    """
+    source = request.get('source', 'WebhookSender')
+    log = get_logger(source)
+    fallback = request.get('fallback') or {}
+    diverted = {k: v for k, v in request.items() if k != 'fallback'}
+
+    if fallback.get('mode') == 'fallback_url':
+        log.warning(
+            "Circuit open for %s, sending to %s",
+            circuit['endpoint'],
+            fallback['url'],
+            extra=fields(url=request['url'], circuit='open', fallback=fallback['url']),
+        )
+        diverted['url'] = fallback['url']
+        # The fallback endpoint has its own circuit and must not record the
+        # primary's digests
+        diverted.pop('upload_digests', None)
+        result = deliver_request(diverted, client)
+        result['circuit'] = dict(circuit, fallback=fallback['url'])
+        return result
+
+    if fallback.get('mode') == 'outbox':
+        from .outbox import get_outbox
+
+        try:
+            outbox_id = get_outbox().enqueue(diverted)
+        except Exception as e:
+            log.error(
+                "Could not move request to the outbox: %s",
+                e,
+                extra=fields(url=request['url']),
+            )
+        else:
+            log.warning(
+                "Circuit open for %s, queued in outbox (%s)",
+                circuit['endpoint'],
+                outbox_id,
+                extra=fields(
+                    url=request['url'],
+                    circuit='open',
+                    fallback='outbox',
+                    delivery_id=outbox_id,
+                ),
+            )
+            return {
+                'success': True,
+                'queued': True,
+                'delivery_id': outbox_id,
+                'status_code': None,
+                'response_text': f"Circuit open, queued in outbox as {outbox_id}",
+                'headers': None,
+                'circuit': dict(circuit, fallback='outbox'),
+            }
+
+    log.warning(
+        "Circuit open for %s, failing fast (retry in %.0fs)",
+        circuit['endpoint'],
+        circuit['retry_in'],
+        extra=fields(url=request['url'], circuit='open', retry_in=circuit['retry_in']),
+    )
+    get_metrics().requests_failed.inc(source, host_label(request['url']))
+    result = _error_result(
+        f"Circuit open after {circuit['failures']} failures, "
+        f"retrying in {circuit['retry_in']:.0f}s"
+    )
+    result['circuit'] = circuit
+    # Lets the outbox wait for the circuit instead of burning attempts
+    result['retry_after'] = circuit['retry_in']
+    return result
+
+
+def combine_results(results: List[Dict]) -> Dict:
+    """
+    Merge the results of several requests into one result dict
     
-    # Convert to PIL Image
-    return Image.fromarray(tensor)
+    The combined result is successful only if every request succeeded. The
+    status fields come from the first failure (or the last request), and the
+    individual results are kept under ``requests``.
+    """
+    if not results:
+        return {
+            'success': True,
+            'skipped': True,
+            'status_code': None,
+            'response_text': 'Nothing to send: every image was already delivered',
+            'headers': None,
+        }
+    if len(results) == 1:
+        return results[0]
+    failed = [r for r in results if not r.get('success')]
+    combined = dict(failed[0] if failed else results[-1])
+    combined['success'] = not failed
+    combined['requests'] = results
+    compressed = [r['compression'] for r in results if r.get('compression')]
+    if compressed:
+        original = sum(c['original_bytes'] for c in compressed)
+        size = sum(c['compressed_bytes'] for c in compressed)
+        combined['compression'] = {
+            'codec': compressed[0]['codec'],
+            'level': compressed[0]['level'],
+            'original_bytes': original,
+            'compressed_bytes': size,
+            'ratio': round(original / size, 3) if size else None,
+            'compress_ms': round(sum(c['compress_ms'] for c in compressed), 3),
+        }
+    timings = [r['timing'] for r in results if r.get('timing')]
+    if timings:
+        # Requests are sent one after another, so their phases add up
+        combined['timing'] = {
+            key: round(sum(t.get(key, 0.0) for t in timings), 3)
+            for key in timings[0]
+            if key.endswith('_ms')
+        }
+        combined['timing']['connection_reused'] = all(
+            t.get('connection_reused') for t in timings
+        )
+    if failed:
+        reason = failed[0].get('error') or f"HTTP {failed[0].get('status_code')}"
+        combined['error'] = f"{len(failed)} of {len(results)} requests failed: {reason}"
+    return combined
+
+
+BATCH_MODES = ("first", "all", "chunked")
 
 
 class WebhookSender:
-    def __init__(self):
-        self.session = requests.Session()
+
+    def __init__(
+        self,
+        client: Optional[PooledHTTPClient] = None,
+        encoder: Optional[ImageEncoderPool] = None,
+    ):
+        self.client = client or get_http_client()
+        self.encoder = encoder or get_encoder_pool()
+
+    def prepare_webhook(
+        self,
+        url: str,
+        image: Any,
+        json_data: Optional[Dict] = {},
+        headers: Optional[Dict] = None,
+        timeout: int = 30,
+        send_as_json: bool = False,
+    ) -> Dict:
+        """
+        Encode the first image and JSON data into a request dict without sending it
+
+        Args:
+            url: The webhook URL to send the request to
+            image: ComfyUI image tensor to send
+            json_data: Optional JSON data to include in the request
+            headers: Optional custom headers
+            timeout: Request timeout in seconds
+            send_as_json: If True, send only JSON data (no images)
+
+        Returns:
+            Request dict for deliver_request
+        """
+        return self.prepare_webhooks(
+            url,
+            image,
+            json_data=json_data,
+            headers=headers,
+            timeout=timeout,
+            send_as_json=send_as_json,
+        )[0]
+
+    def prepare_webhooks(
+        self,
+        url: str,
+        image: Any,
+        json_data: Optional[Dict] = {},
+        headers: Optional[Dict] = None,
+        timeout: int = 30,
+        send_as_json: bool = False,
+        batch_mode: str = "first",
+        chunk_size: int = 4,
+        image_format: str = "PNG",
+        quality: Optional[int] = None,
+        compress_level: Optional[int] = None,
+        stream: bool = False,
+        dedupe: str = "off",
+        wire_format: str = "json",
+        compression: str = "off",
+        compression_level: Optional[int] = None,
+        compression_min_bytes: int = 1024,
+        circuit_fallback: str = "fail",
+        fallback_url: str = "",
+        connect_timeout: Optional[float] = None,
+        total_timeout: Optional[float] = None,
+        image_delivery: str = "upload",
+        reference_base_url: str = "",
+        dedupe_urls: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        Encode an image batch and JSON data into one or more request dicts
+
+        Args:
+            url: The webhook URL to send the request to
+            image: ComfyUI image tensor to send
+            json_data: Optional JSON data to include in the request
+            headers: Optional custom headers
+            timeout: Request timeout in seconds
+            send_as_json: If True, send only JSON data (no images)
+            batch_mode: "first" sends only the first frame (as ``image``),
+                "all" sends every frame in one request, "chunked" sends
+                ``chunk_size`` frames per request
+            chunk_size: Frames per request in "chunked" mode
+            image_format: PNG, JPEG, WEBP or WEBP_LOSSLESS
+            quality: Quality for JPEG/WebP (1-100)
+            compress_level: zlib level for PNG (0-9)
+            stream: Encode frames while uploading instead of buffering the
+                whole body (the requests can then only be sent once)
+            dedupe: What to do with images already delivered to this URL:
+                "off" sends them again, "skip" leaves them out (and drops
+                requests left without images), "reference" sends only their
+                digest in the payload
+            wire_format: Encoding of JSON-only requests: "json", "msgpack" or "cbor"
+                (the multipart ``payload`` field is always JSON)
+            compression: Request body compression: "off", "gzip", "zstd" or "br"
+            compression_level: Compression level (None or 0 for the codec default)
+            compression_min_bytes: Bodies smaller than this are sent uncompressed
+            circuit_fallback: What to do while the URL's circuit is open: "fail",
+                "outbox" or "fallback_url" (see set_fallback)
+            fallback_url: Secondary endpoint for the "fallback_url" fallback
+            connect_timeout: Seconds to wait for the connection (None or 0 uses
+                ``timeout``)
+            total_timeout: Seconds each request may take in all (None or 0 for no limit)
+            image_delivery: "upload" sends the encoded images in a multipart body,
+                "reference" writes them to the shared image store and sends a JSON
+                body with their path, ``/view`` URL and SHA-256 (``stream`` and
+                ``dedupe`` do not apply)
+            reference_base_url: Address of this ComfyUI server for ``/view`` URLs
+                (defaults to the image store's)
+            dedupe_urls: Every URL the requests will be sent to when they are
+                fanned out; an image then only counts as delivered if all of
+                them have it, so the shared bodies are right for each one
+
+        Returns:
+            List of request dicts for deliver_request (empty if everything was skipped)
+        """
+        if batch_mode not in BATCH_MODES:
+            raise ValueError(f"Unsupported batch mode: {batch_mode}")
+        if dedupe not in DEDUPE_POLICIES:
+            raise ValueError(f"Unsupported dedupe policy: {dedupe}")
+        if image_delivery not in IMAGE_DELIVERY_MODES:
+            raise ValueError(f"Unsupported image delivery: {image_delivery}")
+        image_options = {
+            'format': image_format,
+            'quality': quality,
+            'compress_level': compress_level,
+        }
+
+        # Set default headers if none provided
+        if headers is None:
+            headers = {'User-Agent': 'ComfyUI-Webhook/1.0'}
+        headers = dict(headers)
+        
+        if send_as_json:
+            # Send as pure JSON request
+
+            with get_metrics().serialize_seconds.time('WebhookSender', host_label(url)):
+                body, content_type = serialize(json_data, wire_format)
+            headers = apply_content_type(headers, content_type)
+            logger.info(
+                "Sending JSON request to %s (%d bytes)",
+                url,
+                len(body),
+                extra=fields(url=url, content_type=content_type, body_bytes=len(body)),
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Headers: %s, payload: %s",
+                    redact_headers(headers),
+                    payload_preview(body, content_type),
+                )
+
+            request = build_request(
+                'POST', url, headers=headers, timeout=timeout, data=body
+            )
+            set_compression(
+                request, compression, compression_level, compression_min_bytes
+            )
+            set_timeouts(request, connect_timeout, None, total_timeout)
+            return [set_fallback(request, circuit_fallback, fallback_url)]
+        
+        if image_delivery == "reference" and image is not None:
+            prepared = self._prepare_references(
+                url,
+                image,
+                json_data,
+                headers,
+                timeout,
+                image_options,
+                batch_mode,
+                chunk_size,
+                wire_format,
+                reference_base_url,
+            )
+            for request in prepared:
+                set_compression(
+                    request, compression, compression_level, compression_min_bytes
+                )
+                set_fallback(request, circuit_fallback, fallback_url)
+                set_timeouts(request, connect_timeout, None, total_timeout)
+            return prepared
+        
+        digests = {}
+        cached = set()
+        checked_urls = list(dedupe_urls or [url])
+        if dedupe != "off" and image is not None:
+            digests, cached = self._check_upload_cache(
+                checked_urls, image, batch_mode, image_options
+            )
+            if cached:
+                logger.info(
+                    "%d image(s) already delivered to every URL (%s)",
+                    len(cached),
+                    dedupe,
+                    extra=fields(url=url, cached=len(cached), dedupe=dedupe),
+                )
+        skip = cached if dedupe == "skip" else set()
+        
+        if stream and image is not None:
+            prepared = self._prepare_streaming(
+                url,
+                image,
+                json_data,
+                headers,
+                timeout,
+                image_options,
+                batch_mode,
+                chunk_size,
+                digests,
+                cached,
+                skip,
+            )
+        elif batch_mode == "first":
+            prepared = [
+                self._prepare_single(
+                    url,
+                    image,
+                    json_data,
+                    headers,
+                    timeout,
+                    image_options,
+                    digests.get(0),
+                    0 in cached,
+                    0 in skip,
+                )
+            ]
+        else:
+            prepared = self._prepare_batches(
+                url,
+                image,
+                json_data,
+                headers,
+                timeout,
+                image_options,
+                batch_mode,
+                chunk_size,
+                digests,
+                cached,
+                skip,
+            )
+        prepared = [request for request in prepared if request is not None]
+        for request in prepared:
+            set_compression(
+                request, compression, compression_level, compression_min_bytes
+            )
+            set_fallback(request, circuit_fallback, fallback_url)
+            set_timeouts(request, connect_timeout, None, total_timeout)
+            if request.get('upload_digests'):
+                # URLs whose upload cache decided what this request leaves out
+                # (see fanout.retarget)
+                request['dedupe_urls'] = checked_urls
+        return prepared
+
+    @staticmethod
+    def _raw_frames(image: Any) -> List[Any]:
+        if not hasattr(image, 'shape'):
+            image = np.asarray(image)
+        if len(image.shape) == 4 or (
+            len(image.shape) == 3 and not _is_frame(image.shape)
+        ):
+            return [image[i] for i in range(image.shape[0])]
+        return [image]
+
+    def _check_upload_cache(
+        self, urls: List[str], image: Any, batch_mode: str, image_options: Dict
+    ):
+        """
+        Hash the raw frames and look them up in the upload cache
+
+        Returns:
+            (digest per frame index, set of indices already delivered to every
+            URL in ``urls``)
+        """
+        frames = self._raw_frames(image)
+        if batch_mode == "first":
+            frames = frames[:1]
+        salt = json.dumps(image_options, sort_keys=True)
+        cache = get_upload_cache()
+        digests = {
+            index: frame_digest(frame, salt) for index, frame in enumerate(frames)
+        }
+        cached = {
+            index
+            for index, digest in digests.items()
+            if all(cache.contains(url, digest) for url in urls)
+        }
+        return digests, cached
+
+    def _prepare_references(
+        self,
+        url: str,
+        image: Any,
+        json_data: Optional[Dict],
+        headers: Dict,
+        timeout: int,
+        image_options: Dict,
+        batch_mode: str,
+        chunk_size: int,
+        wire_format: str,
+        base_url: str = "",
+    ) -> List[Dict]:
+        """
+        Write the frames to the image store and build JSON requests referring to them
+        """
+        frames = []
+        try:
+            frames = convert_tensor_to_pil_list(image)
+        except Exception as e:
+            logger.warning("Failed to convert image batch: %s", e)
+        if batch_mode == "first":
+            frames = frames[:1]
+        
+        start = time.perf_counter()
+        encoded = self.encoder.encode_frames(frames, **image_options)
+        host = host_label(url)
+        store = get_image_store()
+        references = []
+        for index, (frame, image_data) in enumerate(zip(frames, encoded)):
+            get_metrics().encode_seconds.observe(
+                'WebhookSender', host, image_data['encode_ms'] / 1000.0
+            )
+            reference = {'index': index, **store.store(image_data, base_url)}
+            reference.update(
+                {
+                    'width': frame.width,
+                    'height': frame.height,
+                    'encode_ms': round(image_data['encode_ms'], 3),
+                }
+            )
+            references.append(reference)
+        if frames:
+            logger.debug(
+                "Stored %d images in %.1f ms",
+                len(frames),
+                (time.perf_counter() - start) * 1000,
+            )
+
+        if batch_mode == "first":
+            payload = dict(json_data or {})
+            if references:
+                payload['image'] = references[0]
+            return [
+                self._reference_request(url, headers, timeout, payload, wire_format)
+            ]
+
+        size = (
+            max(1, int(chunk_size))
+            if batch_mode == "chunked"
+            else max(1, len(references))
+        )
+        chunks = [
+            references[start : start + size]
+            for start in range(0, len(references), size)
+        ] or [[]]
+        prepared = []
+        for chunk_index, chunk in enumerate(chunks):
+            payload = dict(json_data or {})
+            payload['images'] = chunk
+            payload['batch'] = {
+                'size': len(frames),
+                'chunk_index': chunk_index,
+                'chunk_count': len(chunks),
+            }
+            prepared.append(
+                self._reference_request(url, headers, timeout, payload, wire_format)
+            )
+        return prepared
+
+    def _reference_request(
+        self, url: str, headers: Dict, timeout: int, payload: Dict, wire_format: str
+    ) -> Dict:
+        with get_metrics().serialize_seconds.time('WebhookSender', host_label(url)):
+            body, content_type = serialize(payload, wire_format)
+        headers = apply_content_type(headers, content_type)
+        logger.info(
+            "Sending image references to %s (%d bytes)",
+            url,
+            len(body),
+            extra=fields(
+                url=url,
+                content_type=content_type,
+                body_bytes=len(body),
+                by_reference=True,
+            ),
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Headers: %s, payload: %s",
+                redact_headers(headers),
+                payload_preview(body, content_type),
+            )
+
+        return build_request('POST', url, headers=headers, timeout=timeout, data=body)
+
+    def _prepare_batches(
+        self,
+        url: str,
+        image: Any,
+        json_data: Optional[Dict],
+        headers: Dict,
+        timeout: int,
+        image_options: Dict,
+        batch_mode: str,
+        chunk_size: int,
+        digests: Dict[int, str],
+        cached: set,
+        skip: set,
+    ) -> List[Optional[Dict]]:
+        # Convert every frame of the batch
+        frames = []
+        if image is not None:
+            try:
+                frames = convert_tensor_to_pil_list(image)
+            except Exception as e:
+                logger.warning("Failed to convert image batch: %s", e)
+        
+        indices = [index for index in range(len(frames)) if index not in skip]
+        if frames and not indices:
+            return []
+        if batch_mode == "chunked" and indices:
+            size = max(1, int(chunk_size))
+        else:
+            size = max(1, len(indices))
+        chunks = [
+            indices[start : start + size] for start in range(0, len(indices), size)
+        ] or [[]]
+
+        # Encode the images that have to be uploaded up front, spread across the
+        # encoder pool
+        to_encode = [index for index in indices if index not in cached]
+        start = time.perf_counter()
+        encoded = dict(
+            zip(
+                to_encode,
+                self.encoder.encode_frames(
+                    [frames[i] for i in to_encode], **image_options
+                ),
+            )
+        )
+        host = host_label(url)
+        for frame in encoded.values():
+            get_metrics().encode_seconds.observe(
+                'WebhookSender', host, frame['encode_ms'] / 1000.0
+            )
+        if to_encode:
+            logger.debug(
+                "Encoded %d images in %.1f ms using %d workers",
+                len(to_encode),
+                (time.perf_counter() - start) * 1000,
+                self.encoder.workers,
+            )
+
+        return [
+            self._prepare_batch(
+                url,
+                frames,
+                encoded,
+                chunk,
+                chunk_index,
+                len(chunks),
+                json_data,
+                headers,
+                timeout,
+                digests,
+            )
+            for chunk_index, chunk in enumerate(chunks)
+        ]
+
+    def _prepare_single(
+        self,
+        url: str,
+        image: Any,
+        json_data: Optional[Dict],
+        headers: Dict,
+        timeout: int,
+        image_options: Dict,
+        digest: Optional[str] = None,
+        cached: bool = False,
+        skip: bool = False,
+    ) -> Optional[Dict]:
+        if skip:
+            return None
+        
+        # Prepare the multipart form data
+        files = []
+        data = {}
+        
+        if digest is not None:
+            # Identify the image so later sends can refer to it by digest
+            json_data = dict(json_data or {})
+            json_data['image'] = {'digest': digest, 'reference': cached}
+        
+        # Convert and add image to files
+        if cached:
+            logger.debug("Sending image digest only (already delivered)")
+        elif image is not None:
+            logger.debug("Preparing to send image as multipart form data")
+            try:
+                pil_image = convert_tensor_to_pil(image)
+                if pil_image is not None:
+                    encoded = encode_image(pil_image, **image_options)
+                    get_metrics().encode_seconds.observe(
+                        'WebhookSender', host_label(url), encoded['encode_ms'] / 1000.0
+                    )
+                    filename = f"image.{encoded['extension']}"
+                    files.append(
+                        ('image', (filename, encoded['data'], encoded['mime_type']))
+                    )
+                    logger.debug(
+                        "Added %s to files (size: %d bytes, encoded in %.1f ms)",
+                        filename,
+                        encoded['size_bytes'],
+                        encoded['encode_ms'],
+                    )
+            except Exception as e:
+                logger.warning("Failed to convert image: %s", e)
+        else:
+            logger.debug("No image to send")
+        
+        if json_data:
+            data['payload'] = dumps_text(json_data)
+            logger.debug("JSON data field: %s", payload_preview(data['payload']))
+        
+        request = self._multipart_request(url, headers, timeout, files, data)
+        if digest is not None and files:
+            request['upload_digests'] = [digest]
+        return request
+
+    def _prepare_batch(
+        self,
+        url: str,
+        frames: List[Image.Image],
+        encoded: Dict[int, Dict],
+        indices: List[int],
+        chunk_index: int,
+        chunk_count: int,
+        json_data: Optional[Dict],
+        headers: Dict,
+        timeout: int,
+        digests: Optional[Dict[int, str]] = None,
+    ) -> Dict:
+        files = []
+        images_meta = []
+        uploaded_digests = []
+        digests = digests or {}
+        logger.debug(
+            "Preparing %d of %d images (request %d/%d) as multipart form data",
+            len(indices),
+            len(frames),
+            chunk_index + 1,
+            chunk_count,
+        )
+
+        for index in indices:
+            if index not in encoded:
+                # Already delivered to this URL: refer to it by digest instead of
+                # uploading it again
+                images_meta.append(
+                    {'index': index, 'digest': digests[index], 'reference': True}
+                )
+                logger.debug("Referenced image %d by digest (already delivered)", index)
+                continue
+            pil_image = frames[index]
+            filename = f"image_{index}.{encoded[index]['extension']}"
+            files.append(
+                (
+                    'images',
+                    (filename, encoded[index]['data'], encoded[index]['mime_type']),
+                )
+            )
+            images_meta.append(
+                {
+                    'index': index,
+                    'filename': filename,
+                    'content_type': encoded[index]['mime_type'],
+                    'width': pil_image.width,
+                    'height': pil_image.height,
+                    'mode': pil_image.mode,
+                    'size_bytes': encoded[index]['size_bytes'],
+                    'encode_ms': round(encoded[index]['encode_ms'], 3),
+                }
+            )
+            if index in digests:
+                images_meta[-1].update({'digest': digests[index], 'reference': False})
+                uploaded_digests.append(digests[index])
+            logger.debug(
+                "Added %s to files (size: %d bytes, encoded in %.1f ms)",
+                filename,
+                encoded[index]['size_bytes'],
+                encoded[index]['encode_ms'],
+            )
+
+        # Per-image metadata travels in the JSON payload field
+        payload = dict(json_data or {})
+        payload['images'] = images_meta
+        payload['batch'] = {
+            'size': len(frames),
+            'chunk_index': chunk_index,
+            'chunk_count': chunk_count,
+        }
+        data = {'payload': dumps_text(payload)}
+        logger.debug("JSON data field: %s", payload_preview(data['payload']))
+        
+        request = self._multipart_request(url, headers, timeout, files, data)
+        if uploaded_digests:
+            request['upload_digests'] = uploaded_digests
+        return request
+
+    def _prepare_streaming(
+        self,
+        url: str,
+        image: Any,
+        json_data: Optional[Dict],
+        headers: Dict,
+        timeout: int,
+        image_options: Dict,
+        batch_mode: str,
+        chunk_size: int,
+        digests: Dict[int, str],
+        cached: set,
+        skip: set,
+    ) -> List[Optional[Dict]]:
+        if not hasattr(image, 'shape'):
+            image = np.asarray(image)
+        batched = len(image.shape) == 4 or (
+            len(image.shape) == 3 and not _is_frame(image.shape)
+        )
+        count = int(image.shape[0]) if batched else 1
+        
+        if batch_mode == "first":
+            if 0 in cached:
+                # Nothing to stream; fall back to the small digest-only request
+                return [
+                    self._prepare_single(
+                        url,
+                        image,
+                        json_data,
+                        headers,
+                        timeout,
+                        image_options,
+                        digests.get(0),
+                        True,
+                        0 in skip,
+                    )
+                ]
+            if 0 in digests:
+                json_data = dict(json_data or {})
+                json_data['image'] = {'digest': digests[0], 'reference': False}
+            body = StreamingMultipartBody(
+                image,
+                [0 if batched else None],
+                image_field='image',
+                filename_template='image.{extension}',
+                image_options=image_options,
+                leading_fields=(
+                    {'payload': dumps_text(json_data)} if json_data else None
+                ),
+                encoder=self.encoder,
+            )
+            return [
+                self._streaming_request(
+                    url, headers, timeout, body, [digests[0]] if 0 in digests else None
+                )
+            ]
+
+        indices = [index for index in range(count) if index not in skip]
+        if not indices:
+            return []
+        size = (
+            max(1, int(chunk_size)) if batch_mode == "chunked" else max(1, len(indices))
+        )
+        chunks = [
+            indices[start : start + size] for start in range(0, len(indices), size)
+        ]
+
+        # Per-image metadata is only known after encoding, so the payload field goes
+        # last
+        prepared = []
+        for chunk_index, chunk in enumerate(chunks):
+            uploads = [index for index in chunk if index not in cached]
+            body = StreamingMultipartBody(
+                image,
+                [index if batched else None for index in uploads],
+                image_options=image_options,
+                payload=dict(json_data or {}),
+                batch_info={
+                    'size': count,
+                    'chunk_index': chunk_index,
+                    'chunk_count': len(chunks),
+                },
+                encoder=self.encoder,
+                digests=digests,
+                references=[
+                    {'index': index, 'digest': digests[index], 'reference': True}
+                    for index in chunk
+                    if index in cached
+                ],
+            )
+            upload_digests = [digests[index] for index in uploads if index in digests]
+            prepared.append(
+                self._streaming_request(url, headers, timeout, body, upload_digests)
+            )
+        return prepared
+
+    def _streaming_request(
+        self,
+        url: str,
+        headers: Dict,
+        timeout: int,
+        body: StreamingMultipartBody,
+        upload_digests: Optional[List[str]] = None,
+    ) -> Dict:
+        headers = dict(headers)
+        headers['Content-Type'] = body.content_type
+        logger.info(
+            "Streaming multipart request to %s",
+            url,
+            extra=fields(url=url, streaming=True),
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Headers: %s, files: %s", redact_headers(headers), body.filenames()
+            )
+
+        request = build_request(
+            'POST', url, headers=headers, timeout=timeout, data=body
+        )
+        if upload_digests:
+            request['upload_digests'] = upload_digests
+        return request
+
+    def _multipart_request(
+        self, url: str, headers: Dict, timeout: int, files: List, data: Dict
+    ) -> Dict:
+        logger.info(
+            "Sending multipart request to %s (%d file(s))",
+            url,
+            len(files),
+            extra=fields(url=url, files=len(files)),
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Headers: %s, data fields: %s, files: %s",
+                redact_headers(headers),
+                list(data.keys()),
+                [f[1][0] for f in files],
+            )
+
+        return build_request(
+            'POST', url, headers=headers, timeout=timeout, files=files, data=data
+        )
+
+    def send_request(self, request: Dict) -> Dict:
+        """
+        Send a request dict produced by prepare_webhook
+        """
+        return deliver_request(request, client=self.client)
+    
+    def send_requests(self, prepared: List[Dict]) -> Dict:
+        """
+        Send request dicts in order and combine their results
+        """
+        return combine_results([self.send_request(request) for request in prepared])
     
     def send_webhook(self, 
                     url: str, 
@@ -54,7 +1491,24 @@ class WebhookSender:
                     json_data: Optional[Dict] = {},
                     headers: Optional[Dict] = None,
                     timeout: int = 30,
-                    send_as_json: bool = False) -> Dict:
+                    send_as_json: bool = False,
+                    batch_mode: str = "first",
+                    chunk_size: int = 4,
+                    image_format: str = "PNG",
+                    quality: Optional[int] = None,
+                    compress_level: Optional[int] = None,
+                    stream: bool = False,
+                    dedupe: str = "off",
+                    wire_format: str = "json",
+                    compression: str = "off",
+                    compression_level: Optional[int] = None,
+                    compression_min_bytes: int = 1024,
+                    circuit_fallback: str = "fail",
+                    fallback_url: str = "",
+                    connect_timeout: Optional[float] = None,
+                    total_timeout: Optional[float] = None,
+                    image_delivery: str = "upload",
+                    reference_base_url: str = "") -> Dict:
         """
         Send a webhook POST request with image and JSON data
         
@@ -65,94 +1519,58 @@ class WebhookSender:
             headers: Optional custom headers
             timeout: Request timeout in seconds
             send_as_json: If True, send only JSON data (no images)
+            batch_mode: "first", "all" or "chunked" (see prepare_webhooks)
+            chunk_size: Frames per request in "chunked" mode
+            image_format: PNG, JPEG, WEBP or WEBP_LOSSLESS
+            quality: Quality for JPEG/WebP (1-100)
+            compress_level: zlib level for PNG (0-9)
+            stream: Encode frames while uploading (chunked transfer encoding)
+            dedupe: "off", "skip" or "reference" for images already delivered to ``url``
+            wire_format: Encoding of JSON-only requests ("json", "msgpack" or "cbor")
+            compression: Request body compression ("off", "gzip", "zstd" or "br")
+            compression_level: Compression level (None or 0 for the codec default)
+            compression_min_bytes: Bodies smaller than this are sent uncompressed
+            circuit_fallback: "fail", "outbox" or "fallback_url" while the URL's
+                circuit is open
+            fallback_url: Secondary endpoint for the "fallback_url" fallback
+            connect_timeout: Seconds to wait for the connection (None or 0 uses
+                ``timeout``)
+            total_timeout: Seconds each request may take in all (None or 0 for no limit)
+            image_delivery: "upload" or "reference" (see prepare_webhooks)
+            reference_base_url: Address of this ComfyUI server for ``/view`` URLs
             
         Returns:
-            Dict containing response status and data
+            Dict containing response status and data; ``timing`` breaks the
+            time down into DNS, connect, TLS, upload, time to first byte and
+            download
         """
         try:
-            # Set default headers if none provided
-            if headers is None:
-                headers = {
-                    'User-Agent': 'ComfyUI-Webhook/1.0'
-                }
-            
-            if send_as_json:
-                # Send as pure JSON request
-                
-                headers['Content-Type'] = 'application/json'
-                print("[WebhookSender] Sending JSON request:")
-                print(f"  URL: {url}")
-                print(f"  Headers: {headers}")
-                print(f"  JSON Payload: {json.dumps(json_data, indent=2)}")
-                
-                response = self.session.post(
-                    url,
-                    json=json_data,
-                    headers=headers,
-                    timeout=timeout
-                )
-                print(f"[WebhookSender] Response: {response.status_code} {response.text}")
-            else:
-                # Prepare the multipart form data
-                files = []
-                data = {}
-                
-                # Convert and add image to files
-                if image is not None:
-                    print("[WebhookSender] Preparing to send image as multipart form data.")
-                    try:
-                        pil_image = convert_tensor_to_pil(image)
-                        if pil_image is not None:
-                            img_buffer = io.BytesIO()
-                            pil_image.save(img_buffer, format='PNG')
-                            img_buffer.seek(0)
-                            files.append(('image', ('image.png', img_buffer, 'image/png')))
-                            print(f"  Added image.png to files (size: {img_buffer.getbuffer().nbytes} bytes)")
-                    except Exception as e:
-                        print(f"Warning: Failed to convert image: {str(e)}")
-                else:
-                    print("[WebhookSender] No image to send.")
-                
-                if json_data:
-                    data['payload'] = json.dumps(json_data)
-                    print(f"  JSON data field: {data['payload']}")
-                print(f"[WebhookSender] Sending multipart request:")
-                print(f"  URL: {url}")
-                print(f"  Headers: {headers}")
-                print(f"  Data fields: {list(data.keys())}")
-                print(f"  Files: {[f[1][0] for f in files]}")
-                
-                response = self.session.post(
-                    url,
-                    files=files,
-                    data=data,
-                    headers=headers,
-                    timeout=timeout
-                )
-                print(f"[WebhookSender] Response: {response.status_code} {response.text}")
-            
-            return {
-                'success': response.status_code < 400,
-                'status_code': response.status_code,
-                'response_text': response.text,
-                'headers': dict(response.headers)
-            }
-            
-        except requests.exceptions.RequestException as e:
-            print(f"[WebhookSender] RequestException: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e),
-                'status_code': None,
-                'response_text': None,
-                'headers': None
-            }
+            prepared = self.prepare_webhooks(
+                url,
+                image,
+                json_data=json_data,
+                headers=headers,
+                timeout=timeout,
+                send_as_json=send_as_json,
+                batch_mode=batch_mode,
+                chunk_size=chunk_size,
+                image_format=image_format,
+                quality=quality,
+                compress_level=compress_level,
+                stream=stream,
+                dedupe=dedupe,
+                wire_format=wire_format,
+                compression=compression,
+                compression_level=compression_level,
+                compression_min_bytes=compression_min_bytes,
+                circuit_fallback=circuit_fallback,
+                fallback_url=fallback_url,
+                connect_timeout=connect_timeout,
+                total_timeout=total_timeout,
+                image_delivery=image_delivery,
+                reference_base_url=reference_base_url,
+            )
         except Exception as e:
-            print(f"[WebhookSender] Unexpected error: {str(e)}")
-            return {
-                'success': False,
-                'error': f'Unexpected error: {str(e)}',
-                'status_code': None,
-                'response_text': None,
-                'headers': None
-            } 
\ No newline at end of file
+            logger.exception("Unexpected error: %s", e, extra=fields(url=url))
+            return _error_result(f'Unexpected error: {str(e)}')
+        return self.send_requests(prepared)
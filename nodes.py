@@ -1,15 +1,165 @@
 # Package Modules
 import os
 import json
+import logging
 from typing import Union, Dict, List, Optional, Tuple, Any
 import time
 
+import numpy as np
+
 # ComfyUI Modules
 import folder_paths
 from comfy.utils import ProgressBar
 
 # Your Modules
-from .modules.webhook_sender import WebhookSender
+from .modules.webhook_sender import (
+    WebhookSender,
+    build_request,
+    deliver_request,
+    set_data_directory,
+)
+from .modules.delivery_queue import submit_delivery, get_delivery_status
+from .modules.outbox import get_outbox, resume_outbox
+from .modules.serialization import WIRE_FORMATS, apply_content_type, serialize
+from .modules.aggregator import get_aggregator, get_batch_status, set_batching
+from .modules.circuit_breaker import CIRCUIT_FALLBACKS, set_fallback
+from .modules.compression import COMPRESSION_CODECS, set_compression
+from .modules.fanout import (
+    FANOUT_WAIT_MODES,
+    fanout_targets,
+    get_fanout_sender,
+    parse_endpoints,
+)
+from .modules.tensor_transport import TENSOR_ENCODINGS, encode_tensor_payload
+from .modules.image_store import IMAGE_DELIVERY_MODES
+from .modules.timing import set_timeouts
+from .modules.metrics import get_metrics, host_label
+from .modules.log import fields, get_logger, payload_preview, redact_headers
+from .modules.delay import run_delay
+from .modules.pacing import PACING_ALGORITHMS, pace
+from .modules.callbacks import (
+    TIMEOUT_ACTIONS,
+    CallbackTimeout,
+    callback_url,
+    get_callback_registry,
+)
+
+# Keep spill files and other webhook state in ComfyUI's user directory
+if not os.environ.get('WEBHOOK_DATA_DIR') and hasattr(
+    folder_paths, 'get_user_directory'
+):
+    set_data_directory(os.path.join(folder_paths.get_user_directory(), 'webhook'))
+
+DELIVERY_MODES = ["sync", "async", "outbox"]
+# "batch" buffers small JSON events and sends them together as one array
+EVENT_DELIVERY_MODES = DELIVERY_MODES + ["batch"]
+WIRE_FORMAT_NAMES = list(WIRE_FORMATS)
+
+
+def _queue_delivery(request: Dict, delivery_mode: str) -> str:
+    """
+    Hand a request to the background dispatcher or the durable outbox and return its ID
+    """
+    if delivery_mode == "outbox":
+        return get_outbox().enqueue(request)
+    if delivery_mode == "batch":
+        return get_aggregator().add(request)
+    return submit_delivery(request)
+
+
+def _compression_note(result: Dict) -> str:
+    """
+    Describe the body compression of a result for the node output
+    """
+    info = result.get('compression')
+    if not info:
+        return ""
+    return (
+        f" [{info['codec']}: {info['original_bytes']} -> "
+        f"{info['compressed_bytes']} bytes, "
+        f"ratio {info['ratio']}, {info['compress_ms']:.1f} ms]"
+    )
+
+
+def _circuit_note(result: Dict) -> str:
+    """
+    Describe circuit breaker activity of a result for the node output
+    """
+    circuit = result.get('circuit')
+    if not circuit:
+        return ""
+    notes = [
+        f"{t['from']} -> {t['to']} ({t['reason']})"
+        for t in circuit.get('transitions', [])
+    ]
+    if circuit['state'] != "closed" and not notes:
+        notes.append(f"{circuit['state']}, retry in {circuit.get('retry_in', 0):.0f}s")
+    if circuit.get('fallback'):
+        notes.append(f"diverted to {circuit['fallback']}")
+    return f" [circuit {circuit['endpoint']}: {'; '.join(notes)}]"
+
+
+def _result_status(result: Dict) -> str:
+    """
+    Status output for a finished request
+    """
+    if result.get('queued'):
+        return "Queued"
+    if result['success']:
+        return f"Success ({result['status_code']})"
+    if (result.get('circuit') or {}).get('state') == "open":
+        return "Failed (circuit open)"
+    return "Failed"
+
+
+def _queue_fanout(targets: List[Dict], delivery_mode: str) -> Tuple[str, str]:
+    """
+    Queue the requests of every fan-out endpoint and report their delivery IDs
+    """
+    delivery_ids = [
+        _queue_delivery(request, delivery_mode)
+        for target in targets
+        for request in target['requests']
+    ]
+    if not delivery_ids:
+        return ("Skipped", "All images were already delivered to this URL")
+    return ("Queued", f"Delivery ID: {', '.join(delivery_ids)}")
+
+
+def _format_fanout(result: Dict) -> Tuple[str, str]:
+    """
+    Turn a fan-out result into the node's (status, response) outputs
+    """
+    total = len(result['endpoints'])
+    if result['pending'] == total:
+        status = f"Sending ({total} endpoints)"
+    elif result['success']:
+        status = f"Success ({result['succeeded']}/{total})"
+    else:
+        status = f"Failed ({result['succeeded']}/{total})"
+    return (status, json.dumps(result['endpoints'], default=str))
+
+
+def _unevaluated(kwargs: Dict, *names: str) -> List[str]:
+    """
+    Linked lazy inputs among ``names`` that ComfyUI has not evaluated yet
+
+    ComfyUI passes a linked but unevaluated input as None and leaves unconnected
+    optional inputs out; asking for an unconnected input raises an error.
+    """
+    return [name for name in names if name in kwargs and kwargs[name] is None]
+
+
+def _lookup_delivery(delivery_id: str) -> Optional[Dict]:
+    """
+    Find a delivery in the dispatcher history or the outbox
+    """
+    status = get_delivery_status(delivery_id) or get_batch_status(delivery_id)
+    if status is None:
+        outbox = resume_outbox()
+        if outbox is not None:
+            status = outbox.status(delivery_id)
+    return status
 
 
 class WebhookNotificationNode:
@@ -22,14 +172,147 @@ class WebhookNotificationNode:
         return {
             "required": {
                 "webhook_url": ("STRING", {"default": "https://your-webhook-url.com/endpoint", "label": "Webhook URL", "placeholder": "Enter the webhook endpoint URL"}),
-                "image": ("IMAGE",),  # ComfyUI image input - single image only
+                "image": (
+                    "IMAGE",
+                    {"lazy": True},
+                ),  # Only evaluated when the webhook is enabled
             },
             "optional": {
                 "json_data": ("STRING", {"default": "{}", "multiline": True, "label": "JSON Data", "placeholder": "Enter JSON data to send with the webhook"}),
                 "custom_headers": ("STRING", {"default": "{}", "multiline": True, "label": "Custom Headers", "placeholder": "Enter custom HTTP headers as JSON"}),
                 "timeout": ("INT", {"default": 30, "min": 5, "max": 300, "label": "Timeout (seconds)"}),
+                "connect_timeout": (
+                    "FLOAT",
+                    {
+                        "default": 0,
+                        "min": 0,
+                        "max": 300,
+                        "step": 0.5,
+                        "label": "Connect Timeout (seconds, 0 = timeout)",
+                    },
+                ),
+                "total_timeout": (
+                    "FLOAT",
+                    {
+                        "default": 0,
+                        "min": 0,
+                        "max": 3600,
+                        "step": 1,
+                        "label": "Total Timeout (seconds, 0 = none)",
+                    },
+                ),
                 "send_as_json": ("BOOLEAN", {"default": False, "label": "Send as JSON Only"}),
                 "enable_notification": ("BOOLEAN", {"default": True, "label": "Enable Webhook"}),
+                "delivery_mode": (
+                    DELIVERY_MODES,
+                    {"default": "sync", "label": "Delivery Mode"},
+                ),
+                "batch_mode": (
+                    ["first", "all", "chunked"],
+                    {"default": "first", "label": "Batch Mode"},
+                ),
+                "chunk_size": (
+                    "INT",
+                    {"default": 4, "min": 1, "max": 64, "label": "Images per Request"},
+                ),
+                "image_format": (
+                    ["PNG", "JPEG", "WEBP", "WEBP_LOSSLESS"],
+                    {"default": "PNG", "label": "Image Format"},
+                ),
+                "quality": (
+                    "INT",
+                    {
+                        "default": 90,
+                        "min": 1,
+                        "max": 100,
+                        "label": "Quality (JPEG/WebP)",
+                    },
+                ),
+                "compress_level": (
+                    "INT",
+                    {
+                        "default": 6,
+                        "min": 0,
+                        "max": 9,
+                        "label": "PNG Compression Level",
+                    },
+                ),
+                "stream_upload": (
+                    "BOOLEAN",
+                    {"default": False, "label": "Stream Upload (sync only)"},
+                ),
+                "dedupe": (
+                    ["off", "skip", "reference"],
+                    {"default": "off", "label": "Already Sent Images"},
+                ),
+                "wire_format": (
+                    WIRE_FORMAT_NAMES,
+                    {"default": "json", "label": "Wire Format (JSON only mode)"},
+                ),
+                "compression": (
+                    list(COMPRESSION_CODECS),
+                    {"default": "off", "label": "Body Compression"},
+                ),
+                "compression_level": (
+                    "INT",
+                    {
+                        "default": 0,
+                        "min": 0,
+                        "max": 22,
+                        "label": "Compression Level (0 = default)",
+                    },
+                ),
+                "compression_min_bytes": (
+                    "INT",
+                    {
+                        "default": 1024,
+                        "min": 0,
+                        "max": 104857600,
+                        "label": "Compress Bodies from (bytes)",
+                    },
+                ),
+                "additional_endpoints": (
+                    "STRING",
+                    {
+                        "default": "[]",
+                        "multiline": True,
+                        "label": "Additional Endpoints",
+                        "placeholder": (
+                            "JSON list of URLs or "
+                            "{\"url\", \"headers\", \"method\", \"timeout\"} objects"
+                        ),
+                    },
+                ),
+                "fanout_wait": (
+                    list(FANOUT_WAIT_MODES),
+                    {"default": "all", "label": "Wait For Endpoints"},
+                ),
+                "circuit_fallback": (
+                    list(CIRCUIT_FALLBACKS),
+                    {"default": "fail", "label": "When Endpoint Is Down"},
+                ),
+                "fallback_url": (
+                    "STRING",
+                    {
+                        "default": "",
+                        "label": "Fallback URL",
+                        "placeholder": "Secondary endpoint used while the circuit "
+                        "is open",
+                    },
+                ),
+                "image_delivery": (
+                    list(IMAGE_DELIVERY_MODES),
+                    {"default": "upload", "label": "Send Images"},
+                ),
+                "reference_base_url": (
+                    "STRING",
+                    {
+                        "default": "",
+                        "label": "ComfyUI URL for References",
+                        "placeholder": "Base of the /view links, "
+                        "e.g. http://comfyui.local:8188",
+                    },
+                ),
             }
         }
 
@@ -39,14 +322,44 @@ class WebhookNotificationNode:
     CATEGORY = "Webhook"
     OUTPUT_NODE = True
 
+    def check_lazy_status(
+        self, enable_notification: bool = True, send_as_json: bool = False, **kwargs
+    ) -> List[str]:
+        """
+        Ask ComfyUI for the image only when the webhook will be sent with it
+        """
+        if not enable_notification or send_as_json:
+            return []
+        return _unevaluated(kwargs, "image")
+
     def send_webhook(self,
                     webhook_url: str,
-                    image: Any,
+                    image: Any = None,
                     json_data: str = "{}",
                     custom_headers: str = "{}",
                     timeout: int = 30,
+                    connect_timeout: float = 0,
+                    total_timeout: float = 0,
                     send_as_json: bool = False,
-                    enable_notification: bool = True) -> Tuple[str, str]:
+                    enable_notification: bool = True,
+                    delivery_mode: str = "sync",
+                    batch_mode: str = "first",
+                    chunk_size: int = 4,
+                    image_format: str = "PNG",
+                    quality: int = 90,
+                    compress_level: int = 6,
+                    stream_upload: bool = False,
+                    dedupe: str = "off",
+                    wire_format: str = "json",
+                    compression: str = "off",
+                    compression_level: int = 0,
+                    compression_min_bytes: int = 1024,
+                    additional_endpoints: str = "[]",
+                    fanout_wait: str = "all",
+                    circuit_fallback: str = "fail",
+                    fallback_url: str = "",
+                    image_delivery: str = "upload",
+                    reference_base_url: str = "") -> Tuple[str, str]:
         
         if not enable_notification:
             return ("Skipped", "Webhook notification disabled")
@@ -57,13 +370,13 @@ class WebhookNotificationNode:
         pbar.update(0)
         
         try:
-            # Debug: Check what we received
-            print(f"Debug: Received image type: {type(image)}")
-            if image is not None:
-                print(f"Debug: Image shape: {image.shape}")
-            else:
-                print("Debug: Image is None")
-            
+            logger = get_logger("WebhookSender")
+            logger.debug(
+                "Received image of type %s, shape %s",
+                type(image).__name__,
+                getattr(image, 'shape', None),
+            )
+
             # Parse JSON data
             try:
                 parsed_json = json.loads(json_data) if json_data.strip() else {}
@@ -78,31 +391,96 @@ class WebhookNotificationNode:
             
             pbar.update(1)
             
-            # Initialize webhook sender
+            try:
+                endpoints = parse_endpoints(
+                    webhook_url, parsed_headers, timeout, "POST", additional_endpoints
+                )
+            except (json.JSONDecodeError, ValueError) as e:
+                return ("Error", f"Invalid additional endpoints: {str(e)}")
+            
+            # Initialize webhook sender (backed by the shared connection pool)
             webhook_sender = WebhookSender()
+            options = dict(
+                json_data=parsed_json,
+                headers=parsed_headers,
+                timeout=timeout,
+                send_as_json=send_as_json,
+                batch_mode=batch_mode,
+                chunk_size=chunk_size,
+                image_format=image_format,
+                quality=quality,
+                compress_level=compress_level,
+                dedupe=dedupe,
+                wire_format=wire_format,
+                compression=compression,
+                compression_level=compression_level,
+                compression_min_bytes=compression_min_bytes,
+                circuit_fallback=circuit_fallback,
+                fallback_url=fallback_url,
+                connect_timeout=connect_timeout,
+                total_timeout=total_timeout,
+                image_delivery=image_delivery,
+                reference_base_url=reference_base_url.strip(),
+            )
             
             pbar.update(2)
             
+            if len(endpoints) > 1:
+                # Encode once and share the bodies between endpoints (streamed bodies
+                # can only be sent once)
+                if stream_upload:
+                    logger.info(
+                        "Stream upload is not used when sending to several endpoints"
+                    )
+                prepared = webhook_sender.prepare_webhooks(
+                    url=webhook_url,
+                    image=image,
+                    dedupe_urls=[endpoint['url'] for endpoint in endpoints],
+                    **options,
+                )
+                targets = fanout_targets(prepared, endpoints)
+                if delivery_mode != "sync":
+                    pbar.update(3)
+                    return _queue_fanout(targets, delivery_mode)
+                result = get_fanout_sender().send(targets, fanout_wait)
+                pbar.update(3)
+                return _format_fanout(result)
+            
+            if delivery_mode != "sync":
+                # Encode now, deliver in the background (or via the durable outbox)
+                prepared = webhook_sender.prepare_webhooks(
+                    url=webhook_url, image=image, **options
+                )
+                pbar.update(3)
+                return _queue_fanout(
+                    [{'url': webhook_url, 'requests': prepared}], delivery_mode
+                )
+
             # Send webhook
             result = webhook_sender.send_webhook(
-                url=webhook_url,
-                image=image, # Pass a list with a single image
-                json_data=parsed_json,
-                headers=parsed_headers,
-                timeout=timeout,
-                send_as_json=send_as_json
+                url=webhook_url, image=image, stream=stream_upload, **options
             )
-            
+
             pbar.update(3)
             
             # Format response
-            if result['success']:
-                status = f"Success ({result['status_code']})"
-                response = f"Response: {result['response_text']}"
+            if result.get('skipped'):
+                status = "Skipped"
+                response = result['response_text']
+            elif result['success']:
+                status = _result_status(result)
+                response = (
+                    f"Response: {result['response_text']}"
+                    + _compression_note(result)
+                    + _circuit_note(result)
+                )
             else:
-                status = "Failed"
-                response = f"Error: {result.get('error', 'Unknown error')}"
-            
+                status = _result_status(result)
+                response = (
+                    f"Error: {result.get('error', 'Unknown error')}"
+                    + _circuit_note(result)
+                )
+
             return (status, response)
             
         except Exception as e:
@@ -121,12 +499,134 @@ class GenericWebhookNode:
                 "webhook_url": ("STRING", {"default": "https://your-webhook-url.com/endpoint", "label": "Webhook URL", "placeholder": "Enter the webhook endpoint URL"}),
             },
             "optional": {
-                "any_input": (None,),  # Accepts any input type
+                "any_input": (
+                    None,
+                    {"lazy": True},
+                ),  # Accepts any input type, evaluated only when enabled
                 "json_data": ("STRING", {"default": "{}", "multiline": True, "label": "Additional JSON Data", "placeholder": "Enter additional JSON data to send with the webhook"}),
                 "custom_headers": ("STRING", {"default": "{}", "multiline": True, "label": "Custom Headers", "placeholder": "Enter custom HTTP headers as JSON"}),
                 "timeout": ("INT", {"default": 30, "min": 5, "max": 300, "label": "Timeout (seconds)"}),
+                "connect_timeout": (
+                    "FLOAT",
+                    {
+                        "default": 0,
+                        "min": 0,
+                        "max": 300,
+                        "step": 0.5,
+                        "label": "Connect Timeout (seconds, 0 = timeout)",
+                    },
+                ),
+                "total_timeout": (
+                    "FLOAT",
+                    {
+                        "default": 0,
+                        "min": 0,
+                        "max": 3600,
+                        "step": 1,
+                        "label": "Total Timeout (seconds, 0 = none)",
+                    },
+                ),
                 "http_method": (["POST", "PUT", "PATCH"], {"default": "POST", "label": "HTTP Method"}),
                 "enable_notification": ("BOOLEAN", {"default": True, "label": "Enable Webhook"}),
+                "delivery_mode": (
+                    EVENT_DELIVERY_MODES,
+                    {"default": "sync", "label": "Delivery Mode"},
+                ),
+                "wire_format": (
+                    WIRE_FORMAT_NAMES,
+                    {"default": "json", "label": "Wire Format"},
+                ),
+                "tensor_encoding": (
+                    list(TENSOR_ENCODINGS),
+                    {"default": "json", "label": "Tensor Encoding"},
+                ),
+                "inline_max_bytes": (
+                    "INT",
+                    {
+                        "default": 1024,
+                        "min": 0,
+                        "max": 1048576,
+                        "label": "Inline Arrays up to (bytes)",
+                    },
+                ),
+                "compression": (
+                    list(COMPRESSION_CODECS),
+                    {"default": "off", "label": "Body Compression"},
+                ),
+                "compression_level": (
+                    "INT",
+                    {
+                        "default": 0,
+                        "min": 0,
+                        "max": 22,
+                        "label": "Compression Level (0 = default)",
+                    },
+                ),
+                "compression_min_bytes": (
+                    "INT",
+                    {
+                        "default": 1024,
+                        "min": 0,
+                        "max": 104857600,
+                        "label": "Compress Bodies from (bytes)",
+                    },
+                ),
+                "additional_endpoints": (
+                    "STRING",
+                    {
+                        "default": "[]",
+                        "multiline": True,
+                        "label": "Additional Endpoints",
+                        "placeholder": (
+                            "JSON list of URLs or "
+                            "{\"url\", \"headers\", \"method\", \"timeout\"} objects"
+                        ),
+                    },
+                ),
+                "fanout_wait": (
+                    list(FANOUT_WAIT_MODES),
+                    {"default": "all", "label": "Wait For Endpoints"},
+                ),
+                "circuit_fallback": (
+                    list(CIRCUIT_FALLBACKS),
+                    {"default": "fail", "label": "When Endpoint Is Down"},
+                ),
+                "fallback_url": (
+                    "STRING",
+                    {
+                        "default": "",
+                        "label": "Fallback URL",
+                        "placeholder": "Secondary endpoint used while the circuit "
+                        "is open",
+                    },
+                ),
+                "batch_max_events": (
+                    "INT",
+                    {
+                        "default": 50,
+                        "min": 1,
+                        "max": 10000,
+                        "label": "Batch: Max Events",
+                    },
+                ),
+                "batch_max_bytes": (
+                    "INT",
+                    {
+                        "default": 1048576,
+                        "min": 1024,
+                        "max": 104857600,
+                        "label": "Batch: Max Bytes",
+                    },
+                ),
+                "batch_max_delay_ms": (
+                    "INT",
+                    {
+                        "default": 1000,
+                        "min": 0,
+                        "max": 600000,
+                        "label": "Batch: Max Delay (ms)",
+                    },
+                ),
             }
         }
 
@@ -136,14 +636,38 @@ class GenericWebhookNode:
     CATEGORY = "Webhook"
     OUTPUT_NODE = True
 
+    def check_lazy_status(
+        self, enable_notification: bool = True, **kwargs
+    ) -> List[str]:
+        """
+        Ask ComfyUI for the input data only when the webhook will be sent
+        """
+        return _unevaluated(kwargs, "any_input") if enable_notification else []
+
     def send_generic_webhook(self,
                            webhook_url: str,
                            any_input: Any = None,
                            json_data: str = "{}",
                            custom_headers: str = "{}",
                            timeout: int = 30,
+                           connect_timeout: float = 0,
+                           total_timeout: float = 0,
                            http_method: str = "POST",
-                           enable_notification: bool = True) -> Tuple[str, str]:
+                           enable_notification: bool = True,
+                           delivery_mode: str = "sync",
+                           wire_format: str = "json",
+                           tensor_encoding: str = "json",
+                           inline_max_bytes: int = 1024,
+                           compression: str = "off",
+                           compression_level: int = 0,
+                           compression_min_bytes: int = 1024,
+                           additional_endpoints: str = "[]",
+                           fanout_wait: str = "all",
+                           circuit_fallback: str = "fail",
+                           fallback_url: str = "",
+                           batch_max_events: int = 50,
+                           batch_max_bytes: int = 1048576,
+                           batch_max_delay_ms: int = 1000) -> Tuple[str, str]:
         
         if not enable_notification:
             return ("Skipped", "Webhook notification disabled")
@@ -166,6 +690,17 @@ class GenericWebhookNode:
             except json.JSONDecodeError as e:
                 return ("Error", f"Invalid headers JSON: {str(e)}")
             
+            try:
+                endpoints = parse_endpoints(
+                    webhook_url,
+                    parsed_headers,
+                    timeout,
+                    http_method,
+                    additional_endpoints,
+                )
+            except (json.JSONDecodeError, ValueError) as e:
+                return ("Error", f"Invalid additional endpoints: {str(e)}")
+            
             pbar.update(1)
             
             # Prepare payload data
@@ -173,25 +708,90 @@ class GenericWebhookNode:
             
             pbar.update(2)
             
+            if len(endpoints) > 1:
+                # Serialize once and send the same body to every endpoint
+                request = self._build_request(
+                    url=webhook_url,
+                    payload=payload,
+                    headers=parsed_headers,
+                    timeout=timeout,
+                    method=http_method,
+                    wire_format=wire_format,
+                    tensor_encoding=tensor_encoding,
+                    inline_max_bytes=inline_max_bytes,
+                )
+                set_compression(
+                    request, compression, compression_level, compression_min_bytes
+                )
+                set_fallback(request, circuit_fallback, fallback_url)
+                set_timeouts(request, connect_timeout, None, total_timeout)
+                if delivery_mode == "batch":
+                    set_batching(
+                        request, batch_max_events, batch_max_bytes, batch_max_delay_ms
+                    )
+                targets = fanout_targets([request], endpoints)
+                if delivery_mode != "sync":
+                    pbar.update(3)
+                    return _queue_fanout(targets, delivery_mode)
+                result = get_fanout_sender().send(targets, fanout_wait)
+                pbar.update(3)
+                return _format_fanout(result)
+            
+            if delivery_mode != "sync":
+                request = self._build_request(
+                    url=webhook_url,
+                    payload=payload,
+                    headers=parsed_headers,
+                    timeout=timeout,
+                    method=http_method,
+                    wire_format=wire_format,
+                    tensor_encoding=tensor_encoding,
+                    inline_max_bytes=inline_max_bytes,
+                )
+                set_compression(
+                    request, compression, compression_level, compression_min_bytes
+                )
+                set_fallback(request, circuit_fallback, fallback_url)
+                set_timeouts(request, connect_timeout, None, total_timeout)
+                if delivery_mode == "batch":
+                    set_batching(
+                        request, batch_max_events, batch_max_bytes, batch_max_delay_ms
+                    )
+                delivery_id = _queue_delivery(request, delivery_mode)
+                pbar.update(3)
+                return ("Queued", f"Delivery ID: {delivery_id}")
+            
             # Send webhook
             result = self._send_request(
                 url=webhook_url,
                 payload=payload,
                 headers=parsed_headers,
                 timeout=timeout,
-                method=http_method
+                method=http_method,
+                wire_format=wire_format,
+                tensor_encoding=tensor_encoding,
+                inline_max_bytes=inline_max_bytes,
+                compression=(compression, compression_level, compression_min_bytes),
+                fallback=(circuit_fallback, fallback_url),
+                timeouts=(connect_timeout, total_timeout)
             )
             
             pbar.update(3)
             
             # Format response
+            status = _result_status(result)
             if result['success']:
-                status = f"Success ({result['status_code']})"
-                response = f"Response: {result['response_text']}"
+                response = (
+                    f"Response: {result['response_text']}"
+                    + _compression_note(result)
+                    + _circuit_note(result)
+                )
             else:
-                status = "Failed"
-                response = f"Error: {result.get('error', 'Unknown error')}"
-            
+                response = (
+                    f"Error: {result.get('error', 'Unknown error')}"
+                    + _circuit_note(result)
+                )
+
             return (status, response)
             
         except Exception as e:
@@ -228,6 +828,10 @@ class GenericWebhookNode:
         elif isinstance(obj, dict):
             return {str(k): self._convert_to_serializable(v) for k, v in obj.items()}
         elif hasattr(obj, 'shape'):  # NumPy arrays or tensors
+            if isinstance(obj, np.ndarray) or hasattr(obj, 'detach'):
+                # Left as arrays: the serializer encodes them without building Python
+                # lists
+                return obj
             try:
                 # Try to convert to list
                 return obj.tolist() if hasattr(obj, 'tolist') else obj.tolist()
@@ -239,59 +843,115 @@ class GenericWebhookNode:
         else:
             # Fallback to string representation
             return str(obj)
-    
-    def _send_request(self, url: str, payload: Dict, headers: Dict, timeout: int, method: str) -> Dict:
+
+    def _build_request(
+        self,
+        url: str,
+        payload: Dict,
+        headers: Dict,
+        timeout: int,
+        method: str,
+        wire_format: str = "json",
+        tensor_encoding: str = "json",
+        inline_max_bytes: int = 1024,
+    ) -> Dict:
+        """
+        Build the request dict for the prepared payload
+
+        The payload is serialized exactly once; the log shows a preview of the
+        encoded body. With a binary tensor encoding, arrays are sent as multipart
+        parts next to the payload.
+        """
+        # Set default headers
+        if not headers:
+            headers = {'User-Agent': 'ComfyUI-Generic-Webhook/1.0'}
+        
+        if method not in ("POST", "PUT", "PATCH"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        serialize_timer = get_metrics().serialize_seconds.time(
+            'GenericWebhook', host_label(url)
+        )
+        if tensor_encoding != "json":
+            with serialize_timer:
+                body, content_type, summary = encode_tensor_payload(
+                    payload, tensor_encoding, inline_max_bytes, wire_format
+                )
+            headers = apply_content_type(dict(headers), content_type)
+            preview = (
+                f"<{summary['arrays']} array(s), "
+                f"{summary['binary_bytes']} bytes as {tensor_encoding}>"
+                if summary['arrays']
+                else payload_preview(body, content_type)
+            )
+        else:
+            with serialize_timer:
+                body, content_type = serialize(payload, wire_format)
+            headers = apply_content_type(dict(headers), content_type)
+            preview = payload_preview(body, content_type)
+        
+        logger = get_logger("GenericWebhook")
+        logger.info(
+            "Sending %s request to %s (%d bytes)",
+            method,
+            url,
+            len(body),
+            extra=fields(
+                url=url, method=method, content_type=content_type, body_bytes=len(body)
+            ),
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Headers: %s, payload: %s", redact_headers(headers), preview)
+
+        return build_request(
+            method,
+            url,
+            headers=headers,
+            timeout=timeout,
+            source='GenericWebhook',
+            data=body,
+        )
+
+    def _send_request(
+        self,
+        url: str,
+        payload: Dict,
+        headers: Dict,
+        timeout: int,
+        method: str,
+        wire_format: str = "json",
+        tensor_encoding: str = "json",
+        inline_max_bytes: int = 1024,
+        compression: Tuple = ("off", 0, 1024),
+        fallback: Tuple = ("fail", ""),
+        timeouts: Tuple = (0, 0),
+    ) -> Dict:
         """
         Send HTTP request with the prepared payload
+        
+        ``compression`` is (codec, level, minimum body size), see set_compression;
+        ``fallback`` is (mode, URL), see set_fallback; ``timeouts`` is
+        (connect, total), see set_timeouts.
         """
         try:
-            # Set default headers
-            if not headers:
-                headers = {
-                    'User-Agent': 'ComfyUI-Generic-Webhook/1.0',
-                    'Content-Type': 'application/json'
-                }
-            elif 'Content-Type' not in headers:
-                headers['Content-Type'] = 'application/json'
-            
-            print(f"[GenericWebhook] Sending {method} request:")
-            print(f"  URL: {url}")
-            print(f"  Headers: {headers}")
-            print(f"  Payload: {json.dumps(payload, indent=2)}")
-            
-            # Send request
-            import requests
-            session = requests.Session()
-            
-            if method == "POST":
-                response = session.post(url, json=payload, headers=headers, timeout=timeout)
-            elif method == "PUT":
-                response = session.put(url, json=payload, headers=headers, timeout=timeout)
-            elif method == "PATCH":
-                response = session.patch(url, json=payload, headers=headers, timeout=timeout)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            print(f"[GenericWebhook] Response: {response.status_code} {response.text}")
-            
-            return {
-                'success': response.status_code < 400,
-                'status_code': response.status_code,
-                'response_text': response.text,
-                'headers': dict(response.headers)
-            }
-            
-        except requests.exceptions.RequestException as e:
-            print(f"[GenericWebhook] RequestException: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e),
-                'status_code': None,
-                'response_text': None,
-                'headers': None
-            }
+            request = self._build_request(
+                url,
+                payload,
+                headers,
+                timeout,
+                method,
+                wire_format,
+                tensor_encoding,
+                inline_max_bytes,
+            )
+            set_compression(request, *compression)
+            set_fallback(request, *fallback)
+            connect_timeout, total_timeout = timeouts
+            set_timeouts(request, connect_timeout, None, total_timeout)
         except Exception as e:
-            print(f"[GenericWebhook] Unexpected error: {str(e)}")
+            get_logger("GenericWebhook").exception(
+                "Unexpected error: %s", e, extra=fields(url=url)
+            )
             return {
                 'success': False,
                 'error': f'Unexpected error: {str(e)}',
@@ -299,6 +959,9 @@ class GenericWebhookNode:
                 'response_text': None,
                 'headers': None
             }
+        
+        # Send request through the shared connection pool
+        return deliver_request(request)
 
 
 class NotifyServer:
@@ -313,10 +976,127 @@ class NotifyServer:
                 "trigger": ("BOOLEAN", {"default": True}),  # Optional trigger
             },
             "optional": {
-                "webhook_url": ("STRING", {"default": "https://your-server.com/api/notify", "label": "Webhook URL", "placeholder": "Enter the webhook endpoint URL"}),
-                "json_data": ("STRING", {"default": "{}", "multiline": True, "label": "JSON Data", "placeholder": "Enter JSON data to send with the webhook"}),
-                "custom_headers": ("STRING", {"default": "{}", "multiline": True, "label": "Custom Headers", "placeholder": "Enter custom HTTP headers as JSON"}),
+                # Lazy: nodes feeding these only run when the trigger is True
+                "webhook_url": (
+                    "STRING",
+                    {
+                        "default": "https://your-server.com/api/notify",
+                        "label": "Webhook URL",
+                        "placeholder": "Enter the webhook endpoint URL",
+                        "lazy": True,
+                    },
+                ),
+                "json_data": (
+                    "STRING",
+                    {
+                        "default": "{}",
+                        "multiline": True,
+                        "label": "JSON Data",
+                        "placeholder": "Enter JSON data to send with the webhook",
+                        "lazy": True,
+                    },
+                ),
+                "custom_headers": (
+                    "STRING",
+                    {
+                        "default": "{}",
+                        "multiline": True,
+                        "label": "Custom Headers",
+                        "placeholder": "Enter custom HTTP headers as JSON",
+                        "lazy": True,
+                    },
+                ),
                 "timeout": ("INT", {"default": 30, "min": 5, "max": 300, "label": "Timeout (seconds)"}),
+                "connect_timeout": (
+                    "FLOAT",
+                    {
+                        "default": 0,
+                        "min": 0,
+                        "max": 300,
+                        "step": 0.5,
+                        "label": "Connect Timeout (seconds, 0 = timeout)",
+                    },
+                ),
+                "total_timeout": (
+                    "FLOAT",
+                    {
+                        "default": 0,
+                        "min": 0,
+                        "max": 3600,
+                        "step": 1,
+                        "label": "Total Timeout (seconds, 0 = none)",
+                    },
+                ),
+                "delivery_mode": (
+                    EVENT_DELIVERY_MODES,
+                    {"default": "sync", "label": "Delivery Mode"},
+                ),
+                "wire_format": (
+                    WIRE_FORMAT_NAMES,
+                    {"default": "json", "label": "Wire Format"},
+                ),
+                "compression": (
+                    list(COMPRESSION_CODECS),
+                    {"default": "off", "label": "Body Compression"},
+                ),
+                "compression_level": (
+                    "INT",
+                    {
+                        "default": 0,
+                        "min": 0,
+                        "max": 22,
+                        "label": "Compression Level (0 = default)",
+                    },
+                ),
+                "compression_min_bytes": (
+                    "INT",
+                    {
+                        "default": 1024,
+                        "min": 0,
+                        "max": 104857600,
+                        "label": "Compress Bodies from (bytes)",
+                    },
+                ),
+                "circuit_fallback": (
+                    list(CIRCUIT_FALLBACKS),
+                    {"default": "fail", "label": "When Endpoint Is Down"},
+                ),
+                "fallback_url": (
+                    "STRING",
+                    {
+                        "default": "",
+                        "label": "Fallback URL",
+                        "placeholder": "Secondary endpoint used while the circuit "
+                        "is open",
+                    },
+                ),
+                "batch_max_events": (
+                    "INT",
+                    {
+                        "default": 50,
+                        "min": 1,
+                        "max": 10000,
+                        "label": "Batch: Max Events",
+                    },
+                ),
+                "batch_max_bytes": (
+                    "INT",
+                    {
+                        "default": 1048576,
+                        "min": 1024,
+                        "max": 104857600,
+                        "label": "Batch: Max Bytes",
+                    },
+                ),
+                "batch_max_delay_ms": (
+                    "INT",
+                    {
+                        "default": 1000,
+                        "min": 0,
+                        "max": 600000,
+                        "label": "Batch: Max Delay (ms)",
+                    },
+                ),
             }
         }
 
@@ -326,15 +1106,38 @@ class NotifyServer:
     CATEGORY = "Webhook"
     OUTPUT_NODE = True
 
+    def check_lazy_status(self, trigger: bool, **kwargs) -> List[str]:
+        """
+        Ask ComfyUI for the notification inputs only when the trigger is True
+        """
+        return (
+            _unevaluated(kwargs, "webhook_url", "json_data", "custom_headers")
+            if trigger
+            else []
+        )
+
     def notify(self, 
                trigger: bool,
                webhook_url: str = "https://your-server.com/api/notify",
                json_data: str = "{}",
                custom_headers: str = "{}",
-               timeout: int = 30) -> Tuple[str, str]:
+               timeout: int = 30,
+               connect_timeout: float = 0,
+               total_timeout: float = 0,
+               delivery_mode: str = "sync",
+               wire_format: str = "json",
+               compression: str = "off",
+               compression_level: int = 0,
+               compression_min_bytes: int = 1024,
+               circuit_fallback: str = "fail",
+               fallback_url: str = "",
+               batch_max_events: int = 50,
+               batch_max_bytes: int = 1048576,
+               batch_max_delay_ms: int = 1000) -> Tuple[str, str]:
         
+        logger = get_logger("NotifyServer")
         if not trigger:
-            print("🔕 NotifyServer: Trigger was False, no notification sent.")
+            logger.info("🔕 Trigger was False, no notification sent.")
             return ("Skipped", "Trigger was False, no notification sent.")
         
         try:
@@ -352,45 +1155,185 @@ class NotifyServer:
             
             # Set default headers
             if not parsed_headers:
-                parsed_headers = {
-                    'User-Agent': 'ComfyUI-NotifyServer/1.0',
-                    'Content-Type': 'application/json'
-                }
-            elif 'Content-Type' not in parsed_headers:
-                parsed_headers['Content-Type'] = 'application/json'
+                parsed_headers = {'User-Agent': 'ComfyUI-NotifyServer/1.0'}
             
             # Prepare payload
             payload = parsed_json.copy()
             payload['status'] = 'triggered'
             payload['timestamp'] = time.time()
             payload['source'] = 'ComfyUI NotifyServer'
+
+            with get_metrics().serialize_seconds.time(
+                'NotifyServer', host_label(webhook_url)
+            ):
+                body, content_type = serialize(payload, wire_format)
+            parsed_headers = apply_content_type(parsed_headers, content_type)
+
+            logger.info(
+                "Sending notification to %s (%d bytes)",
+                webhook_url,
+                len(body),
+                extra=fields(
+                    url=webhook_url, content_type=content_type, body_bytes=len(body)
+                ),
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Headers: %s, payload: %s",
+                    redact_headers(parsed_headers),
+                    payload_preview(body, content_type),
+                )
+
+            request = build_request(
+                'POST',
+                webhook_url,
+                headers=parsed_headers,
+                timeout=timeout,
+                source='NotifyServer',
+                data=body,
+            )
+            set_compression(
+                request, compression, compression_level, compression_min_bytes
+            )
+            set_fallback(request, circuit_fallback, fallback_url)
+            set_timeouts(request, connect_timeout, None, total_timeout)
+            if delivery_mode == "batch":
+                set_batching(
+                    request, batch_max_events, batch_max_bytes, batch_max_delay_ms
+                )
+
+            if delivery_mode != "sync":
+                delivery_id = _queue_delivery(request, delivery_mode)
+                logger.info(
+                    "📨 Notification queued (%s).",
+                    delivery_id,
+                    extra=fields(delivery_id=delivery_id),
+                )
+                return ("Queued", f"Delivery ID: {delivery_id}")
             
-            print(f"[NotifyServer] Sending notification:")
-            print(f"  URL: {webhook_url}")
-            print(f"  Headers: {parsed_headers}")
-            print(f"  Payload: {json.dumps(payload, indent=2)}")
-            
-            # Send request
-            import requests
-            response = requests.post(webhook_url, json=payload, headers=parsed_headers, timeout=timeout)
-            
-            print(f"[NotifyServer] Response: {response.status_code} {response.text}")
+            # Send request through the shared connection pool
+            result = deliver_request(request)
             
-            if response.status_code < 400:
-                print("✅ NotifyServer: Notification sent successfully.")
-                return ("Success", f"Notification sent successfully ({response.status_code})")
+            if result.get('queued'):
+                logger.warning(
+                    "📨 Endpoint is down, notification queued (%s).",
+                    result['delivery_id'],
+                    extra=fields(delivery_id=result['delivery_id']),
+                )
+                return ("Queued", result['response_text'] + _circuit_note(result))
+            elif result['success']:
+                logger.info("✅ Notification sent successfully.")
+                return (
+                    "Success",
+                    f"Notification sent successfully ({result['status_code']})"
+                    + _compression_note(result)
+                    + _circuit_note(result),
+                )
+            elif result['status_code'] is not None:
+                logger.warning(
+                    "❌ Failed to notify server - %s",
+                    result['status_code'],
+                    extra=fields(status_code=result['status_code']),
+                )
+                return (
+                    "Failed",
+                    f"Failed to notify server - {result['status_code']}: "
+                    f"{result['response_text']}" + _circuit_note(result),
+                )
+            elif (result.get('circuit') or {}).get('state') == "open":
+                logger.warning("❌ Endpoint is down - %s", result['error'])
+                return (
+                    "Failed (circuit open)",
+                    f"Request failed: {result['error']}" + _circuit_note(result),
+                )
             else:
-                print(f"❌ NotifyServer: Failed to notify server - {response.status_code}")
-                return ("Failed", f"Failed to notify server - {response.status_code}: {response.text}")
-                
-        except requests.exceptions.RequestException as e:
-            print(f"❌ NotifyServer: Request failed - {e}")
-            return ("Error", f"Request failed: {str(e)}")
+                logger.warning("❌ Request failed - %s", result['error'])
+                return (
+                    "Error",
+                    f"Request failed: {result['error']}" + _circuit_note(result),
+                )
+
         except Exception as e:
-            print(f"❌ NotifyServer: Unexpected error - {e}")
+            logger.exception("❌ Unexpected error - %s", e)
             return ("Error", f"Unexpected error: {str(e)}")
 
 
+class WebhookDeliveryStatusNode:
+    """
+    ComfyUI node for looking up the status of an asynchronous webhook delivery
+    """
+    
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "delivery_id": (
+                    "STRING",
+                    {
+                        "default": "",
+                        "label": "Delivery ID",
+                        "placeholder": "ID returned by an async webhook",
+                    },
+                ),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("state", "details")
+    FUNCTION = "get_status"
+    CATEGORY = "Webhook"
+    OUTPUT_NODE = True
+
+    @classmethod
+    def IS_CHANGED(s, **kwargs):
+        # Status changes over time, so never reuse a cached result
+        return float("nan")
+
+    def get_status(self, delivery_id: str) -> Tuple[str, str]:
+        # Accept the "Delivery ID: a, b" text returned by the webhook nodes
+        delivery_id = delivery_id.strip()
+        if delivery_id.startswith("Delivery ID:"):
+            delivery_id = delivery_id[len("Delivery ID:") :]
+        delivery_ids = [d.strip() for d in delivery_id.split(",") if d.strip()]
+        if not delivery_ids:
+            return ("unknown", "No delivery ID given")
+        
+        statuses = []
+        for current_id in delivery_ids:
+            status = _lookup_delivery(current_id)
+            if status is None:
+                status = {'id': current_id, 'state': 'unknown'}
+            statuses.append(status)
+        
+        if len(statuses) == 1:
+            status = statuses[0]
+            if status['state'] == 'unknown':
+                return ("unknown", f"No delivery found with ID {status['id']}")
+            return (status['state'], json.dumps(status, default=str))
+        
+        # Batched sends queue one delivery per request
+        states = {status['state'] for status in statuses}
+        state = states.pop() if len(states) == 1 else "mixed"
+        return (state, json.dumps(statuses, default=str))
+
+
+def _run_delay(
+    delay_seconds: float, show_progress: bool, enable_delay: bool, source: str
+) -> str:
+    """
+    Wait on the shared delay engine and return the Delay nodes' status text
+
+    ComfyUI's interrupt ends the wait and propagates, so the prompt stops as with
+    any other node.
+    """
+    if not enable_delay:
+        return "Delay disabled"
+    try:
+        return run_delay(delay_seconds, ProgressBar if show_progress else None, source)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+
+
 class DelayNode:
     """
     ComfyUI node for adding delays/sleep in workflows
@@ -419,50 +1362,8 @@ class DelayNode:
               enable_delay: bool = True,
               **kwargs) -> Tuple[str, str]:
         
-        if not enable_delay:
-            return ("Delay disabled", "Delay disabled")
-        
-        try:
-            # Validate delay time
-            if delay_seconds < 0:
-                return ("Error: Delay time cannot be negative", "Error: Delay time cannot be negative")
-            
-            if delay_seconds == 0:
-                return ("No delay", "No delay (0 seconds)")
-            
-            print(f"[DelayNode] Starting delay of {delay_seconds} seconds...")
-            
-            if show_progress:
-                # Create progress bar for visual feedback
-                total_steps = int(delay_seconds * 10)  # Update every 0.1 seconds
-                if total_steps < 1:
-                    total_steps = 1
-                
-                pbar = ProgressBar(total_steps)
-                
-                # Sleep in small increments to show progress
-                remaining_time = delay_seconds
-                step_time = 0.1
-                
-                for i in range(total_steps):
-                    if remaining_time <= step_time:
-                        time.sleep(remaining_time)
-                        pbar.update(total_steps)
-                        break
-                    else:
-                        time.sleep(step_time)
-                        remaining_time -= step_time
-                        pbar.update(i + 1)
-            else:
-                # Simple sleep without progress bar
-                time.sleep(delay_seconds)
-            
-            print(f"[DelayNode] Delay completed ({delay_seconds} seconds)")
-            return ("Delay completed", f"Delay completed ({delay_seconds} seconds)")
-            
-        except Exception as e:
-            print(f"[DelayNode] Error during delay: {str(e)}")
-            return (f"Error: {str(e)}", f"Error: {str(e)}")
+        status = _run_delay(delay_seconds, show_progress, enable_delay, "DelayNode")
+        return (status.split(" (")[0], status)
 
 
 class DelayImageNode:
@@ -493,51 +1394,11 @@ class DelayImageNode:
                    image: Any,
                    show_progress: bool = True,
                    enable_delay: bool = True) -> Tuple[Any, str]:
-        
-        if not enable_delay:
-            return (image, "Delay disabled")
-        
-        try:
-            # Validate delay time
-            if delay_seconds < 0:
-                return (image, "Error: Delay time cannot be negative")
-            
-            if delay_seconds == 0:
-                return (image, "No delay (0 seconds)")
-            
-            print(f"[DelayImageNode] Starting delay of {delay_seconds} seconds...")
-            
-            if show_progress:
-                # Create progress bar for visual feedback
-                total_steps = int(delay_seconds * 10)  # Update every 0.1 seconds
-                if total_steps < 1:
-                    total_steps = 1
-                
-                pbar = ProgressBar(total_steps)
-                
-                # Sleep in small increments to show progress
-                remaining_time = delay_seconds
-                step_time = 0.1
-                
-                for i in range(total_steps):
-                    if remaining_time <= step_time:
-                        time.sleep(remaining_time)
-                        pbar.update(total_steps)
-                        break
-                    else:
-                        time.sleep(step_time)
-                        remaining_time -= step_time
-                        pbar.update(i + 1)
-            else:
-                # Simple sleep without progress bar
-                time.sleep(delay_seconds)
-            
-            print(f"[DelayImageNode] Delay completed ({delay_seconds} seconds)")
-            return (image, f"Delay completed ({delay_seconds} seconds)")
-            
-        except Exception as e:
-            print(f"[DelayImageNode] Error during delay: {str(e)}")
-            return (image, f"Error: {str(e)}")
+
+        return (
+            image,
+            _run_delay(delay_seconds, show_progress, enable_delay, "DelayImageNode"),
+        )
 
 
 class DelayLatentNode:
@@ -568,51 +1429,11 @@ class DelayLatentNode:
                     latent: Any,
                     show_progress: bool = True,
                     enable_delay: bool = True) -> Tuple[Any, str]:
-        
-        if not enable_delay:
-            return (latent, "Delay disabled")
-        
-        try:
-            # Validate delay time
-            if delay_seconds < 0:
-                return (latent, "Error: Delay time cannot be negative")
-            
-            if delay_seconds == 0:
-                return (latent, "No delay (0 seconds)")
-            
-            print(f"[DelayLatentNode] Starting delay of {delay_seconds} seconds...")
-            
-            if show_progress:
-                # Create progress bar for visual feedback
-                total_steps = int(delay_seconds * 10)  # Update every 0.1 seconds
-                if total_steps < 1:
-                    total_steps = 1
-                
-                pbar = ProgressBar(total_steps)
-                
-                # Sleep in small increments to show progress
-                remaining_time = delay_seconds
-                step_time = 0.1
-                
-                for i in range(total_steps):
-                    if remaining_time <= step_time:
-                        time.sleep(remaining_time)
-                        pbar.update(total_steps)
-                        break
-                    else:
-                        time.sleep(step_time)
-                        remaining_time -= step_time
-                        pbar.update(i + 1)
-            else:
-                # Simple sleep without progress bar
-                time.sleep(delay_seconds)
-            
-            print(f"[DelayLatentNode] Delay completed ({delay_seconds} seconds)")
-            return (latent, f"Delay completed ({delay_seconds} seconds)")
-            
-        except Exception as e:
-            print(f"[DelayLatentNode] Error during delay: {str(e)}")
-            return (latent, f"Error: {str(e)}")
+
+        return (
+            latent,
+            _run_delay(delay_seconds, show_progress, enable_delay, "DelayLatentNode"),
+        )
 
 
 class DelayConditioningNode:
@@ -643,51 +1464,271 @@ class DelayConditioningNode:
                           conditioning: Any,
                           show_progress: bool = True,
                           enable_delay: bool = True) -> Tuple[Any, str]:
+
+        return (
+            conditioning,
+            _run_delay(
+                delay_seconds, show_progress, enable_delay, "DelayConditioningNode"
+            ),
+        )
+
+
+class PacingGateNode:
+    """
+    ComfyUI node that keeps a workflow under N operations per interval
+
+    Every node using the same pacer name shares one process-wide limit, so
+    bursts run at full speed until the limit is reached instead of sleeping
+    a fixed worst-case delay on every prompt.
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "pacer_name": ("STRING", {"default": "default", "label": "Pacer Name"}),
+                "operations": (
+                    "INT",
+                    {"default": 10, "min": 1, "max": 100000, "label": "Operations"},
+                ),
+                "interval_seconds": (
+                    "FLOAT",
+                    {
+                        "default": 60.0,
+                        "min": 0.1,
+                        "max": 86400.0,
+                        "step": 0.1,
+                        "label": "Per Interval (seconds)",
+                    },
+                ),
+                "algorithm": (
+                    list(PACING_ALGORITHMS),
+                    {"default": "token_bucket", "label": "Algorithm"},
+                ),
+            },
+            "optional": {
+                "image": ("IMAGE",),
+                "latent": ("LATENT",),
+                "conditioning": ("CONDITIONING",),
+                "show_progress": (
+                    "BOOLEAN",
+                    {"default": True, "label": "Show Progress Bar"},
+                ),
+                "enable_pacing": (
+                    "BOOLEAN",
+                    {"default": True, "label": "Enable Pacing"},
+                ),
+            },
+        }
+
+    RETURN_TYPES = ("IMAGE", "LATENT", "CONDITIONING", "FLOAT", "STRING")
+    RETURN_NAMES = ("image", "latent", "conditioning", "waited_seconds", "status")
+    FUNCTION = "gate"
+    CATEGORY = "Utility"
+
+    @classmethod
+    def IS_CHANGED(s, **kwargs):
+        # Every run takes a slot, so never reuse a cached result
+        return float("nan")
+
+    def gate(
+        self,
+        pacer_name: str,
+        operations: int,
+        interval_seconds: float,
+        algorithm: str = "token_bucket",
+        image: Any = None,
+        latent: Any = None,
+        conditioning: Any = None,
+        show_progress: bool = True,
+        enable_pacing: bool = True,
+    ) -> Tuple[Any, Any, Any, float, str]:
+
+        if not enable_pacing:
+            return (image, latent, conditioning, 0.0, "Pacing disabled")
+        try:
+            waited = pace(
+                pacer_name.strip() or "default",
+                operations,
+                interval_seconds,
+                algorithm,
+                ProgressBar if show_progress else None,
+            )
+        except ValueError as e:
+            return (image, latent, conditioning, 0.0, f"Error: {str(e)}")
+        status = f"Waited {waited:.2f}s" if waited > 0 else "No wait"
+        return (
+            image,
+            latent,
+            conditioning,
+            round(waited, 3),
+            f"{status} ({operations} per {interval_seconds:g}s)",
+        )
+
+
+class WaitForCallbackNode:
+    """
+    ComfyUI node that waits for an external system to POST back
+
+    Unlike a delay, it does not have to guess how long the external work takes.
+    The wait blocks ComfyUI's prompt executor: no other queued prompt runs until
+    the callback arrives, the timeout passes or the prompt is interrupted.
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "timeout_seconds": (
+                    "FLOAT",
+                    {
+                        "default": 300.0,
+                        "min": 1.0,
+                        "max": 86400.0,
+                        "step": 1.0,
+                        "label": "Timeout (seconds)",
+                    },
+                ),
+            },
+            "optional": {
+                "any_input": (None,),  # Only orders the wait after upstream nodes
+                "request_url": (
+                    "STRING",
+                    {
+                        "default": "",
+                        "label": "Send Callback URL To",
+                        "placeholder": "Endpoint that receives "
+                        "{callback_url, token, ...JSON data}",
+                    },
+                ),
+                "json_data": (
+                    "STRING",
+                    {
+                        "default": "{}",
+                        "multiline": True,
+                        "label": "JSON Data",
+                        "placeholder": "Extra JSON sent along with the callback URL",
+                    },
+                ),
+                "custom_headers": (
+                    "STRING",
+                    {
+                        "default": "{}",
+                        "multiline": True,
+                        "label": "Custom Headers",
+                        "placeholder": "Enter custom HTTP headers as JSON",
+                    },
+                ),
+                "callback_base_url": (
+                    "STRING",
+                    {
+                        "default": "",
+                        "label": "This Server's URL",
+                        "placeholder": "http://comfyui-host:8188 "
+                        "(default WEBHOOK_CALLBACK_BASE_URL)",
+                    },
+                ),
+                "on_timeout": (
+                    list(TIMEOUT_ACTIONS),
+                    {"default": "error", "label": "On Timeout"},
+                ),
+                "show_progress": (
+                    "BOOLEAN",
+                    {"default": True, "label": "Show Progress Bar"},
+                ),
+            },
+        }
+
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("payload", "status")
+    FUNCTION = "wait_for_callback"
+    CATEGORY = "Webhook"
+
+    @classmethod
+    def IS_CHANGED(s, **kwargs):
+        # Every run waits for a new callback
+        return float("nan")
+
+    def wait_for_callback(
+        self,
+        timeout_seconds: float,
+        any_input: Any = None,
+        request_url: str = "",
+        json_data: str = "{}",
+        custom_headers: str = "{}",
+        callback_base_url: str = "",
+        on_timeout: str = "error",
+        show_progress: bool = True,
+    ) -> Tuple[str, str]:
+        """
+        Register a one-shot token, optionally send its URL to ``request_url``, and
+        block until it is called
         
-        if not enable_delay:
-            return (conditioning, "Delay disabled")
+        The external system POSTs JSON to the callback URL (a person opens it and
+        confirms, sending the query parameters); that body is returned as
+        ``payload``. With
+        ``on_timeout`` "error" a timeout stops the prompt, with "continue" it
+        returns an empty payload.
+        """
+        try:
+            parsed_json = json.loads(json_data) if json_data.strip() else {}
+            parsed_headers = (
+                json.loads(custom_headers) if custom_headers.strip() else {}
+            )
+        except json.JSONDecodeError as e:
+            return ("{}", f"Error: Invalid JSON - {str(e)}")
         
+        logger = get_logger("WaitForCallback")
+        registry = get_callback_registry()
+        token = registry.register(ttl=timeout_seconds + 60.0, label="WaitForCallback")
+        url = callback_url(token, callback_base_url)
+        logger.info(
+            "Waiting up to %ss for a callback to %s",
+            timeout_seconds,
+            url,
+            extra=fields(callback_url=url, timeout_s=timeout_seconds),
+        )
+
+        if request_url.strip():
+            body, content_type = serialize(
+                dict(parsed_json, callback_url=url, token=token), "json"
+            )
+            headers = apply_content_type(
+                dict(parsed_headers or {'User-Agent': 'ComfyUI-WaitForCallback/1.0'}),
+                content_type,
+            )
+            result = deliver_request(
+                build_request(
+                    'POST',
+                    request_url.strip(),
+                    headers=headers,
+                    timeout=30,
+                    source='WaitForCallback',
+                    data=body,
+                )
+            )
+            if not result['success']:
+                registry.cancel(token)
+                error = result.get('error') or f"HTTP {result['status_code']}"
+                if on_timeout == "error":
+                    raise RuntimeError(
+                        f"Could not send the callback URL to {request_url}: {error}"
+                    )
+                return ("{}", f"Error: Could not send the callback URL - {error}")
+        
+        start = time.monotonic()
         try:
-            # Validate delay time
-            if delay_seconds < 0:
-                return (conditioning, "Error: Delay time cannot be negative")
-            
-            if delay_seconds == 0:
-                return (conditioning, "No delay (0 seconds)")
-            
-            print(f"[DelayConditioningNode] Starting delay of {delay_seconds} seconds...")
-            
-            if show_progress:
-                # Create progress bar for visual feedback
-                total_steps = int(delay_seconds * 10)  # Update every 0.1 seconds
-                if total_steps < 1:
-                    total_steps = 1
-                
-                pbar = ProgressBar(total_steps)
-                
-                # Sleep in small increments to show progress
-                remaining_time = delay_seconds
-                step_time = 0.1
-                
-                for i in range(total_steps):
-                    if remaining_time <= step_time:
-                        time.sleep(remaining_time)
-                        pbar.update(total_steps)
-                        break
-                    else:
-                        time.sleep(step_time)
-                        remaining_time -= step_time
-                        pbar.update(i + 1)
-            else:
-                # Simple sleep without progress bar
-                time.sleep(delay_seconds)
-            
-            print(f"[DelayConditioningNode] Delay completed ({delay_seconds} seconds)")
-            return (conditioning, f"Delay completed ({delay_seconds} seconds)")
-            
-        except Exception as e:
-            print(f"[DelayConditioningNode] Error during delay: {str(e)}")
-            return (conditioning, f"Error: {str(e)}")
+            payload = registry.wait(
+                token, timeout_seconds, ProgressBar if show_progress else None
+            )
+        except CallbackTimeout as e:
+            if on_timeout == "error":
+                raise
+            return ("{}", f"Timeout: {str(e)}")
+        return (
+            json.dumps(payload, default=str),
+            f"Callback received after {time.monotonic() - start:.1f} seconds",
+        )
 
 
 class TriggerNode:
@@ -741,20 +1782,26 @@ NODE_CLASS_MAPPINGS = {
     "WebhookNotification": WebhookNotificationNode,
     "GenericWebhook": GenericWebhookNode,
     "NotifyServer": NotifyServer,
+    "WebhookDeliveryStatus": WebhookDeliveryStatusNode,
     "Trigger": TriggerNode,
     "Delay": DelayNode,
     "DelayImage": DelayImageNode,
     "DelayLatent": DelayLatentNode,
-    "DelayConditioning": DelayConditioningNode
+    "DelayConditioning": DelayConditioningNode,
+    "PacingGate": PacingGateNode,
+    "WaitForCallback": WaitForCallbackNode
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "WebhookNotification": "Webhook Notification",
     "GenericWebhook": "Generic Webhook",
     "NotifyServer": "Notify Server",
+    "WebhookDeliveryStatus": "Webhook Delivery Status",
     "Trigger": "Trigger",
     "Delay": "Delay/Sleep",
     "DelayImage": "Delay/Sleep (Image)",
     "DelayLatent": "Delay/Sleep (Latent)",
-    "DelayConditioning": "Delay/Sleep (Conditioning)"
+    "DelayConditioning": "Delay/Sleep (Conditioning)",
+    "PacingGate": "Pacing Gate",
+    "WaitForCallback": "Wait for Callback"
 }
@@ -0,0 +1,174 @@
+import html
+import json
+from urllib.parse import parse_qsl
+
+from aiohttp import web
+from server import PromptServer
+
+from .modules.aggregator import get_aggregator, get_batch_status
+from .modules.callbacks import (
+    CALLBACK_ROUTE,
+    SIGNATURE_HEADER,
+    callback_secret,
+    get_callback_registry,
+    get_callback_stats,
+    verify_callback,
+)
+from .modules.circuit_breaker import get_circuit_breakers, get_circuit_stats
+from .modules.delivery_queue import get_delivery_status, get_dispatcher
+from .modules.image_store import get_image_store_stats
+from .modules.metrics import render_metrics
+from .modules.outbox import get_outbox, resume_outbox
+from .modules.pacing import get_pacing_stats
+from .modules.rate_limit import get_rate_limit_stats
+from .modules.timing import get_timing_stats
+from .modules.upload_cache import get_upload_cache_stats
+from .modules.webhook_sender import get_http_client_stats
+
+routes = PromptServer.instance.routes
+
+
+async def _resume_outbox(app):
+    # Pick up requests that were still in the outbox when ComfyUI last stopped. This
+    # waits for the server to start: importing the package (e.g. for the outbox
+    # command line) must not start delivery threads or take the outbox lock.
+    resume_outbox()
+
+
+PromptServer.instance.app.on_startup.append(_resume_outbox)
+
+
+@routes.get("/webhook/deliveries/{delivery_id}")
+async def delivery_status(request):
+    delivery_id = request.match_info["delivery_id"]
+    status = get_delivery_status(delivery_id) or get_batch_status(delivery_id)
+    if status is None:
+        outbox = resume_outbox()
+        status = outbox.status(delivery_id) if outbox is not None else None
+    if status is None:
+        return web.json_response({"error": "Unknown delivery ID"}, status=404)
+    return web.json_response(status)
+
+
+@routes.get("/webhook/stats")
+async def webhook_stats(request):
+    outbox = resume_outbox()
+    return web.json_response(
+        {
+            "connections": get_http_client_stats(),
+            "deliveries": get_dispatcher().stats(),
+            "outbox": outbox.stats() if outbox is not None else None,
+            "upload_cache": get_upload_cache_stats(),
+            "batches": get_aggregator().stats(),
+            "rate_limits": get_rate_limit_stats(),
+            "circuits": get_circuit_stats(),
+            "timings": get_timing_stats(),
+            "callbacks": get_callback_stats(),
+            "pacers": get_pacing_stats(),
+            "references": get_image_store_stats(),
+        }
+    )
+
+
+@routes.post("/webhook/outbox/replay")
+async def outbox_replay(request):
+    body = await request.json() if request.can_read_body else {}
+    count = get_outbox().replay(
+        body.get("ids") or None,
+        include_delivered=bool(body.get("include_delivered", False)),
+    )
+    return web.json_response({"replayed": count})
+
+
+@routes.post("/webhook/circuits/reset")
+async def circuits_reset(request):
+    body = await request.json() if request.can_read_body else {}
+    get_circuit_breakers().reset(body.get("url") or None)
+    return web.json_response(get_circuit_stats())
+
+
+@routes.get("/webhook/metrics")
+async def webhook_metrics(request):
+    if "application/openmetrics-text" in request.headers.get("Accept", ""):
+        return web.Response(
+            text=render_metrics(openmetrics=True),
+            content_type="application/openmetrics-text",
+            charset="utf-8",
+        )
+    return web.Response(
+        text=render_metrics(), content_type="text/plain", charset="utf-8"
+    )
+
+
+async def _resolve_callback(request, payload):
+    accepted, reason = get_callback_registry().resolve(
+        request.match_info["token"], payload
+    )
+    if not accepted:
+        if reason == "used":
+            return web.json_response({"error": "Callback already received"}, status=409)
+        return web.json_response(
+            {"error": "Unknown or expired callback token"}, status=404
+        )
+    return web.json_response({"accepted": True})
+
+
+_CONFIRM_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Confirm callback</title></head>
+<body>
+<p>Send this callback to the waiting ComfyUI workflow?</p>
+<form method="post" action="{action}">
+<dl>{fields}</dl>
+<button type="submit">Confirm</button>
+</form>
+</body></html>
+"""
+
+
+@routes.post(CALLBACK_ROUTE + "/{token}")
+async def webhook_callback(request):
+    body = await request.read()
+    secret = callback_secret()
+    if secret and not verify_callback(
+        body, request.headers.get(SIGNATURE_HEADER), secret
+    ):
+        return web.json_response({"error": "Invalid callback signature"}, status=401)
+    text = body.decode("utf-8", errors="replace")
+    if request.content_type == "application/x-www-form-urlencoded":
+        # Submitted from the confirmation page
+        payload = dict(parse_qsl(text, keep_blank_values=True))
+    else:
+        try:
+            payload = json.loads(text) if text.strip() else {}
+        except ValueError:
+            payload = {"body": text}
+    return await _resolve_callback(request, payload)
+
+
+@routes.get(CALLBACK_ROUTE + "/{token}")
+async def webhook_callback_link(request):
+    # Opening the link only shows a confirmation form that POSTs the query parameters
+    # back: link previewers and scanners fetch URLs too, and must not spend the token
+    if callback_secret():
+        return web.json_response(
+            {"error": "Callbacks must be signed; links are disabled"}, status=403
+        )
+    state = get_callback_registry().state(request.match_info["token"])
+    if state == "used":
+        return web.json_response({"error": "Callback already received"}, status=409)
+    if state != "pending":
+        return web.json_response(
+            {"error": "Unknown or expired callback token"}, status=404
+        )
+    fields = "".join(
+        f"<dt>{html.escape(key)}</dt><dd>{html.escape(value)}"
+        f'<input type="hidden" name="{html.escape(key)}" '
+        f'value="{html.escape(value)}"></dd>'
+        for key, value in request.query.items()
+    )
+    return web.Response(
+        text=_CONFIRM_PAGE.format(action=html.escape(request.path), fields=fields),
+        content_type="text/html",
+        charset="utf-8",
+        headers={"Cache-Control": "no-store", "Referrer-Policy": "no-referrer"},
+    )
@@ -0,0 +1,103 @@
+"""
+Shared fixtures: the nodes loaded against the ComfyUI stubs and a local receiver
+"""
+
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import comfy_stubs
+
+DATA_DIR = tempfile.mkdtemp(prefix="webhook-tests-")
+os.environ.setdefault("WEBHOOK_DATA_DIR", os.path.join(DATA_DIR, "webhook"))
+comfy_stubs.install(DATA_DIR)
+comfy_stubs.load_nodes()
+
+from webhook_nodes.modules import circuit_breaker, upload_cache  # noqa: E402
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        receiver = self.server.receiver
+        status = receiver.record(self.command, self.path, dict(self.headers), body)
+        payload = b'{"ok": true}' if status < 400 else b'{"error": "injected"}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_POST = do_PUT = do_PATCH = _handle
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class Receiver:
+    """
+    Local HTTP server that records every request and answers with a per-path status
+
+    ``statuses`` maps a path (e.g. "/fail") to the status it answers with;
+    every other path gets 200.
+    """
+
+    def __init__(self):
+        self.statuses = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.receiver = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, path="/webhook"):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def record(self, method, path, headers, body):
+        with self._lock:
+            self.requests.append(
+                {"method": method, "path": path, "headers": headers, "body": body}
+            )
+            return self.statuses.get(path, 200)
+
+    def paths(self):
+        with self._lock:
+            return [request["path"] for request in self.requests]
+
+    def clear(self):
+        with self._lock:
+            self.requests.clear()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def receiver():
+    server = Receiver()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    """
+    Every test starts with closed circuits and an empty upload cache
+    """
+    circuit_breaker.configure_circuit_breakers()
+    upload_cache.get_upload_cache().clear()
+    yield
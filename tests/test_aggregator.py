@@ -0,0 +1,64 @@
+import threading
+
+from webhook_nodes.modules.aggregator import EventAggregator
+from webhook_nodes.modules.circuit_breaker import set_fallback
+from webhook_nodes.modules.compression import set_compression
+from webhook_nodes.modules.timing import set_timeouts
+from webhook_nodes.modules.webhook_sender import build_request
+
+
+class RecordingSender:
+    """send_fn that records every batch request it is given"""
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        with self._lock:
+            self.sent.append(request)
+        return {'success': True, 'status_code': 200}
+
+
+def event(n, fallback="fail", connect=None, total=None):
+    request = build_request(
+        'POST',
+        'http://127.0.0.1:9/hook',
+        headers={'Content-Type': 'application/json'},
+        data=b'{"n": %d}' % n,
+    )
+    set_compression(request, "gzip")
+    set_fallback(request, fallback, "http://127.0.0.1:9/backup")
+    set_timeouts(request, connect, None, total)
+    return request
+
+
+def test_batch_keeps_the_delivery_options_of_its_events():
+    sender = RecordingSender()
+    aggregator = EventAggregator(max_delay_ms=60000, send_fn=sender)
+    aggregator.add(event(0, "fallback_url", connect=2.0, total=20.0))
+    aggregator.add(event(1, "fallback_url", connect=2.0, total=20.0))
+    assert aggregator.flush(timeout=5.0)
+
+    (batch,) = sender.sent
+    assert batch['body']['data'] == b'[{"n": 0},{"n": 1}]'
+    assert batch['compression']['codec'] == "gzip"
+    assert batch['fallback']['mode'] == "fallback_url"
+    assert batch['timeouts'] == {'connect': 2.0, 'total': 20.0}
+    aggregator.close()
+
+
+def test_events_with_other_delivery_options_are_batched_apart():
+    sender = RecordingSender()
+    aggregator = EventAggregator(max_delay_ms=60000, send_fn=sender)
+    aggregator.add(event(0))
+    aggregator.add(event(1, "outbox"))
+    aggregator.add(event(2, total=5.0))
+    assert aggregator.flush(timeout=5.0)
+
+    assert len(sender.sent) == 3
+    by_body = {batch['body']['data']: batch for batch in sender.sent}
+    assert 'fallback' not in by_body[b'[{"n": 0}]']
+    assert by_body[b'[{"n": 1}]']['fallback']['mode'] == "outbox"
+    assert by_body[b'[{"n": 2}]']['timeouts'] == {'total': 5.0}
+    aggregator.close()
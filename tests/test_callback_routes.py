@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import comfy_stubs  # noqa: E402
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+from webhook_nodes.modules.callbacks import (  # noqa: E402
+    SIGNATURE_HEADER,
+    get_callback_registry,
+    sign_callback,
+)
+
+routes = comfy_stubs.load_routes()
+
+
+def call(method, path, **kwargs):
+    """Send one request to the webhook routes and return (status, body text)"""
+
+    async def run():
+        app = web.Application()
+        app.add_routes(routes.routes)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.request(method, path, **kwargs)
+            return response.status, await response.text()
+
+    return asyncio.run(run())
+
+
+def test_opening_the_link_only_shows_a_confirmation_form():
+    registry = get_callback_registry()
+    token = registry.register()
+    path = f"/webhook/callback/{token}"
+
+    status, page = call("GET", path + "?action=approve")
+    assert status == 200
+    assert f'action="{path}"' in page
+    assert 'name="action" value="approve"' in page
+    assert registry.state(token) == "pending"
+
+    # Submitting the form delivers the query parameters as the payload
+    status, _ = call("POST", path, data={"action": "approve"})
+    assert status == 200
+    assert registry.state(token) == "used"
+    assert registry.wait(token, 1.0) == {"action": "approve"}
+
+
+def test_unknown_link_is_not_found():
+    assert call("GET", "/webhook/callback/nope")[0] == 404
+
+
+def test_secret_requires_a_signed_post(monkeypatch):
+    monkeypatch.setenv("WEBHOOK_CALLBACK_SECRET", "s3cret")
+    registry = get_callback_registry()
+    token = registry.register()
+    path = f"/webhook/callback/{token}"
+    body = b'{"approved": true}'
+
+    assert call("GET", path)[0] == 403
+    assert call("POST", path, data=body)[0] == 401
+    forged = {SIGNATURE_HEADER: "sha256=0"}
+    assert call("POST", path, data=body, headers=forged)[0] == 401
+    assert registry.state(token) == "pending"
+
+    signed = {SIGNATURE_HEADER: sign_callback(body, "s3cret")}
+    assert call("POST", path, data=body, headers=signed)[0] == 200
+    assert registry.wait(token, 1.0) == {"approved": True}
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import comfy.model_management as model_management
+import pytest
+
+from webhook_nodes.modules.callbacks import CallbackRegistry, CallbackTimeout
+from webhook_nodes.modules.delay import get_delay_engine
+
+
+@pytest.fixture
+def interrupt(monkeypatch):
+    """
+    Trigger an interrupt the way ComfyUI does: set the flag, then wake the waiters
+    """
+
+    def throw():
+        if model_management.interrupt_processing:
+            model_management.interrupt_processing = False
+            raise model_management.InterruptProcessingException()
+
+    monkeypatch.setattr(model_management, 'interrupt_processing', False)
+    monkeypatch.setattr(
+        model_management, 'throw_exception_if_processing_interrupted', throw
+    )
+
+    def trigger():
+        model_management.interrupt_processing = True
+        get_delay_engine().interrupt()
+
+    return trigger
+
+
+def elapsed(fn):
+    start = time.monotonic()
+    try:
+        return fn(), time.monotonic() - start
+    except Exception as e:
+        return e, time.monotonic() - start
+
+
+def test_returns_the_posted_payload():
+    registry = CallbackRegistry()
+    token = registry.register()
+    threading.Timer(0.05, registry.resolve, (token, {'approved': True})).start()
+    assert registry.wait(token, 5.0) == {'approved': True}
+    assert registry.resolve(token, {}) == (False, "unknown")
+
+
+def test_times_out_without_a_callback():
+    registry = CallbackRegistry()
+    token = registry.register()
+    error, waited = elapsed(lambda: registry.wait(token, 0.1))
+    assert isinstance(error, CallbackTimeout)
+    assert waited >= 0.1
+    assert registry.stats()['timeouts'] == 1
+
+
+def test_cleared_interrupt_does_not_end_the_wait_early():
+    # The engine wakes every waiter on an interrupt; one that was already
+    # handled elsewhere must not time out the callback
+    registry = CallbackRegistry()
+    token = registry.register()
+    threading.Timer(0.05, get_delay_engine().interrupt).start()
+    error, waited = elapsed(lambda: registry.wait(token, 0.3))
+    assert isinstance(error, CallbackTimeout)
+    assert waited >= 0.3
+
+    token = registry.register()
+    threading.Timer(0.05, get_delay_engine().interrupt).start()
+    threading.Timer(0.15, registry.resolve, (token, 'late')).start()
+    assert registry.wait(token, 5.0) == 'late'
+
+
+def test_interrupt_stops_the_wait(interrupt):
+    registry = CallbackRegistry()
+    token = registry.register()
+    threading.Timer(0.05, interrupt).start()
+    error, waited = elapsed(lambda: registry.wait(token, 5.0))
+    assert isinstance(error, model_management.InterruptProcessingException)
+    assert waited < 1.0
+    # The token is spent either way
+    assert registry.resolve(token, {}) == (False, "unknown")
+    assert registry.stats()['timeouts'] == 0
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from webhook_nodes.modules.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreakerRegistry,
+    circuit_key,
+)
+
+URL = 'http://127.0.0.1:9/hook'
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not met in time")
+        time.sleep(0.005)
+
+
+def open_and_probe(status_code):
+    """Open a circuit and wait for the background probe, which answers status_code"""
+    probed = threading.Event()
+
+    def probe(url, timeout):
+        probed.set()
+        return status_code
+
+    registry = CircuitBreakerRegistry(
+        failure_threshold=1, reset_timeout=0.1, probe_fn=probe
+    )
+    assert registry.before_request(URL)[0]
+    registry.after_request(URL, True, "HTTP 500")
+    assert probed.wait(5.0)
+    return registry
+
+
+def circuit(registry):
+    return registry.stats()['circuits'][circuit_key(URL)]
+
+
+def test_successful_probe_closes_the_circuit():
+    registry = open_and_probe(204)
+    wait_until(lambda: circuit(registry)['state'] == CLOSED)
+
+
+def test_server_error_probe_reopens_the_circuit():
+    registry = open_and_probe(503)
+    wait_until(lambda: circuit(registry)['opened'] == 2)
+    assert circuit(registry)['state'] == OPEN
+
+
+def test_client_error_probe_leaves_the_trial_to_the_next_request():
+    # e.g. an endpoint that only accepts POST answers the HEAD probe with 405
+    registry = open_and_probe(405)
+    wait_until(lambda: registry.before_request(URL)[0])
+    assert circuit(registry)['state'] == HALF_OPEN
+    # Only that one trial request goes through until it succeeds
+    assert not registry.before_request(URL)[0]
+    registry.after_request(URL, False)
+    assert circuit(registry)['state'] == CLOSED
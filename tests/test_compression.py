@@ -0,0 +1,70 @@
+import gzip
+import json
+import os
+
+from webhook_nodes.modules.compression import compress_request, set_compression
+from webhook_nodes.modules.webhook_sender import build_request, deliver_request
+
+
+def compressible():
+    return json.dumps(
+        {'nodes': [{'class_type': 'KSampler', 'steps': 20}] * 200}
+    ).encode('utf-8')
+
+
+def request(url, body):
+    return set_compression(
+        build_request(
+            'POST', url, headers={'Content-Type': 'application/json'}, data=body
+        ),
+        'gzip',
+        min_bytes=0,
+    )
+
+
+def test_compresses_when_smaller():
+    body = compressible()
+    body_kwargs, headers, info = compress_request(
+        request('http://127.0.0.1:9/hook', body)
+    )
+    assert headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(body_kwargs['data']) == body
+    assert info['compressed_bytes'] < info['original_bytes'] == len(body)
+
+
+def test_sends_original_when_compression_does_not_shrink_it():
+    body = os.urandom(4096)
+    original = request('http://127.0.0.1:9/hook', body)
+    body_kwargs, headers, info = compress_request(original)
+    assert info is None
+    assert body_kwargs == {'data': body}
+    assert headers == original['headers']
+    assert 'Content-Encoding' not in headers
+
+
+def test_small_body_is_left_alone():
+    original = set_compression(
+        build_request('POST', 'http://127.0.0.1:9/hook', data=b'{}'),
+        'gzip',
+        min_bytes=1024,
+    )
+    body_kwargs, headers, info = compress_request(original)
+    assert info is None
+    assert body_kwargs == {'data': b'{}'}
+
+
+def test_receiver_gets_the_smaller_body(receiver):
+    incompressible = os.urandom(4096)
+    result = deliver_request(request(receiver.url('/raw'), incompressible))
+    assert result['success']
+    assert not result.get('compression')
+
+    result = deliver_request(request(receiver.url('/gzip'), compressible()))
+    assert result['success']
+    assert result['compression']['codec'] == 'gzip'
+
+    raw, packed = receiver.requests
+    assert raw['body'] == incompressible
+    assert 'Content-Encoding' not in raw['headers']
+    assert packed['headers']['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(packed['body']) == compressible()
@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+
+from webhook_nodes.modules.delivery_queue import DeliveryDispatcher
+from webhook_nodes.modules.webhook_sender import build_request
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not met in time")
+        time.sleep(0.005)
+
+
+class GatedSender:
+    """send_fn that records requests and holds each one until the gate opens"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.sent = []
+
+    def __call__(self, request):
+        self.gate.wait(5.0)
+        self.sent.append(request['body']['json']['n'])
+        return {'success': True, 'status_code': 200}
+
+
+def make_request(n):
+    return build_request('POST', 'http://127.0.0.1:9/hook', json={'n': n})
+
+
+def busy_dispatcher(backpressure, **settings):
+    """One worker busy with request 0 and request 1 waiting in the full queue"""
+    sender = GatedSender()
+    dispatcher = DeliveryDispatcher(
+        workers=1, max_queue=1, backpressure=backpressure, send_fn=sender, **settings
+    )
+    first = dispatcher.submit(make_request(0))
+    wait_until(lambda: dispatcher.stats()['in_flight'] == 1)
+    second = dispatcher.submit(make_request(1))
+    return dispatcher, sender, first, second
+
+
+def test_block_spills_when_queue_stays_full(tmp_path):
+    dispatcher, sender, _, second = busy_dispatcher(
+        "block", block_timeout=0.1, spill_dir=str(tmp_path)
+    )
+    third = dispatcher.submit(make_request(2))
+    assert dispatcher.status(second)['state'] == 'queued'
+    assert dispatcher.status(third)['state'] == 'spilled'
+    assert len(os.listdir(tmp_path)) == 1
+
+    sender.gate.set()
+    assert dispatcher.wait(5.0)
+    assert sender.sent == [0, 1, 2]
+    dispatcher.shutdown()
+
+
+def test_block_waits_a_finite_time_by_default():
+    assert DeliveryDispatcher().block_timeout == 30.0
+
+
+def test_block_waits_for_space():
+    dispatcher, sender, _, _ = busy_dispatcher("block")
+    threading.Timer(0.1, sender.gate.set).start()
+    third = dispatcher.submit(make_request(2))
+    assert dispatcher.wait(5.0)
+    assert dispatcher.status(third)['state'] == 'delivered'
+    assert sender.sent == [0, 1, 2]
+    dispatcher.shutdown()
+
+
+def test_drop_oldest_discards_queued_request():
+    dispatcher, sender, first, second = busy_dispatcher("drop_oldest")
+    third = dispatcher.submit(make_request(2))
+    assert dispatcher.status(second)['state'] == 'dropped'
+
+    sender.gate.set()
+    assert dispatcher.wait(5.0)
+    assert sender.sent == [0, 2]
+    assert dispatcher.status(first)['state'] == 'delivered'
+    assert dispatcher.status(third)['state'] == 'delivered'
+    assert dispatcher.stats()['dropped'] == 1
+    dispatcher.shutdown()
+
+
+def test_spill_writes_to_disk_and_keeps_order(tmp_path):
+    dispatcher, sender, _, _ = busy_dispatcher("spill", spill_dir=str(tmp_path))
+    third = dispatcher.submit(make_request(2))
+    fourth = dispatcher.submit(make_request(3))
+    assert dispatcher.status(third)['state'] == 'spilled'
+    assert dispatcher.status(fourth)['state'] == 'spilled'
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.pkl')]) == 2
+
+    sender.gate.set()
+    assert dispatcher.wait(5.0)
+    assert sender.sent == [0, 1, 2, 3]
+    assert os.listdir(tmp_path) == []
+    dispatcher.shutdown()
+
+
+class SlowPickle:
+    """Request field whose pickling waits for a gate"""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+
+    def __reduce__(self):
+        self.entered.set()
+        self.gate.wait(5.0)
+        return (str, ('pickled',))
+
+
+def test_spill_pickles_outside_the_queue_lock(tmp_path):
+    dispatcher, sender, _, _ = busy_dispatcher("spill", spill_dir=str(tmp_path))
+    slow = SlowPickle()
+    request = make_request(2)
+    request['extra'] = slow
+    submitter = threading.Thread(target=dispatcher.submit, args=(request,))
+    submitter.start()
+    assert slow.entered.wait(5.0)
+
+    # The dispatcher stays usable while the request is being written
+    reader = threading.Thread(target=dispatcher.stats)
+    reader.start()
+    reader.join(1.0)
+    assert not reader.is_alive()
+    assert dispatcher.stats()['spilled_pending'] == 1
+
+    slow.gate.set()
+    submitter.join(5.0)
+    sender.gate.set()
+    assert dispatcher.wait(5.0)
+    assert sender.sent == [0, 1, 2]
+    dispatcher.shutdown()
+
+
+def test_spilled_requests_survive_a_restart(tmp_path):
+    dispatcher, sender, _, _ = busy_dispatcher("spill", spill_dir=str(tmp_path))
+    spilled = dispatcher.submit(make_request(2))
+
+    # A new dispatcher on the same directory picks the spilled request up
+    resumed = GatedSender()
+    resumed.gate.set()
+    restarted = DeliveryDispatcher(
+        workers=1, backpressure="spill", spill_dir=str(tmp_path), send_fn=resumed
+    )
+    assert restarted.wait(5.0)
+    assert resumed.sent == [2]
+    assert restarted.status(spilled)['state'] == 'delivered'
+
+    sender.gate.set()
+    dispatcher.shutdown()
+    restarted.shutdown()
+
+
+def test_delivers_through_the_http_client(receiver):
+    dispatcher = DeliveryDispatcher(workers=2)
+    ids = [
+        dispatcher.submit(build_request('POST', receiver.url(), json={'n': n}))
+        for n in range(3)
+    ]
+    assert dispatcher.wait(5.0)
+    assert [dispatcher.status(delivery_id)['state'] for delivery_id in ids] == [
+        'delivered'
+    ] * 3
+    assert dispatcher.status(ids[0])['result']['status_code'] == 200
+    assert len(receiver.paths()) == 3
+    dispatcher.shutdown()
@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+
+from webhook_nodes.nodes import WebhookNotificationNode
+
+
+def image():
+    return np.random.default_rng(0).random((1, 16, 16, 3), dtype=np.float32)
+
+
+def send(receiver, primary, *additional):
+    return WebhookNotificationNode().send_webhook(
+        webhook_url=receiver.url(primary),
+        image=image(),
+        dedupe="skip",
+        additional_endpoints=json.dumps([receiver.url(path) for path in additional]),
+    )
+
+
+def test_image_is_skipped_once_every_endpoint_has_it(receiver):
+    send(receiver, '/a', '/b')
+    assert sorted(receiver.paths()) == ['/a', '/b']
+
+    receiver.clear()
+    send(receiver, '/a', '/b')
+    assert receiver.paths() == []
+
+
+def test_failed_endpoint_still_gets_the_image(receiver):
+    receiver.statuses['/fail'] = 500
+    send(receiver, '/a', '/fail')
+    receiver.clear()
+
+    # /a already has the image, /fail never got it: both are sent again
+    receiver.statuses['/fail'] = 200
+    send(receiver, '/a', '/fail')
+    assert sorted(receiver.paths()) == ['/a', '/fail']
+    assert all(b'filename=' in request['body'] for request in receiver.requests)
+
+
+def test_new_endpoint_gets_the_image(receiver):
+    send(receiver, '/a')
+    receiver.clear()
+
+    send(receiver, '/a', '/new')
+    assert sorted(receiver.paths()) == ['/a', '/new']
+    assert all(b'filename=' in request['body'] for request in receiver.requests)
+
+
+def test_single_endpoint_skips_repeated_image(receiver):
+    send(receiver, '/a')
+    receiver.clear()
+    status, _ = send(receiver, '/a')
+    assert status == "Skipped"
+    assert receiver.paths() == []
@@ -0,0 +1,15 @@
+import numpy as np
+
+from webhook_nodes.modules.image_encoding import tensor_to_uint8
+
+
+def test_matches_the_original_truncating_conversion():
+    image = np.random.default_rng(0).random((2, 64, 64, 3), dtype=np.float32)
+    image[0, 0, 0] = [0.0, 0.999, 1.0]
+    assert np.array_equal(tensor_to_uint8(image), (image * 255).astype(np.uint8))
+    assert tensor_to_uint8(image)[0, 0, 0].tolist() == [0, 254, 255]
+
+
+def test_out_of_range_values_are_clamped():
+    image = np.array([[[-0.5, 0.5, 1.5]]], dtype=np.float32)
+    assert tensor_to_uint8(image).tolist() == [[[0, 127, 255]]]
@@ -0,0 +1,51 @@
+from webhook_nodes.nodes import (
+    GenericWebhookNode,
+    NotifyServer,
+    TriggerNode,
+    WebhookNotificationNode,
+)
+
+
+def test_unconnected_optional_input_is_never_requested():
+    # ComfyUI leaves unconnected optional inputs out of the kwargs altogether
+    assert WebhookNotificationNode().check_lazy_status(enable_notification=True) == []
+    assert GenericWebhookNode().check_lazy_status(enable_notification=True) == []
+
+
+def test_linked_input_is_requested_only_when_sending():
+    node = WebhookNotificationNode()
+    assert node.check_lazy_status(enable_notification=True, image=None) == ["image"]
+    assert node.check_lazy_status(enable_notification=False, image=None) == []
+    assert node.check_lazy_status(enable_notification=True, image=object()) == []
+    # JSON-only requests never carry the image
+    assert (
+        node.check_lazy_status(enable_notification=True, send_as_json=True, image=None)
+        == []
+    )
+
+    generic = GenericWebhookNode()
+    assert generic.check_lazy_status(enable_notification=True, any_input=None) == [
+        "any_input"
+    ]
+    assert generic.check_lazy_status(enable_notification=False, any_input=None) == []
+
+
+def test_notify_server_requests_only_linked_inputs():
+    node = NotifyServer()
+    assert node.check_lazy_status(trigger=False, webhook_url=None, json_data=None) == []
+    assert node.check_lazy_status(trigger=True, webhook_url=None) == ["webhook_url"]
+    assert node.check_lazy_status(
+        trigger=True, webhook_url="http://x", json_data=None, custom_headers=None
+    ) == ["json_data", "custom_headers"]
+
+
+def test_trigger_stays_eager():
+    assert TriggerNode.INPUT_TYPES()["required"]["any_input"] == (None,)
+    assert not hasattr(TriggerNode, "check_lazy_status")
+
+
+def test_disabled_node_skips_without_its_image():
+    status, _ = WebhookNotificationNode().send_webhook(
+        webhook_url="http://127.0.0.1:9/hook", enable_notification=False
+    )
+    assert status == "Skipped"
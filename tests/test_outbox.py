@@ -0,0 +1,240 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import comfy_stubs
+from webhook_nodes.modules import outbox as outbox_module
+from webhook_nodes.modules.circuit_breaker import configure_circuit_breakers
+from webhook_nodes.modules.outbox import WebhookOutbox
+from webhook_nodes.modules.webhook_sender import build_request
+
+
+class ScriptedSender:
+    """send_fn answering with the given status codes in turn (the last one repeats)"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        with self._lock:
+            status = self.statuses[min(self.calls, len(self.statuses) - 1)]
+            self.calls += 1
+        return {
+            'success': status < 400,
+            'status_code': status,
+            'error': None if status < 400 else f"HTTP {status}",
+        }
+
+
+def make_outbox(tmp_path, send_fn, **settings):
+    settings.setdefault('max_attempts', 3)
+    return WebhookOutbox(
+        path=str(tmp_path / 'outbox.sqlite3'),
+        send_fn=send_fn,
+        backoff_base=0.01,
+        backoff_max=0.05,
+        poll_interval=0.05,
+        **settings,
+    )
+
+
+def request(url='http://127.0.0.1:9/hook'):
+    return build_request('POST', url, json={'event': 'done'})
+
+
+def wait_for(outbox, outbox_id, condition, timeout=5.0):
+    """
+    Poll a request's status; wait() alone returns while a retry is scheduled for later
+    """
+    deadline = time.monotonic() + timeout
+    status = outbox.status(outbox_id)
+    while not condition(status) and time.monotonic() < deadline:
+        time.sleep(0.01)
+        status = outbox.status(outbox_id)
+    return status
+
+
+def settled(status):
+    return status['state'] in ('delivered', 'dead')
+
+
+def wait_for_dead(outbox, outbox_id):
+    """
+    Wait until a request is dead and its worker has let go of it (replay skips
+    requests that are still in flight)
+    """
+    assert wait_for(outbox, outbox_id, settled)['state'] == 'dead'
+    assert outbox.wait(5.0)
+
+
+def test_retries_until_delivered(tmp_path):
+    sender = ScriptedSender(500, 500, 200)
+    outbox = make_outbox(tmp_path, sender)
+    outbox_id = outbox.enqueue(request())
+    status = wait_for(outbox, outbox_id, settled)
+    assert status['state'] == 'delivered'
+    assert status['attempts'] == 3
+    assert outbox.stats()['retried'] == 2
+    outbox.close()
+
+
+def test_marks_dead_after_max_attempts(tmp_path):
+    sender = ScriptedSender(500)
+    outbox = make_outbox(tmp_path, sender)
+    outbox_id = outbox.enqueue(request())
+    status = wait_for(outbox, outbox_id, settled)
+    assert status['state'] == 'dead'
+    assert status['attempts'] == 3
+    assert status['last_status'] == 500
+    outbox.close()
+
+
+def test_permanent_client_error_is_not_retried(tmp_path):
+    sender = ScriptedSender(404)
+    outbox = make_outbox(tmp_path, sender)
+    outbox_id = outbox.enqueue(request())
+    assert wait_for(outbox, outbox_id, settled)['state'] == 'dead'
+    assert sender.calls == 1
+    outbox.close()
+
+
+def test_retry_after_delays_the_next_attempt(tmp_path):
+    def throttled(request):
+        return {
+            'success': False,
+            'status_code': 429,
+            'error': 'HTTP 429',
+            'retry_after': 30.0,
+        }
+
+    outbox = make_outbox(tmp_path, throttled)
+    before = time.time()
+    outbox_id = outbox.enqueue(request())
+    # The attempt is stored before its worker lets go of the request ("sending")
+    status = wait_for(
+        outbox,
+        outbox_id,
+        lambda status: status['attempts'] > 0 and status['state'] != 'sending',
+    )
+    assert status['state'] == 'pending'
+    assert status['next_attempt_at'] >= before + 30.0
+    outbox.close()
+
+
+def test_replay_resends_dead_requests(tmp_path):
+    sender = ScriptedSender(500, 500, 500, 200)
+    outbox = make_outbox(tmp_path, sender)
+    outbox_id = outbox.enqueue(request())
+    wait_for_dead(outbox, outbox_id)
+
+    assert outbox.replay() == 1
+    assert wait_for(outbox, outbox_id, settled)['state'] == 'delivered'
+    # Delivered requests are only replayed when asked for
+    assert outbox.replay() == 0
+    outbox.close()
+
+
+def test_pending_requests_survive_a_restart(tmp_path):
+    outbox = make_outbox(tmp_path, ScriptedSender(500), max_attempts=50)
+    outbox_id = outbox.enqueue(request())
+    wait_for(outbox, outbox_id, lambda status: status['attempts'] > 0)
+    outbox.close()
+
+    sender = ScriptedSender(200)
+    reopened = make_outbox(tmp_path, sender, max_attempts=50)
+    assert wait_for(reopened, outbox_id, settled)['state'] == 'delivered'
+    assert sender.calls == 1
+    reopened.close()
+
+
+def test_delivers_over_http_after_receiver_recovers(tmp_path, receiver):
+    receiver.statuses['/flaky'] = 500
+    # Keep the circuit closed so every retry reaches the receiver
+    configure_circuit_breakers(failure_threshold=0)
+    outbox = make_outbox(tmp_path, outbox_module.deliver_request, max_attempts=50)
+    outbox_id = outbox.enqueue(request(receiver.url('/flaky')))
+    assert (
+        wait_for(outbox, outbox_id, lambda status: status['attempts'] >= 2)[
+            'last_status'
+        ]
+        == 500
+    )
+
+    receiver.statuses['/flaky'] = 200
+    assert wait_for(outbox, outbox_id, settled)['state'] == 'delivered'
+    assert receiver.paths()[-1] == '/flaky'
+    outbox.close()
+
+
+def test_cli_never_creates_a_database(tmp_path, capsys):
+    path = tmp_path / 'missing.sqlite3'
+    assert outbox_module.main(['--db', str(path), 'stats']) == 1
+    assert not path.exists()
+
+
+def test_cli_refuses_replay_while_outbox_is_in_use(tmp_path, capsys):
+    outbox = make_outbox(tmp_path, ScriptedSender(500))
+    assert wait_for(outbox, outbox.enqueue(request()), settled)['state'] == 'dead'
+    path = str(tmp_path / 'outbox.sqlite3')
+
+    assert outbox_module.main(['--db', path, 'replay']) == 1
+    assert "in use" in capsys.readouterr().out
+    outbox.close()
+
+    assert outbox_module.main(['--db', path, 'replay']) == 0
+    assert "Scheduled 1 request(s)" in capsys.readouterr().out
+
+
+def test_cli_reuses_the_outbox_of_this_process(tmp_path, monkeypatch, capsys):
+    outbox = make_outbox(tmp_path, ScriptedSender(500, 500, 500, 200))
+    outbox_id = outbox.enqueue(request())
+    wait_for_dead(outbox, outbox_id)
+    monkeypatch.setattr(outbox_module, '_outbox', outbox)
+
+    assert outbox_module.main(['--db', outbox.path, 'replay']) == 0
+    assert "Scheduled 1 request(s)" in capsys.readouterr().out
+    # Still open and delivering
+    assert wait_for(outbox, outbox_id, settled)['state'] == 'delivered'
+    outbox.close()
+
+
+def test_cli_command_replays_from_a_comfyui_directory(tmp_path):
+    outbox = make_outbox(tmp_path, ScriptedSender(500))
+    assert wait_for(outbox, outbox.enqueue(request()), settled)['state'] == 'dead'
+    outbox.close()
+
+    # Lay out a ComfyUI directory with this repository as a custom node. The stubs
+    # are installed from sitecustomize, since the command imports the whole package.
+    comfyui = tmp_path / 'ComfyUI'
+    (comfyui / 'custom_nodes').mkdir(parents=True)
+    (comfyui / 'custom_nodes' / 'webhook_nodes').symlink_to(
+        comfy_stubs.REPO_ROOT, target_is_directory=True
+    )
+    site = tmp_path / 'site'
+    site.mkdir()
+    (site / 'sitecustomize.py').write_text(
+        f"import comfy_stubs\ncomfy_stubs.install({str(tmp_path / 'comfy')!r})\n"
+    )
+    env = dict(os.environ, WEBHOOK_DATA_DIR=str(tmp_path))
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(site), os.path.dirname(comfy_stubs.__file__), env.get('PYTHONPATH', '')]
+    )
+
+    def run(*args):
+        return subprocess.run(
+            [sys.executable, '-m', 'custom_nodes.webhook_nodes.modules.outbox', *args],
+            cwd=comfyui,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+
+    replayed = run('replay')
+    assert replayed.returncode == 0, replayed.stdout + replayed.stderr
+    assert "Scheduled 1 request(s)" in replayed.stdout
+    assert '"pending": 1' in run('stats').stdout
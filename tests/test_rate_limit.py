@@ -0,0 +1,32 @@
+import pytest
+
+from webhook_nodes.modules.rate_limit import RateLimiter, RateLimitTimeout
+
+URL = 'http://hooks.example.com/hook'
+
+
+def test_concurrency_is_not_capped_by_default():
+    limiter = RateLimiter()
+    for _ in range(100):
+        limiter.acquire(URL, timeout=0)
+    host = limiter.stats()['hosts']['hooks.example.com']
+    assert host['in_flight'] == 100
+    assert host['concurrency_limit'] is None
+
+
+def test_configured_cap_holds_requests_back():
+    limiter = RateLimiter()
+    limiter.configure_host('hooks.example.com', max_concurrency=2)
+    limiter.acquire(URL, timeout=0)
+    limiter.acquire(URL, timeout=0)
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(URL, timeout=0.05)
+
+    limiter.release(URL, status_code=200)
+    limiter.acquire(URL, timeout=0)
+
+
+def test_adaptive_limit_keeps_a_ceiling():
+    limiter = RateLimiter(adaptive=True)
+    assert limiter.max_concurrency == 16
+    assert limiter.stats()['adaptive']
@@ -0,0 +1,10 @@
+from webhook_nodes.modules import upload_cache
+
+
+def test_invalid_settings_fall_back_to_their_defaults(monkeypatch):
+    monkeypatch.setattr(upload_cache, '_upload_cache', None)
+    monkeypatch.setenv('WEBHOOK_UPLOAD_CACHE_SIZE', 'lots')
+    monkeypatch.setenv('WEBHOOK_UPLOAD_CACHE_TTL', '60')
+    cache = upload_cache.get_upload_cache()
+    assert cache.max_entries == 1024
+    assert cache.ttl == 60.0